@@ -0,0 +1,273 @@
+"""
+Benchmark corpora for VectorDatabaseComparison.
+
+Builds corpora from 10k to 10M normalized vectors (synthetic clustered data or
+encoded real text), keeps a held-out query set, and caches the brute-force
+ground truth on disk so recall@k can be measured for every backend.
+"""
+
+import os
+import json
+import time
+import hashlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.getenv("BENCHMARK_CACHE_DIR", "./benchmark_cache")
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so inner product equals cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def top_k_rows(scores: np.ndarray, k: int):
+    """Top-k per row of a score matrix, best first (partial selection, then sort)."""
+    k = min(k, scores.shape[1])
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return np.take_along_axis(candidate_scores, order, axis=1), np.take_along_axis(candidates, order, axis=1)
+
+
+def blocked_top_k(queries: np.ndarray, vectors: np.ndarray, k: int, block_size: int = 65536,
+                  mask: Optional[np.ndarray] = None):
+    """
+    Exact inner-product top-k of each query, scoring `block_size` corpus rows at a time.
+    With a boolean `mask`, only rows where it is True are eligible; when fewer than k are,
+    the missing positions get score -inf and id -1.
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_ids = np.empty((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(vectors), block_size):
+        block = np.asarray(vectors[start:start + block_size], dtype=np.float32)
+        block_scores = queries @ block.T
+        if mask is not None:
+            block_scores[:, ~mask[start:start + block_size]] = -np.inf
+        block_scores, block_ids = top_k_rows(block_scores, k)
+        merged_scores = np.concatenate([best_scores, block_scores], axis=1)
+        merged_ids = np.concatenate([best_ids, block_ids + start], axis=1)
+        best_scores, order = top_k_rows(merged_scores, k)
+        best_ids = np.take_along_axis(merged_ids, order, axis=1)
+    if mask is not None:
+        best_ids[np.isneginf(best_scores)] = -1
+    return best_scores, best_ids
+
+
+def per_query_recall(approx_indices, exact_indices) -> List[float]:
+    """
+    Fraction of the exact top-k found in the approximate top-k, for each query.
+    Ids of -1 are padding (fewer than k eligible results) and are ignored.
+    """
+    recalls = []
+    for approx, exact in zip(approx_indices, exact_indices):
+        exact = set(np.asarray(exact).tolist()) - {-1}
+        recalls.append(len(set(np.asarray(approx).tolist()) & exact) / len(exact) if exact else 1.0)
+    return recalls
+
+
+def recall_at_k(approx_indices, exact_indices) -> float:
+    """Average fraction of the exact top-k found in the approximate top-k."""
+    hits = per_query_recall(approx_indices, exact_indices)
+    return float(np.mean(hits)) if hits else 0.0
+
+
+def latency_summary(times: List[float]) -> Dict:
+    """Mean and tail latencies (ms) of a list of per-query durations in seconds."""
+    times_ms = np.asarray(times, dtype=np.float64) * 1000
+    return {
+        'mean_ms': float(times_ms.mean()),
+        'p50_ms': float(np.percentile(times_ms, 50)),
+        'p95_ms': float(np.percentile(times_ms, 95)),
+        'p99_ms': float(np.percentile(times_ms, 99)),
+        'max_ms': float(times_ms.max()),
+        'num_queries': int(len(times_ms))
+    }
+
+
+class BenchmarkCorpus:
+    """
+    Normalized float32 corpus vectors plus a held-out query set.
+    Large corpora are kept as memory-mapped .npy files in `cache_dir`.
+    `embedding_time_s` is how long encoding the texts took (None for synthetic vectors),
+    `vectors_path` the .npy file holding exactly `vectors`, when there is one.
+    """
+
+    block_size = 65536  # Corpus rows scored per block when computing ground truth
+
+    def __init__(self, name: str, vectors: np.ndarray, queries: np.ndarray,
+                 texts: Optional[List[str]] = None, cache_dir: str = DEFAULT_CACHE_DIR,
+                 embedding_time_s: Optional[float] = None, vectors_path: Optional[str] = None):
+        self.name = name
+        self.vectors = vectors
+        self.queries = queries
+        self.texts = texts
+        self.cache_dir = cache_dir
+        self.embedding_time_s = embedding_time_s
+        self.vectors_path = vectors_path
+
+    @property
+    def num_vectors(self) -> int:
+        return len(self.vectors)
+
+    @property
+    def dimension(self) -> int:
+        return self.vectors.shape[1]
+
+    def ground_truth(self, k: int = 10) -> np.ndarray:
+        """Exact top-k ids per query (brute force, computed once and cached on disk)."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, f"{self.name}_gt_k{k}.npy")
+        if os.path.exists(path):
+            return np.load(path)
+
+        print(f"Computing brute-force ground truth for {len(self.queries)} queries over {self.num_vectors:,} vectors...")
+        start_time = time.perf_counter()
+        _, best_ids = blocked_top_k(self.queries, self.vectors, k, self.block_size)
+        print(f"Ground truth computed in {time.perf_counter() - start_time:.1f}s, cached at {path}")
+
+        np.save(path, best_ids)
+        return best_ids
+
+
+def synthetic_corpus(num_vectors: int = 10000, num_queries: int = 1000, dimension: int = 384,
+                     num_clusters: Optional[int] = None, seed: int = 42,
+                     cache_dir: str = DEFAULT_CACHE_DIR) -> BenchmarkCorpus:
+    """
+    Clustered Gaussian vectors, normalized to the unit sphere like sentence embeddings.
+    Queries are drawn from the same clusters but are not part of the corpus (held out).
+    The corpus is generated in blocks into a memory-mapped file, so 10M vectors do not
+    have to fit in RAM, and reused across runs with the same parameters.
+    """
+    num_clusters = num_clusters or max(10, int(np.sqrt(num_vectors)))
+    name = f"synthetic_n{num_vectors}_d{dimension}_c{num_clusters}_q{num_queries}_s{seed}"
+    os.makedirs(cache_dir, exist_ok=True)
+    vectors_path = os.path.join(cache_dir, f"{name}_vectors.npy")
+    queries_path = os.path.join(cache_dir, f"{name}_queries.npy")
+
+    rng = np.random.default_rng(seed)
+    centers = normalize_rows(rng.standard_normal((num_clusters, dimension)))
+    spread = 0.8 / np.sqrt(dimension)  # Per-dimension noise, so neighbours share a cluster but are not duplicates
+
+    def sample(count):
+        labels = rng.integers(0, num_clusters, count)
+        return normalize_rows(centers[labels] + spread * rng.standard_normal((count, dimension)).astype(np.float32))
+
+    if not (os.path.exists(vectors_path) and os.path.exists(queries_path)):
+        print(f"Generating synthetic corpus: {num_vectors:,} x {dimension} ({num_clusters} clusters)...")
+        vectors = np.lib.format.open_memmap(vectors_path + ".tmp", mode='w+', dtype=np.float32,
+                                            shape=(num_vectors, dimension))
+        for start in range(0, num_vectors, BenchmarkCorpus.block_size):
+            end = min(start + BenchmarkCorpus.block_size, num_vectors)
+            vectors[start:end] = sample(end - start)
+        vectors.flush()
+        del vectors
+        np.save(queries_path, sample(num_queries))
+        os.replace(vectors_path + ".tmp", vectors_path)  # Complete files only
+
+    return BenchmarkCorpus(
+        name,
+        np.load(vectors_path, mmap_mode='r'),
+        np.load(queries_path),
+        cache_dir=cache_dir,
+        vectors_path=vectors_path
+    )
+
+
+def model_fingerprint(model) -> str:
+    """
+    Name or path of a SentenceTransformer plus a SHA-256 of its weights. str(model) only
+    describes the architecture, so a re-downloaded, fine-tuned or different checkpoint of the
+    same architecture must not reuse cached embeddings.
+    """
+    card = getattr(model, 'model_card_data', None)
+    tokenizer = getattr(model, 'tokenizer', None)
+    name = (getattr(card, 'base_model', None) or getattr(tokenizer, 'name_or_path', None)
+            or type(model).__name__)
+    if not callable(getattr(model, 'state_dict', None)):
+        return name
+    digest = hashlib.sha256()
+    for key, tensor in sorted(model.state_dict().items()):
+        digest.update(key.encode('utf-8'))
+        digest.update(tensor.detach().float().cpu().numpy().tobytes())
+    return f"{name}@weights-{digest.hexdigest()[:16]}"
+
+
+def text_corpus(texts: List[str], model, num_queries: int = 1000, batch_size: int = 256,
+                seed: int = 42, cache_dir: str = DEFAULT_CACHE_DIR) -> BenchmarkCorpus:
+    """
+    Encode real documents with `model` (a SentenceTransformer) and hold out `num_queries`
+    of them, chosen at random, as queries that are not indexed.
+    Embeddings are cached per (model weights, texts) so repeated runs skip encoding. Both the
+    embeddings and the indexed rows are written block by block to memory-mapped .npy files,
+    so the corpus never has to fit in RAM.
+    """
+    fingerprint = hashlib.sha256()
+    fingerprint.update(model_fingerprint(model).encode('utf-8'))
+    for text in texts:
+        fingerprint.update(text.encode('utf-8'))
+        fingerprint.update(b"\0")
+    name = f"text_{fingerprint.hexdigest()[:16]}_q{num_queries}_s{seed}"
+    os.makedirs(cache_dir, exist_ok=True)
+    embeddings_path = os.path.join(cache_dir, f"{name}_embeddings.npy")
+    vectors_path = os.path.join(cache_dir, f"{name}_vectors.npy")
+    meta_path = os.path.join(cache_dir, f"{name}_meta.json")
+    block_size = BenchmarkCorpus.block_size
+
+    embedding_time = None
+    if os.path.exists(embeddings_path):
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                embedding_time = json.load(f).get('embedding_time_s')
+    else:
+        print(f"Encoding {len(texts):,} documents for the benchmark corpus...")
+        start_time = time.perf_counter()
+        embeddings = None
+        for start in range(0, len(texts), block_size):
+            block = normalize_rows(model.encode(texts[start:start + block_size], batch_size=batch_size))
+            if embeddings is None:
+                embeddings = np.lib.format.open_memmap(embeddings_path + ".tmp", mode='w+', dtype=np.float32,
+                                                       shape=(len(texts), block.shape[1]))
+            embeddings[start:start + len(block)] = block
+        embedding_time = time.perf_counter() - start_time
+        embeddings.flush()
+        del embeddings
+        os.replace(embeddings_path + ".tmp", embeddings_path)  # Complete files only
+        # Kept next to the cached embeddings so later runs can still report the encoding cost
+        with open(meta_path, 'w') as f:
+            json.dump({'embedding_time_s': embedding_time, 'num_texts': len(texts), 'batch_size': batch_size}, f)
+    embeddings = np.load(embeddings_path, mmap_mode='r')
+
+    num_queries = min(num_queries, len(texts) // 10 or 1)
+    held_out = np.zeros(len(texts), dtype=bool)
+    held_out[np.random.default_rng(seed).choice(len(texts), num_queries, replace=False)] = True
+    corpus_ids = np.flatnonzero(~held_out)
+
+    # Copy the indexed rows into their own memory-mapped file, one block at a time
+    if not os.path.exists(vectors_path):
+        vectors = np.lib.format.open_memmap(vectors_path + ".tmp", mode='w+', dtype=np.float32,
+                                            shape=(len(corpus_ids), embeddings.shape[1]))
+        for start in range(0, len(corpus_ids), block_size):
+            vectors[start:start + block_size] = embeddings[corpus_ids[start:start + block_size]]
+        vectors.flush()
+        del vectors
+        os.replace(vectors_path + ".tmp", vectors_path)
+
+    return BenchmarkCorpus(
+        name,
+        np.load(vectors_path, mmap_mode='r'),
+        np.asarray(embeddings[held_out], dtype=np.float32),
+        texts=[texts[i] for i in corpus_ids],
+        cache_dir=cache_dir,
+        embedding_time_s=embedding_time,
+        vectors_path=vectors_path
+    )
+
+
+def read_text_file(path: str) -> List[str]:
+    """One document per non-empty line."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
@@ -0,0 +1,145 @@
+"""
+Embedding-model throughput benchmark.
+
+Encoding is the most expensive step of every pipeline in this repo, and its cost
+depends on input length, batch size, CPU threads and numeric precision. This module
+builds the two typical input sets (short search queries, 1000-character document
+chunks) and times SentenceTransformer.encode over a grid of those settings,
+reporting documents/sec and tokens/sec.
+"""
+
+import os
+import copy
+import time
+from typing import Dict, List, Optional
+
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
+try:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    SPLITTER_AVAILABLE = True
+except ImportError:
+    SPLITTER_AVAILABLE = False
+
+PRECISIONS = ('float32', 'bfloat16', 'float16', 'int8')
+
+
+def default_thread_counts() -> List[int]:
+    """1, 2, 4, ... up to the number of CPUs (always including it)."""
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 < cpus:
+        counts.append(counts[-1] * 2)
+    return sorted(set(counts + [cpus]))
+
+
+def cycle_to(texts: List[str], count: int) -> List[str]:
+    """Repeat `texts` until there are exactly `count` of them."""
+    return [texts[i % len(texts)] for i in range(count)]
+
+
+def document_chunks(text: str, count: int, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
+    """`count` chunks of `text` cut by RecursiveCharacterTextSplitter, as in the RAG pipelines."""
+    if SPLITTER_AVAILABLE:
+        splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        chunks = splitter.split_text(text)
+    else:
+        print("langchain not installed, cutting fixed-size chunks instead of RecursiveCharacterTextSplitter")
+        step = chunk_size - chunk_overlap
+        chunks = [text[start:start + chunk_size] for start in range(0, max(len(text) - chunk_overlap, 1), step)]
+    return cycle_to(chunks, count)
+
+
+def count_tokens(model, texts: List[str]) -> int:
+    """Tokens the model actually processes (after truncation to max_seq_length, with special tokens)."""
+    encoded = model.tokenizer(texts, truncation=True, max_length=model.max_seq_length)
+    return int(sum(len(ids) for ids in encoded['input_ids']))
+
+
+def model_with_precision(model, precision: str):
+    """
+    Copy of `model` running in `precision`: 'float32', 'bfloat16', 'float16' (half precision
+    weights and activations) or 'int8' (dynamic quantization of the Linear layers, CPU only).
+    """
+    if precision == 'float32':
+        return model
+    if not TORCH_AVAILABLE:
+        raise ImportError("torch is required for reduced precision")
+    converted = copy.deepcopy(model)
+    if precision == 'bfloat16':
+        return converted.to(torch.bfloat16)
+    if precision == 'float16':
+        return converted.half()
+    if precision == 'int8':
+        return torch.quantization.quantize_dynamic(converted.cpu(), {torch.nn.Linear}, dtype=torch.qint8)
+    raise ValueError(f"Unknown precision: {precision}")
+
+
+def time_encode(model, texts: List[str], batch_size: int, num_threads: Optional[int] = None,
+                repeats: int = 1) -> float:
+    """Best wall time (seconds) of encoding all texts, after one warm-up batch."""
+    previous_threads = torch.get_num_threads() if TORCH_AVAILABLE else None
+    if num_threads and TORCH_AVAILABLE:
+        torch.set_num_threads(num_threads)
+    try:
+        model.encode(texts[:batch_size], batch_size=batch_size)  # Warm-up: allocations, lazy init
+        timings = []
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            model.encode(texts, batch_size=batch_size)
+            timings.append(time.perf_counter() - start_time)
+        return min(timings)
+    finally:
+        if previous_threads is not None:
+            torch.set_num_threads(previous_threads)
+
+
+def throughput_sweep(model, input_sets: Dict[str, List[str]], batch_sizes: List[int],
+                     thread_counts: List[int], precisions: List[str], repeats: int = 1) -> List[Dict]:
+    """Time every (input set, precision, threads, batch size) combination; returns one dict per run."""
+    token_counts = {name: count_tokens(model, texts) for name, texts in input_sets.items()}
+    runs = []
+    for precision in precisions:
+        try:
+            variant = model_with_precision(model, precision)
+        except Exception as e:
+            print(f"   {precision}: not supported here ({e})")
+            continue
+        for name, texts in input_sets.items():
+            for num_threads in thread_counts:
+                for batch_size in batch_sizes:
+                    try:
+                        seconds = time_encode(variant, texts, batch_size, num_threads, repeats)
+                    except Exception as e:
+                        print(f"   {name} {precision} threads={num_threads} batch={batch_size}: failed ({e})")
+                        continue
+                    run = {
+                        'inputs': name,
+                        'precision': precision,
+                        'threads': num_threads,
+                        'batch_size': batch_size,
+                        'num_docs': len(texts),
+                        'num_tokens': token_counts[name],
+                        'mean_tokens_per_doc': token_counts[name] / len(texts),
+                        'seconds': seconds,
+                        'docs_per_sec': len(texts) / seconds,
+                        'tokens_per_sec': token_counts[name] / seconds
+                    }
+                    runs.append(run)
+                    print(f"   {name:>14} {precision:>8} threads={num_threads:>3} batch={batch_size:>4}: "
+                          f"{run['docs_per_sec']:9.1f} docs/s | {run['tokens_per_sec']:10.0f} tokens/s")
+    return runs
+
+
+def best_runs(runs: List[Dict]) -> Dict[str, Dict]:
+    """Fastest configuration (by tokens/sec) for each input set."""
+    best = {}
+    for run in runs:
+        if run['inputs'] not in best or run['tokens_per_sec'] > best[run['inputs']]['tokens_per_sec']:
+            best[run['inputs']] = run
+    return best
+
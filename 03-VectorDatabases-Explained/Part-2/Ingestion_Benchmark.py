@@ -0,0 +1,175 @@
+"""
+Ingestion benchmark for vector backends.
+
+Each (backend, corpus size, batch size) run builds an index in a fresh interpreter
+running this module, so the RSS it reports belongs to that build alone: it is not
+inflated by earlier runs or by the caller's imports (e.g. torch). Index training and
+batched inserts are timed separately, and the index is then persisted to measure its
+on-disk size.
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+from typing import Dict, Optional
+
+import numpy as np
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process right now."""
+    if PSUTIL_AVAILABLE:
+        return int(psutil.Process().memory_info().rss)
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class NpyRows:
+    """
+    Rows of a 2-D .npy file, read with plain file reads instead of a memory map, so the
+    input pages never count towards the RSS of the process building the index.
+    Supports len(), slices and integer-array indexing (how backends read train_vectors).
+    """
+
+    def __init__(self, path: str, num_rows: Optional[int] = None):
+        self._file = open(path, 'rb')
+        version = np.lib.format.read_magic(self._file)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, self.dtype = read_header(self._file)
+        if len(shape) != 2 or fortran_order:
+            raise ValueError(f"{path} does not hold a C-ordered 2-D array")
+        self._offset = self._file.tell()
+        self.shape = (shape[0] if num_rows is None else min(num_rows, shape[0]), shape[1])
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def _read(self, start: int, count: int) -> np.ndarray:
+        self._file.seek(self._offset + start * self.shape[1] * self.dtype.itemsize)
+        return np.fromfile(self._file, dtype=self.dtype, count=count * self.shape[1]).reshape(count, self.shape[1])
+
+    def __getitem__(self, index) -> np.ndarray:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            return self._read(start, max(0, stop - start))[::step]
+        index = np.asarray(index)
+        if index.ndim == 0:
+            return self._read(int(index), 1)[0]
+        if not len(index):
+            return np.empty((0, self.shape[1]), dtype=self.dtype)
+        return np.concatenate([self._read(int(row), 1) for row in index])
+
+    def close(self):
+        self._file.close()
+
+
+def directory_size(path: str) -> int:
+    """Total size of the files under `path`."""
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path) for name in files
+    )
+
+
+def measure_ingestion(backend_name: str, options: Dict, vectors_path: str, num_vectors: int,
+                      batch_size: int, work_dir: str) -> Dict:
+    """
+    Build one backend over the first `num_vectors` rows of a .npy file and measure it.
+    RSS is sampled after training and after every batch; its peak minus a baseline taken
+    once the libraries are imported is the memory the build itself needed.
+    Runs in whatever process calls it; use run_isolated for a clean measurement.
+    """
+    from Vector_Backends import create_backend
+
+    vectors = NpyRows(vectors_path, num_vectors)
+    num_vectors = len(vectors)
+    backend = create_backend(backend_name, **options)
+    baseline_rss = current_rss_bytes()
+    rss_samples = []
+
+    start_time = time.perf_counter()
+    backend.build(vectors.shape[1], train_vectors=vectors)
+    train_time = time.perf_counter() - start_time
+    rss_samples.append(current_rss_bytes())
+
+    add_time = 0.0
+    for start in range(0, num_vectors, batch_size):
+        batch = np.asarray(vectors[start:start + batch_size], dtype=np.float32)
+        start_time = time.perf_counter()
+        backend.add_batch(batch)
+        add_time += time.perf_counter() - start_time
+        del batch  # Only the index should stay resident between samples
+        rss_samples.append(current_rss_bytes())
+    vectors.close()
+
+    peak_rss = max(rss_samples) if None not in rss_samples else None
+    memory_bytes = backend.memory_bytes()
+    disk_bytes = backend.disk_bytes(work_dir)
+    backend.teardown()
+
+    build_time = train_time + add_time
+    footprint = disk_bytes if disk_bytes is not None else memory_bytes
+    return {
+        'backend': backend_name,
+        'num_vectors': int(num_vectors),
+        'batch_size': int(batch_size),
+        'train_time_s': train_time,
+        'add_time_s': add_time,
+        'build_time_s': build_time,
+        'vectors_per_sec': num_vectors / build_time if build_time > 0 else None,
+        'baseline_rss_bytes': baseline_rss,
+        'peak_rss_bytes': peak_rss,
+        'rss_growth_bytes': peak_rss - baseline_rss if peak_rss is not None and baseline_rss is not None else None,
+        'memory_bytes': memory_bytes,
+        'disk_bytes': disk_bytes,
+        'bytes_per_vector': footprint / num_vectors if footprint is not None else None
+    }
+
+
+def run_isolated(backend_name: str, options: Dict, vectors_path: str, num_vectors: int,
+                 batch_size: int, isolate: bool = True) -> Dict:
+    """
+    measure_ingestion in a new interpreter running this module, with a temporary directory
+    for the persisted index. A multiprocessing child would re-import the caller's __main__
+    (and torch with it), and forking after FAISS has started OpenMP threads can hang.
+    """
+    with tempfile.TemporaryDirectory(prefix=f"ingest_{backend_name}_") as work_dir:
+        if not isolate:
+            return measure_ingestion(backend_name, options, vectors_path, num_vectors, batch_size, work_dir)
+        request = {
+            'backend_name': backend_name,
+            'options': options,
+            'vectors_path': os.path.abspath(vectors_path),
+            'num_vectors': int(num_vectors),
+            'batch_size': int(batch_size),
+            'work_dir': work_dir
+        }
+        result_path = os.path.join(work_dir, "result.json")
+        worker = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), json.dumps(request), result_path],
+            stderr=subprocess.PIPE, text=True
+        )
+        if worker.returncode != 0:
+            lines = worker.stderr.strip().splitlines()
+            raise RuntimeError(lines[-1] if lines else f"worker exited with code {worker.returncode}")
+        with open(result_path) as f:
+            return json.load(f)
+
+
+if __name__ == '__main__':
+    # Worker entry point of run_isolated: <request JSON> <result path>
+    result = measure_ingestion(**json.loads(sys.argv[1]))
+    with open(sys.argv[2], 'w') as f:
+        json.dump(result, f)
@@ -0,0 +1,132 @@
+"""
+Concurrent load generators for vector search backends.
+
+closed_loop: N clients, each sends its next query as soon as the previous one returns
+             (throughput is whatever the backend sustains at that concurrency).
+open_loop:   queries arrive at a target rate (Poisson arrivals) regardless of how fast
+             the backend answers; latency is measured from the scheduled arrival time,
+             so queueing delay is included and overload shows up as exploding tails.
+
+Sweeping concurrency (closed loop) or arrival rate (open loop) gives the throughput
+vs tail-latency curve of a backend.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from Benchmark_Corpus import latency_summary
+
+
+def _client_loop(search: Callable, queries: Sequence, first: int, step: int, duration_s: float) -> List[float]:
+    """Issue queries back to back for duration_s; returns per-query latencies (seconds)."""
+    latencies = []
+    position = first
+    deadline = time.perf_counter() + duration_s
+    while time.perf_counter() < deadline:
+        start_time = time.perf_counter()
+        search(queries[position % len(queries)])
+        latencies.append(time.perf_counter() - start_time)
+        position += step
+    return latencies
+
+
+def _process_client(searcher_factory: Callable, queries: Sequence, first: int, step: int, duration_s: float):
+    """Closed-loop client in a worker process: builds its own searcher, then runs the loop."""
+    search = searcher_factory()
+    start_time = time.perf_counter()
+    latencies = _client_loop(search, queries, first, step, duration_s)
+    return latencies, time.perf_counter() - start_time
+
+
+def closed_loop(search: Optional[Callable], queries: Sequence, concurrency: int, duration_s: float = 5.0,
+                pool: str = 'thread', searcher_factory: Optional[Callable] = None) -> Dict:
+    """
+    Run `concurrency` clients for duration_s and report throughput and latency percentiles.
+    pool='process' runs each client in its own process; it needs a picklable
+    `searcher_factory` (called once per process) instead of `search`.
+    """
+    if pool == 'thread':
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            per_client = list(executor.map(
+                lambda client: _client_loop(search, queries, client, concurrency, duration_s), range(concurrency)
+            ))
+        elapsed = time.perf_counter() - start_time
+        latencies = [latency for client in per_client for latency in client]
+        throughput = len(latencies) / elapsed
+    elif pool == 'process':
+        with ProcessPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(_process_client, searcher_factory, queries, client, concurrency, duration_s)
+                for client in range(concurrency)
+            ]
+            per_client = [future.result() for future in futures]
+        latencies = [latency for client_latencies, _ in per_client for latency in client_latencies]
+        # Processes start at slightly different times, so add up each client's own rate
+        throughput = sum(len(client_latencies) / elapsed for client_latencies, elapsed in per_client)
+    else:
+        raise ValueError(f"Unknown pool type: {pool}")
+
+    return {'mode': 'closed_loop', 'concurrency': concurrency, 'pool': pool,
+            'throughput_qps': float(throughput), **latency_summary(latencies)}
+
+
+def open_loop(search: Callable, queries: Sequence, rate_qps: float, duration_s: float = 5.0,
+              max_workers: int = 64, seed: int = 0) -> Dict:
+    """
+    Send queries with exponential inter-arrival times at `rate_qps` for duration_s.
+    Latency counts from each query's scheduled arrival, so time spent waiting for a free
+    worker is included (no coordinated omission).
+    """
+    num_requests = max(1, int(rate_qps * duration_s))
+    arrivals = np.cumsum(np.random.default_rng(seed).exponential(1.0 / rate_qps, num_requests))
+    latencies = []
+
+    def run(position, scheduled_at):
+        search(queries[position % len(queries)])
+        latencies.append(time.perf_counter() - scheduled_at)  # list.append is atomic
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for position, offset in enumerate(arrivals):
+            scheduled_at = start_time + offset
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(executor.submit(run, position, scheduled_at))
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start_time
+
+    return {'mode': 'open_loop', 'offered_qps': float(rate_qps),
+            'throughput_qps': float(num_requests / elapsed), **latency_summary(latencies)}
+
+
+def qps_latency_curve(search: Callable, queries: Sequence, concurrency_levels: Sequence[int] = (1, 2, 4, 8, 16),
+                      rates: Optional[Sequence[float]] = None, duration_s: float = 5.0,
+                      pool: str = 'thread', searcher_factory: Optional[Callable] = None) -> Dict:
+    """
+    Closed-loop sweep over concurrency levels, then an open-loop sweep over arrival rates.
+    Without explicit rates, the open loop offers 25%..125% of the best closed-loop throughput.
+    `pool` and `searcher_factory` apply to the closed loop; the open loop has a single
+    scheduler and always submits to threads.
+    """
+    closed = [closed_loop(search, queries, concurrency, duration_s, pool, searcher_factory)
+              for concurrency in concurrency_levels]
+    for point in closed:
+        print(f"      closed loop c={point['concurrency']:>3}: {point['throughput_qps']:8.1f} QPS | "
+              f"p95 {point['p95_ms']:.2f}ms | p99 {point['p99_ms']:.2f}ms")
+
+    if rates is None:
+        peak = max(point['throughput_qps'] for point in closed)
+        rates = [peak * fraction for fraction in (0.25, 0.5, 0.75, 0.9, 1.0, 1.25)]
+    opened = [open_loop(search, queries, rate, duration_s) for rate in rates]
+    for point in opened:
+        print(f"      open loop {point['offered_qps']:8.1f} QPS offered: {point['throughput_qps']:8.1f} QPS | "
+              f"p95 {point['p95_ms']:.2f}ms | p99 {point['p99_ms']:.2f}ms")
+
+    return {'closed_loop': closed, 'open_loop': opened}
@@ -0,0 +1,268 @@
+"""
+Append-only history of benchmark runs, with regression detection.
+
+Every run of Vector_DataBases_Comparsion.py appends one JSON line tagged with the git
+commit, a fingerprint of the host (CPU, memory, library versions) and the benchmark
+configuration. Alongside the summary results each record keeps the raw per-query
+samples (latencies, recall), so two runs can be compared statistically:
+
+    python Results_History.py list
+    python Results_History.py compare                     # latest run vs the previous comparable one
+    python Results_History.py compare --baseline 3f2a9c1e --candidate latest
+
+compare bootstraps the difference in p95 latency and in mean recall per metric and
+exits with status 1 when a regression is both significant and larger than the tolerance.
+"""
+
+import os
+import sys
+import json
+import uuid
+import time
+import hashlib
+import argparse
+import platform
+import subprocess
+from importlib import metadata
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_HISTORY_PATH = os.getenv("BENCHMARK_HISTORY_PATH", "./benchmark_history.jsonl")
+
+# Libraries whose versions change benchmark numbers
+TRACKED_PACKAGES = ('numpy', 'faiss-cpu', 'chromadb', 'sentence-transformers', 'torch', 'pinecone-client')
+
+
+def fingerprint(data) -> str:
+    """Short stable hash of a JSON-serializable value."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12]
+
+
+def git_state() -> Dict:
+    """
+    Current commit and whether tracked files have uncommitted changes (None outside git).
+    Untracked files are ignored: the benchmark itself writes its results and history.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                capture_output=True, text=True, check=True).stdout
+        return {'commit': commit, 'dirty': bool(status.strip())}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+
+def cpu_model() -> str:
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def host_info() -> Dict:
+    """Hardware and software the numbers depend on, plus a fingerprint of all of it."""
+    try:
+        memory_bytes = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, AttributeError, OSError):
+        memory_bytes = None
+    packages = {}
+    for package in TRACKED_PACKAGES:
+        try:
+            packages[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            packages[package] = None
+    info = {
+        'hostname': platform.node(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpu': cpu_model(),
+        'cpu_count': os.cpu_count(),
+        'memory_bytes': memory_bytes,
+        'packages': packages
+    }
+    # The hostname is informative only: identical machines should share a fingerprint
+    info['fingerprint'] = fingerprint({key: value for key, value in info.items() if key != 'hostname'})
+    return info
+
+
+def append_run(results: Dict, config: Dict, samples: Dict[str, List[float]],
+               path: str = DEFAULT_HISTORY_PATH) -> Dict:
+    """Append one run to the history file and return the record."""
+    record = {
+        'run_id': uuid.uuid4().hex[:8],
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git': git_state(),
+        'host': host_info(),
+        'config': config,
+        'config_fingerprint': fingerprint(config),
+        'results': results,
+        'samples': {key: [round(float(value), 6) for value in values] for key, values in samples.items()}
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, default=str) + "\n")
+    return record
+
+
+def load_runs(path: str = DEFAULT_HISTORY_PATH) -> List[Dict]:
+    """All recorded runs, oldest first."""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_run(runs: List[Dict], run_id: str) -> Dict:
+    """A run by id prefix or git commit prefix (the latest match), or 'latest'."""
+    if run_id == 'latest':
+        return runs[-1]
+    for run in reversed(runs):
+        if run['run_id'].startswith(run_id) or (run['git'].get('commit') or '').startswith(run_id):
+            return run
+    raise KeyError(f"No run matching '{run_id}'")
+
+
+def default_baseline(runs: List[Dict], candidate: Dict) -> Optional[Dict]:
+    """Most recent earlier run with the same configuration on the same kind of host."""
+    earlier = runs[:next(i for i, run in enumerate(runs) if run['run_id'] == candidate['run_id'])]
+    for run in reversed(earlier):
+        if (run['config_fingerprint'] == candidate['config_fingerprint']
+                and run['host']['fingerprint'] == candidate['host']['fingerprint']):
+            return run
+    return None
+
+
+def bootstrap_difference(baseline: np.ndarray, candidate: np.ndarray, statistic, num_resamples: int = 2000,
+                         seed: int = 0) -> np.ndarray:
+    """Bootstrap distribution of statistic(candidate) - statistic(baseline)."""
+    rng = np.random.default_rng(seed)
+    baseline_resamples = rng.choice(baseline, (num_resamples, len(baseline)), replace=True)
+    candidate_resamples = rng.choice(candidate, (num_resamples, len(candidate)), replace=True)
+    return statistic(candidate_resamples, axis=1) - statistic(baseline_resamples, axis=1)
+
+
+def p95(values, axis=None):
+    return np.percentile(values, 95, axis=axis)
+
+
+def compare_runs(baseline: Dict, candidate: Dict, alpha: float = 0.05, latency_tolerance: float = 0.10,
+                 recall_tolerance: float = 0.01) -> List[Dict]:
+    """
+    Compare every sampled metric present in both runs.
+
+    Latency metrics (*.latency_ms): regression when p95 grew by more than `latency_tolerance`
+    (relative) and the one-sided bootstrap interval of the difference lies above zero.
+    Recall metrics (*.recall): regression when mean recall dropped by more than `recall_tolerance`
+    (absolute) and the one-sided bootstrap interval lies below zero.
+    """
+    findings = []
+    for metric in sorted(set(baseline['samples']) & set(candidate['samples'])):
+        base = np.asarray(baseline['samples'][metric], dtype=np.float64)
+        cand = np.asarray(candidate['samples'][metric], dtype=np.float64)
+        if len(base) < 2 or len(cand) < 2:
+            continue
+
+        if metric.endswith('latency_ms'):
+            base_value, cand_value = float(p95(base)), float(p95(cand))
+            lower_bound = float(np.quantile(bootstrap_difference(base, cand, p95), alpha))
+            change = (cand_value - base_value) / base_value if base_value > 0 else 0.0
+            regression = lower_bound > 0 and change > latency_tolerance
+            statistic = 'p95'
+        elif metric.endswith('recall'):
+            base_value, cand_value = float(base.mean()), float(cand.mean())
+            upper_bound = float(np.quantile(bootstrap_difference(base, cand, np.mean), 1 - alpha))
+            change = cand_value - base_value
+            regression = upper_bound < 0 and -change > recall_tolerance
+            statistic = 'mean'
+        else:
+            continue
+
+        findings.append({
+            'metric': metric,
+            'statistic': statistic,
+            'baseline': base_value,
+            'candidate': cand_value,
+            'change': change,
+            'regression': bool(regression)
+        })
+    return findings
+
+
+def print_comparison(baseline: Dict, candidate: Dict, findings: List[Dict]):
+    print(f"Baseline : {baseline['run_id']} ({baseline['timestamp']}, commit {(baseline['git']['commit'] or '?')[:10]})")
+    print(f"Candidate: {candidate['run_id']} ({candidate['timestamp']}, commit {(candidate['git']['commit'] or '?')[:10]})")
+    if baseline['host']['fingerprint'] != candidate['host']['fingerprint']:
+        print("⚠️  Runs come from different hosts or library versions; differences may not be regressions")
+    if baseline['config_fingerprint'] != candidate['config_fingerprint']:
+        print("⚠️  Runs used different benchmark configurations")
+    for finding in findings:
+        status = "❌ REGRESSION" if finding['regression'] else "✅"
+        change = (f"{finding['change']:+.1%}" if finding['metric'].endswith('latency_ms')
+                  else f"{finding['change']:+.4f}")
+        print(f"  {status} {finding['metric']} ({finding['statistic']}): "
+              f"{finding['baseline']:.4f} -> {finding['candidate']:.4f} ({change})")
+    if not findings:
+        print("  No metrics in common to compare")
+
+
+def check_regressions(candidate: Dict, path: str = DEFAULT_HISTORY_PATH, baseline_id: Optional[str] = None,
+                      **tolerances) -> bool:
+    """Compare a run against its baseline and print the result; True if anything regressed."""
+    runs = load_runs(path)
+    if baseline_id:
+        # A commit id also matches the candidate when it was measured on the same commit
+        baseline = find_run([run for run in runs if run['run_id'] != candidate['run_id']], baseline_id)
+    else:
+        baseline = default_baseline(runs, candidate)
+    if baseline is None:
+        print("No comparable baseline run in the history yet")
+        return False
+    findings = compare_runs(baseline, candidate, **tolerances)
+    print_comparison(baseline, candidate, findings)
+    return any(finding['regression'] for finding in findings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark result history")
+    parser.add_argument("--path", default=DEFAULT_HISTORY_PATH, help="History file (JSON lines)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("list", help="List recorded runs")
+
+    compare = subparsers.add_parser("compare", help="Flag p95 latency / recall regressions; exit 1 if any")
+    compare.add_argument("--baseline", help="Run id or git commit (default: previous comparable run)")
+    compare.add_argument("--candidate", default="latest", help="Run id or git commit (default: latest)")
+    compare.add_argument("--alpha", type=float, default=0.05, help="One-sided significance level")
+    compare.add_argument("--latency-tolerance", type=float, default=0.10,
+                         help="Relative p95 increase tolerated (0.10 = 10%%)")
+    compare.add_argument("--recall-tolerance", type=float, default=0.01, help="Absolute recall drop tolerated")
+    args = parser.parse_args()
+
+    runs = load_runs(args.path)
+    if not runs:
+        print(f"No runs recorded in {args.path}")
+        sys.exit(0 if args.command == "list" else 2)
+
+    if args.command == "list":
+        for run in runs:
+            print(f"{run['run_id']}  {run['timestamp']}  commit {(run['git']['commit'] or '?')[:10]}"
+                  f"{'+dirty' if run['git'].get('dirty') else ''}  host {run['host']['fingerprint']}  "
+                  f"config {run['config_fingerprint']}  {len(run['samples'])} metrics")
+        return
+
+    candidate = find_run(runs, args.candidate)
+    regressed = check_regressions(
+        candidate, args.path, args.baseline,
+        alpha=args.alpha, latency_tolerance=args.latency_tolerance, recall_tolerance=args.recall_tolerance
+    )
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,814 @@
+"""
+Vector backend adapters for VectorDatabaseComparison.
+
+Every backend implements the same small interface, so the benchmark harness can
+loop over backends instead of branching on each database:
+
+    backend = create_backend('hnsw', M=32, ef_search=64)
+    backend.build(dimension, train_vectors)        # create an empty index
+    backend.add_batch(vectors, documents, metadatas)  # ids are assigned in insertion order
+    scores, ids = backend.search_batch(queries, k)  # (Q, k) arrays, best first, -1 padded
+    backend.search_batch(queries, k, where={'rank': {'$lt': 0.01}})  # metadata-filtered top-k
+    backend.memory_bytes()                          # index footprint, None if not measurable
+    backend.disk_bytes(directory)                   # persisted size, None if not measurable
+    backend.teardown()
+
+Vectors are expected to be L2-normalized float32, so inner product is cosine similarity.
+New engines are added with @register_backend('name') and become available to every
+benchmark mode (--backends name).
+"""
+
+import os
+import abc
+import glob
+import json
+import time
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from Benchmark_Corpus import blocked_top_k
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+try:
+    import chromadb
+    CHROMADB_AVAILABLE = True
+except ImportError:
+    CHROMADB_AVAILABLE = False
+
+try:
+    from pinecone import Pinecone, ServerlessSpec
+    PINECONE_AVAILABLE = True
+except ImportError:
+    PINECONE_AVAILABLE = False
+
+
+BACKENDS = {}
+
+
+def register_backend(name: str):
+    """Class decorator adding a VectorBackend subclass to the registry under `name`."""
+    def decorator(cls):
+        cls.name = name
+        BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+def create_backend(name: str, **options) -> 'VectorBackend':
+    """Instantiate a registered backend, raising ImportError if its library is missing."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend: {name} (registered: {', '.join(sorted(BACKENDS))})")
+    cls = BACKENDS[name]
+    if not cls.is_available():
+        raise ImportError(f"{name} backend is not available. Install with: {cls.install_hint}")
+    return cls(**options)
+
+
+def available_backends() -> List[str]:
+    """Names of registered backends whose libraries are installed."""
+    return [name for name, cls in BACKENDS.items() if cls.is_available()]
+
+
+def _pad_results(scores: List[List[float]], ids: List[List[int]], k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Stack ragged per-query results into (Q, k) arrays padded with -inf / -1."""
+    padded_scores = np.full((len(ids), k), -np.inf, dtype=np.float32)
+    padded_ids = np.full((len(ids), k), -1, dtype=np.int64)
+    for row, (row_scores, row_ids) in enumerate(zip(scores, ids)):
+        padded_scores[row, :len(row_ids)] = row_scores
+        padded_ids[row, :len(row_ids)] = row_ids
+    return padded_scores, padded_ids
+
+
+WHERE_OPERATORS = {
+    '$eq': lambda column, value: column == value,
+    '$ne': lambda column, value: column != value,
+    '$lt': lambda column, value: column < value,
+    '$lte': lambda column, value: column <= value,
+    '$gt': lambda column, value: column > value,
+    '$gte': lambda column, value: column >= value,
+    '$in': lambda column, value: np.isin(column, value),
+    '$nin': lambda column, value: ~np.isin(column, value)
+}
+
+
+def where_mask(column, where: Dict, count: int) -> np.ndarray:
+    """
+    Boolean mask of the rows matching a ChromaDB-style `where` filter, e.g.
+    {'rank': {'$lt': 0.1}}, {'source': 'web'} or {'$and': [{...}, {...}]}.
+    `column(field)` returns the metadata values of every row for a field.
+    """
+    mask = np.ones(count, dtype=bool)
+    for field, condition in where.items():
+        if field in ('$and', '$or'):
+            masks = [where_mask(column, clause, count) for clause in condition]
+            mask &= np.logical_and.reduce(masks) if field == '$and' else np.logical_or.reduce(masks)
+            continue
+        values = column(field)
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        for operator, value in condition.items():
+            mask &= WHERE_OPERATORS[operator](values, value)
+    return mask
+
+
+def post_filter_search(search, mask: np.ndarray, queries: np.ndarray, k: int, expansion: int = 4):
+    """
+    Filtered top-k from an unfiltered `search(queries, n)`: fetch k * expansion candidates,
+    keep those passing `mask`, and fetch 4x more for queries still short of k results,
+    up to the whole index.
+    """
+    ntotal = len(mask)
+    scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    ids = np.full((len(queries), k), -1, dtype=np.int64)
+    pending = np.arange(len(queries))
+    fetch = min(ntotal, k * expansion)
+    while len(pending):
+        candidate_scores, candidate_ids = search(queries[pending], fetch)
+        valid = candidate_ids >= 0
+        keep = valid & mask[np.where(valid, candidate_ids, 0)]
+        short = []
+        for row, query in enumerate(pending):
+            kept = np.flatnonzero(keep[row])[:k]
+            scores[query, :len(kept)] = candidate_scores[row, kept]
+            ids[query, :len(kept)] = candidate_ids[row, kept]
+            if len(kept) < k:
+                short.append(query)
+        if fetch >= ntotal:
+            break  # Everything was searched: fewer than k documents pass the filter
+        pending = np.asarray(short, dtype=np.int64)
+        fetch = min(ntotal, fetch * 4)
+    return scores, ids
+
+
+def rescore(queries: np.ndarray, shortlist: np.ndarray, float_vectors: np.ndarray, k: int):
+    """
+    Exact inner-product top-k among a (Q, n) shortlist of ids (-1 = padding), rescored with
+    `float_vectors` (in RAM or memory-mapped: only the shortlisted rows are read).
+    """
+    valid = shortlist >= 0
+    rows = np.asarray(float_vectors[np.where(valid, shortlist, 0).ravel()], dtype=np.float32)
+    exact_scores = np.einsum('qd,qnd->qn', queries, rows.reshape(shortlist.shape + (-1,)))
+    exact_scores[~valid] = -np.inf
+    order = np.argsort(-exact_scores, axis=1, kind='stable')[:, :k]
+    scores = np.take_along_axis(exact_scores, order, axis=1)
+    ids = np.take_along_axis(shortlist, order, axis=1)
+    ids[np.isneginf(scores)] = -1
+    return _pad_results(scores, ids, k)
+
+
+def ivfpq_parameters(num_vectors: int, dimension: int, nlist: Optional[int] = None,
+                     m: Optional[int] = None, nbits: int = 8) -> Tuple[int, int, int]:
+    """
+    IVF-PQ sizes that also work for small corpora: nlist ~ 4 * sqrt(N) coarse centroids
+    (at least 39 training points each), m = largest divisor of the dimension <= dimension / 8,
+    nbits lowered when there are fewer than 2**nbits training points per codebook.
+    Deliberate copy of ivfpq_parameters in 06-Retrieval-Techniques/Dense_Indexes.py (tutorial
+    folders never import from each other), so change both together.
+    """
+    nlist = nlist or max(1, min(int(4 * np.sqrt(num_vectors)), num_vectors // 39))
+    m = m or max(divisor for divisor in range(1, max(1, dimension // 8) + 1) if dimension % divisor == 0)
+    nbits = max(1, min(nbits, int(np.log2(max(num_vectors, 2)))))
+    return nlist, m, nbits
+
+
+class FloatVectorStore:
+    """
+    Append-only float32 matrix holding the vectors that quantized indexes rescore with.
+    storage='disk' appends the rows to a raw file and reads them back through a memory map,
+    so they stay out of the process heap and only shortlisted rows are paged in;
+    storage='memory' keeps them in RAM.
+    """
+
+    def __init__(self, dimension: int, storage: str = 'disk'):
+        if storage not in ('disk', 'memory'):
+            raise ValueError(f"Unknown rescore storage: {storage}")
+        self.dimension = dimension
+        self.storage = storage
+        self.count = 0
+        self._blocks = []
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        if storage == 'disk':
+            fd, self.path = tempfile.mkstemp(prefix="rescore_", suffix=".f32")
+            self._file = os.fdopen(fd, 'wb')
+
+    def append(self, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.storage == 'disk':
+            self._file.write(vectors.tobytes())
+        else:
+            self._blocks.append(vectors)
+        self.count += len(vectors)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if self.storage == 'disk':
+            if len(self._vectors) != self.count:
+                self._file.flush()
+                self._vectors = np.memmap(self.path, dtype=np.float32, mode='r', shape=(self.count, self.dimension))
+        elif self._blocks:
+            # Concatenate lazily so adding many batches stays linear
+            self._vectors = np.concatenate([self._vectors] + self._blocks)
+            self._blocks = []
+        return self._vectors
+
+    def resident_bytes(self) -> int:
+        """Heap bytes held by the store (the memory-mapped file is not counted)."""
+        return 0 if self.storage == 'disk' else int(self.vectors.nbytes)
+
+    def close(self):
+        self._blocks, self._vectors = [], None
+        if self.storage == 'disk':
+            self._file.close()
+            os.remove(self.path)
+
+
+def load_index_searcher(index_path: str, k: int):
+    """
+    Load an index written by a FAISS-based backend's save() and return query vector -> top-k ids.
+    Quantized indexes are saved with their float vectors, which are memory-mapped for rescoring.
+    """
+    meta_path = index_path + ".json"
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+    binary = meta.get('quantization') == 'binary'
+    index = faiss.read_index_binary(index_path) if binary else faiss.read_index(index_path)
+    rescore_multiplier = meta.get('rescore_multiplier')
+    float_vectors = np.load(index_path + ".floats.npy", mmap_mode='r') if rescore_multiplier else None
+
+    def search(query):
+        query = np.ascontiguousarray(query[None, :], dtype=np.float32)
+        if float_vectors is None:
+            return index.search(query, k)[1][0]
+        first_pass_query = np.packbits(query > 0, axis=1) if binary else query
+        _, shortlist = index.search(first_pass_query, min(k * rescore_multiplier, index.ntotal))
+        return rescore(query, shortlist, float_vectors, k)[1][0]
+    return search
+
+
+class VectorBackend(abc.ABC):
+    """Interface shared by all backends; subclasses implement add_batch/search_batch and extend build."""
+
+    name = 'base'
+    install_hint = ''
+    remote = False       # Hosted services are skipped by the large-corpus benchmarks
+    persistable = False  # save() writes an index file that load_index_searcher can open
+    features = {}        # Capabilities reported by analyze_feature_richness
+
+    def __init__(self):
+        self.dimension = None
+        self.count = 0
+        self._metadata = {}
+        self._mask_cache = (None, None)
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return True
+
+    def build(self, dimension: int, train_vectors: Optional[np.ndarray] = None):
+        """Create an empty index; `train_vectors` is a representative set for trained indexes."""
+        self.dimension = dimension
+        self.count = 0
+        self._metadata = {}
+        self._mask_cache = (None, None)
+
+    def _store_metadata(self, metadatas: Optional[List[Dict]], num_vectors: int):
+        """Keep metadata as per-field columns for in-process filtering (call before updating count)."""
+        if metadatas is None:
+            if not self._metadata:
+                return
+            metadatas = [{}] * num_vectors  # Keep existing columns aligned with the ids
+        for field in set().union(*metadatas) - set(self._metadata):
+            self._metadata[field] = [None] * self.count
+        for field, values in self._metadata.items():
+            values.extend(metadata.get(field) for metadata in metadatas)
+        self._mask_cache = (None, None)
+
+    def filter_mask(self, where: Dict) -> np.ndarray:
+        """Rows matching `where`; the last mask is cached since benchmarks repeat the same filter."""
+        key = json.dumps(where, sort_keys=True)
+        if self._mask_cache[0] != key:
+            if not self._metadata:
+                raise ValueError(f"{self.name} backend has no metadata to filter on")
+            columns = {}
+
+            def column(field):
+                if field not in columns:
+                    columns[field] = np.asarray(self._metadata.get(field, [None] * self.count))
+                return columns[field]
+            self._mask_cache = (key, where_mask(column, where, self.count))
+        return self._mask_cache[1]
+
+    @abc.abstractmethod
+    def add_batch(self, vectors: np.ndarray, documents: Optional[List[str]] = None,
+                  metadatas: Optional[List[Dict]] = None):
+        """Append vectors; they get ids count..count+len(vectors)-1."""
+
+    @abc.abstractmethod
+    def search_batch(self, queries: np.ndarray, k: int, where: Optional[Dict] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (scores, ids) for each query row, among vectors whose metadata match `where`."""
+
+    def memory_bytes(self) -> Optional[int]:
+        """Bytes held by the index, or None when the engine does not expose it."""
+        return None
+
+    def save(self, path: str):
+        """Write the index to disk so worker processes can load it with load_index_searcher (persistable backends)."""
+        raise TypeError(f"{self.name} backend cannot be saved to a file")
+
+    def disk_bytes(self, directory: str) -> Optional[int]:
+        """Persist the index under `directory` and return its size on disk, or None if it cannot be."""
+        if not self.persistable:
+            return None
+        path = os.path.join(directory, f"{self.name}.index")
+        self.save(path)
+        return sum(os.path.getsize(written) for written in glob.glob(glob.escape(path) + "*"))  # With side files
+
+    def teardown(self):
+        """Release the index and any external resources."""
+
+
+# =============================================================================
+# IN-PROCESS BACKENDS
+# =============================================================================
+
+@register_backend('numpy')
+class NumpyBackend(VectorBackend):
+    """Exact brute-force search with NumPy: the recall reference and the latency floor to beat."""
+
+    features = {
+        'metadata_support': True,
+        'built_in_embeddings': False,
+        'cloud_managed': False,
+        'auto_scaling': False,
+        'real_time_updates': True,
+        'backup_restore': False,
+        'monitoring': False,
+        'multi_tenancy': False,
+        'cost': 'Free',
+        'setup_complexity': 'Low',
+        'production_ready': 'Low (exact, O(N) per query)'
+    }
+
+    def build(self, dimension, train_vectors=None):
+        super().build(dimension)
+        self._blocks = []
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+
+    def add_batch(self, vectors, documents=None, metadatas=None):
+        self._blocks.append(np.array(vectors, dtype=np.float32))
+        self._store_metadata(metadatas, len(vectors))
+        self.count += len(vectors)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if self._blocks:
+            # Concatenate lazily so adding many batches stays linear
+            self._vectors = np.concatenate([self._vectors] + self._blocks)
+            self._blocks = []
+        return self._vectors
+
+    def search_batch(self, queries, k, where=None):
+        mask = self.filter_mask(where) if where is not None else None
+        scores, ids = blocked_top_k(queries, self.vectors, min(k, self.count), mask=mask)
+        return scores.astype(np.float32), ids
+
+    def memory_bytes(self):
+        return int(self.vectors.nbytes)
+
+    def disk_bytes(self, directory):
+        path = os.path.join(directory, "numpy_vectors.npy")
+        np.save(path, self.vectors)
+        return os.path.getsize(path)
+
+    def teardown(self):
+        self._blocks, self._vectors = [], None
+
+
+@register_backend('faiss')
+class FaissBackend(VectorBackend):
+    """
+    FAISS index in one of four storage modes: 'float32' (flat), 'int8' (scalar quantized),
+    'binary' (1-bit Hamming) or 'ivfpq' (inverted lists of product-quantized codes).
+    Quantized modes search their codes for a shortlist of k * rescore_multiplier candidates
+    and rescore it with the float vectors, kept in a FloatVectorStore: memory-mapped from
+    disk by default (rescore_storage='disk'), so RAM holds only the codes, or in RAM
+    (rescore_storage='memory'), in which case memory_bytes counts them.
+
+    FAISS stores no metadata, so filters are evaluated on columns kept by the adapter and
+    applied with `filter_strategy` 'selector' (an IDSelectorBitmap inside the search, so only
+    matching ids are returned) or 'post' (search unfiltered, drop non-matching results and
+    fetch more when fewer than k remain). Binary mode always post-filters.
+    """
+
+    install_hint = 'pip install faiss-cpu'
+    persistable = True
+    features = {
+        'metadata_support': True,
+        'built_in_embeddings': False,
+        'cloud_managed': False,
+        'auto_scaling': False,
+        'real_time_updates': True,
+        'backup_restore': True,
+        'monitoring': False,
+        'multi_tenancy': False,
+        'cost': 'Free',
+        'setup_complexity': 'High',
+        'production_ready': 'High (with effort)'
+    }
+
+    def __init__(self, quantization: str = 'float32', rescore_multiplier: int = 4, nprobe: int = 8,
+                 filter_strategy: str = 'selector', post_filter_expansion: int = 4,
+                 rescore_storage: str = 'disk'):
+        super().__init__()
+        self.quantization = quantization
+        self.rescore_multiplier = rescore_multiplier
+        self.rescore_storage = rescore_storage
+        self.nprobe = nprobe
+        self.filter_strategy = filter_strategy
+        self.post_filter_expansion = post_filter_expansion
+        self.index = None
+        self.floats = None
+
+    @classmethod
+    def is_available(cls):
+        return FAISS_AVAILABLE
+
+    def build(self, dimension, train_vectors=None):
+        super().build(dimension)
+        self.teardown()
+
+        if self.quantization == 'float32':
+            self.index = faiss.IndexFlatIP(dimension)  # Inner Product for cosine similarity
+            return
+        if self.quantization == 'binary':
+            # Sign bits packed 8 per byte, searched by Hamming distance
+            self.index = faiss.IndexBinaryFlat(dimension)
+            self.floats = FloatVectorStore(dimension, self.rescore_storage)
+            return
+        if train_vectors is None:
+            raise ValueError(f"FAISS '{self.quantization}' mode needs train_vectors")
+
+        # Train on a sample: quantizers do not need the whole corpus
+        num_vectors = len(train_vectors)
+        sample = np.sort(np.random.default_rng(0).choice(num_vectors, min(num_vectors, 100000), replace=False))
+        sample = np.ascontiguousarray(train_vectors[sample], dtype=np.float32)
+
+        if self.quantization == 'int8':
+            # 8-bit scalar quantizer (one byte per dimension) for the first pass
+            index = faiss.IndexScalarQuantizer(
+                dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+        elif self.quantization == 'ivfpq':
+            # Coarse centroids + PQ codes (~m bytes/vector) for the first pass
+            nlist, m, nbits = ivfpq_parameters(num_vectors, dimension)
+            quantizer = faiss.IndexFlatIP(dimension)
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, m, nbits, faiss.METRIC_INNER_PRODUCT)
+            index.nprobe = self.nprobe  # Saved with the index for worker processes
+        else:
+            raise ValueError(f"Unknown FAISS quantization mode: {self.quantization}")
+
+        index.train(sample)
+        self.index = index
+        self.floats = FloatVectorStore(dimension, self.rescore_storage)
+
+    def add_batch(self, vectors, documents=None, metadatas=None):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.quantization == 'binary':
+            self.index.add(np.packbits(vectors > 0, axis=1))
+        else:
+            self.index.add(vectors)
+        if self.floats is not None:
+            self.floats.append(vectors)
+        self._store_metadata(metadatas, len(vectors))
+        self.count += len(vectors)
+
+    def search_batch(self, queries, k, where=None):
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        if where is None:
+            return self._search(queries, k)
+        mask = self.filter_mask(where)
+        if self.filter_strategy == 'post' or self.quantization == 'binary':
+            return post_filter_search(self._search, mask, queries, k, self.post_filter_expansion)
+        if self.filter_strategy != 'selector':
+            raise ValueError(f"Unknown filter strategy: {self.filter_strategy}")
+
+        bitmap = np.packbits(mask, bitorder='little')  # Must stay alive during the search
+        selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+        if self.quantization == 'ivfpq':
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=self.nprobe)
+        else:
+            params = faiss.SearchParameters(sel=selector)
+        if self.quantization == 'float32':
+            return self.index.search(queries, k, params=params)
+        # The selector applies to the first pass; rescoring only reorders its (matching) shortlist
+        _, shortlist = self.index.search(queries, min(k * self.rescore_multiplier, self.count), params=params)
+        return rescore(queries, shortlist, self.floats.vectors, k)
+
+    def _search(self, queries, k):
+        """Unfiltered search; quantized modes rescore a shortlist from the codes with the float vectors."""
+        if self.quantization == 'float32':
+            return self.index.search(queries, k)
+
+        # First pass over the codes (Hamming distance over packed sign bits in binary mode)
+        first_pass_queries = np.packbits(queries > 0, axis=1) if self.quantization == 'binary' else queries
+        _, shortlist = self.index.search(first_pass_queries, min(k * self.rescore_multiplier, self.count))
+
+        # Second pass: exact inner product on the shortlist only
+        return rescore(queries, shortlist, self.floats.vectors, k)
+
+    def code_bytes_per_vector(self) -> float:
+        """
+        Bytes per vector of the compressed codes used by the first search pass only
+        (memory_bytes and disk_bytes give the full footprint, rescoring vectors included).
+        """
+        if self.quantization == 'binary':
+            return self.index.code_size
+        if self.quantization == 'int8':
+            return self.dimension  # One byte per dimension
+        if self.quantization == 'ivfpq':
+            return self.index.code_size + 8  # PQ codes + int64 id in the inverted list
+        return self.dimension * 4
+
+    def memory_bytes(self):
+        """Index bytes in RAM, plus the rescoring vectors when they are kept in RAM."""
+        if self.quantization == 'binary':
+            index_bytes = faiss.serialize_index_binary(self.index).nbytes
+        else:
+            index_bytes = faiss.serialize_index(self.index).nbytes
+        return int(index_bytes + (self.floats.resident_bytes() if self.floats is not None else 0))
+
+    def save(self, path):
+        """Write the index; quantized modes also write their float vectors and a small JSON header."""
+        if self.quantization == 'binary':
+            faiss.write_index_binary(self.index, path)
+        else:
+            faiss.write_index(self.index, path)
+        if self.floats is not None:
+            np.save(path + ".floats.npy", self.floats.vectors)
+            with open(path + ".json", 'w') as f:
+                json.dump({'quantization': self.quantization, 'rescore_multiplier': self.rescore_multiplier}, f)
+
+    def teardown(self):
+        self.index = None
+        if self.floats is not None:
+            self.floats.close()
+            self.floats = None
+
+
+@register_backend('hnsw')
+class HNSWBackend(VectorBackend):
+    """
+    In-process HNSW graph (FAISS IndexHNSWFlat): approximate search in O(log N) hops.
+    M = graph degree, ef_construction / ef_search = candidate list size when building / searching.
+    Filters use `filter_strategy` 'selector' (non-matching nodes are traversed but never
+    returned) or 'post', as in FaissBackend.
+    """
+
+    install_hint = 'pip install faiss-cpu'
+    persistable = True
+    features = {
+        'metadata_support': True,
+        'built_in_embeddings': False,
+        'cloud_managed': False,
+        'auto_scaling': False,
+        'real_time_updates': True,
+        'backup_restore': True,
+        'monitoring': False,
+        'multi_tenancy': False,
+        'cost': 'Free',
+        'setup_complexity': 'Medium',
+        'production_ready': 'High (with effort)'
+    }
+
+    def __init__(self, M: int = 32, ef_construction: int = 200, ef_search: int = 64,
+                 filter_strategy: str = 'selector', post_filter_expansion: int = 4):
+        super().__init__()
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.filter_strategy = filter_strategy
+        self.post_filter_expansion = post_filter_expansion
+        self.index = None
+
+    @classmethod
+    def is_available(cls):
+        return FAISS_AVAILABLE
+
+    def build(self, dimension, train_vectors=None):
+        super().build(dimension)
+        self.index = faiss.IndexHNSWFlat(dimension, self.M, faiss.METRIC_INNER_PRODUCT)
+        self.index.hnsw.efConstruction = self.ef_construction
+        self.index.hnsw.efSearch = self.ef_search  # Saved with the index for worker processes
+
+    def add_batch(self, vectors, documents=None, metadatas=None):
+        self.index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+        self._store_metadata(metadatas, len(vectors))
+        self.count += len(vectors)
+
+    def search_batch(self, queries, k, where=None):
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        if where is None:
+            return self._search(queries, k)
+        mask = self.filter_mask(where)
+        if self.filter_strategy == 'post':
+            return post_filter_search(self._search, mask, queries, k, self.post_filter_expansion)
+        if self.filter_strategy != 'selector':
+            raise ValueError(f"Unknown filter strategy: {self.filter_strategy}")
+
+        bitmap = np.packbits(mask, bitorder='little')  # Must stay alive during the search
+        params = faiss.SearchParametersHNSW(
+            efSearch=max(self.ef_search, k), sel=faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+        )
+        return self.index.search(queries, k, params=params)
+
+    def _search(self, queries, k):
+        # efSearch must be at least k, passed per call so the index itself is not modified
+        params = faiss.SearchParametersHNSW(efSearch=max(self.ef_search, k))
+        return self.index.search(queries, k, params=params)
+
+    def memory_bytes(self):
+        return int(faiss.serialize_index(self.index).nbytes)
+
+    def save(self, path):
+        faiss.write_index(self.index, path)
+
+    def teardown(self):
+        self.index = None
+
+
+# =============================================================================
+# DATABASE BACKENDS
+# =============================================================================
+
+@register_backend('chromadb')
+class ChromaBackend(VectorBackend):
+    """
+    ChromaDB collection with cosine distance (HNSW under the hood); in memory unless
+    `persist_directory` is given, in which case its on-disk size can be measured.
+    """
+
+    install_hint = 'pip install chromadb'
+    features = {
+        'metadata_support': True,
+        'built_in_embeddings': False,
+        'cloud_managed': False,
+        'auto_scaling': False,
+        'real_time_updates': True,
+        'backup_restore': True,
+        'monitoring': False,
+        'multi_tenancy': True,
+        'cost': 'Free',
+        'setup_complexity': 'Low',
+        'production_ready': 'Medium'
+    }
+
+    def __init__(self, collection_name: str = 'comparison_test', persist_directory: Optional[str] = None):
+        super().__init__()
+        self.collection_name = collection_name
+        self.persist_directory = persist_directory
+        self.client = None
+        self.collection = None
+
+    @classmethod
+    def is_available(cls):
+        return CHROMADB_AVAILABLE
+
+    def build(self, dimension, train_vectors=None):
+        super().build(dimension)
+        if self.persist_directory:
+            self.client = chromadb.PersistentClient(path=self.persist_directory)
+        else:
+            self.client = chromadb.Client()
+        try:
+            self.client.delete_collection(self.collection_name)
+        except Exception:
+            pass
+        self.collection = self.client.create_collection(
+            name=self.collection_name,
+            metadata={"description": "Database comparison test", "hnsw:space": "cosine"}
+        )
+
+    def add_batch(self, vectors, documents=None, metadatas=None):
+        batch_size = getattr(self.client, 'max_batch_size', 5000) or 5000
+        for start in range(0, len(vectors), batch_size):
+            end = min(start + batch_size, len(vectors))
+            self.collection.add(
+                ids=[str(self.count + i) for i in range(start, end)],
+                embeddings=np.asarray(vectors[start:end], dtype=np.float32).tolist(),
+                documents=documents[start:end] if documents is not None else None,
+                metadatas=metadatas[start:end] if metadatas is not None else None
+            )
+        self.count += len(vectors)
+
+    def search_batch(self, queries, k, where=None):
+        results = self.collection.query(
+            query_embeddings=np.asarray(queries, dtype=np.float32).tolist(),
+            n_results=min(k, self.count),
+            where=where,
+            include=['distances']
+        )
+        scores = [[1 - d for d in distances] for distances in results['distances']]  # Cosine distance to similarity
+        ids = [[int(doc_id) for doc_id in doc_ids] for doc_ids in results['ids']]
+        return _pad_results(scores, ids, k)
+
+    def disk_bytes(self, directory):
+        if not self.persist_directory:
+            return None
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, files in os.walk(self.persist_directory) for name in files
+        )
+
+    def teardown(self):
+        if self.client is not None:
+            try:
+                self.client.delete_collection(self.collection_name)
+            except Exception:
+                pass
+        self.client = self.collection = None
+
+
+@register_backend('pinecone')
+class PineconeBackend(VectorBackend):
+    """Pinecone serverless index; remote, so only used on the small comparison corpus."""
+
+    install_hint = 'pip install pinecone-client'
+    remote = True
+    features = {
+        'metadata_support': True,
+        'built_in_embeddings': False,
+        'cloud_managed': True,
+        'auto_scaling': True,
+        'real_time_updates': True,
+        'backup_restore': True,
+        'monitoring': True,
+        'multi_tenancy': True,
+        'cost': 'Paid (~$70/month for 1M vectors)',
+        'setup_complexity': 'Medium',
+        'production_ready': 'High'
+    }
+
+    def __init__(self, api_key: Optional[str] = None, index_name: str = 'comparison-test',
+                 cloud: str = 'aws', region: str = 'us-east-1'):
+        super().__init__()
+        self.api_key = api_key or os.getenv('PINECONE_API_KEY')
+        if not self.api_key:
+            raise ValueError("Pinecone backend needs api_key or the PINECONE_API_KEY environment variable")
+        self.index_name = index_name
+        self.cloud = cloud
+        self.region = region
+        self.index = None
+
+    @classmethod
+    def is_available(cls):
+        return PINECONE_AVAILABLE
+
+    def build(self, dimension, train_vectors=None):
+        super().build(dimension)
+        self.client = Pinecone(api_key=self.api_key)
+
+        # Delete existing index if it exists
+        if self.index_name in self.client.list_indexes().names():
+            self.client.delete_index(self.index_name)
+            time.sleep(5)  # Wait for deletion
+
+        self.client.create_index(
+            name=self.index_name,
+            dimension=dimension,
+            metric="cosine",
+            spec=ServerlessSpec(cloud=self.cloud, region=self.region)
+        )
+        time.sleep(10)  # Wait for index to be ready
+        self.index = self.client.Index(self.index_name)
+
+    def add_batch(self, vectors, documents=None, metadatas=None):
+        records = []
+        for i, vector in enumerate(vectors):
+            metadata = dict(metadatas[i]) if metadatas is not None else {}
+            if documents is not None:
+                metadata['text'] = documents[i]
+            records.append({'id': str(self.count + i), 'values': np.asarray(vector).tolist(), 'metadata': metadata})
+        for start in range(0, len(records), 100):  # Pinecone limits the request size
+            self.index.upsert(vectors=records[start:start + 100])
+        self.count += len(vectors)
+        time.sleep(5)  # Wait for indexing
+
+    def search_batch(self, queries, k, where=None):
+        scores, ids = [], []
+        for query in queries:
+            results = self.index.query(vector=np.asarray(query).tolist(), top_k=k, filter=where)
+            scores.append([match['score'] for match in results['matches']])
+            ids.append([int(match['id']) for match in results['matches']])
+        return _pad_results(scores, ids, k)
+
+    def teardown(self):
+        self.index = None
@@ -7,34 +7,57 @@ from sentence_transformers import SentenceTransformer
 import warnings
 warnings.filterwarnings('ignore')
 
-# Database imports
-import chromadb
-try:
-    from pinecone import Pinecone, ServerlessSpec
-    PINECONE_AVAILABLE = True
-except ImportError:
-    PINECONE_AVAILABLE = False
-    print("Pinecone not installed. Install with: pip install pinecone-client")
-
-try:
-    import faiss
-    FAISS_AVAILABLE = True
-except ImportError:
-    FAISS_AVAILABLE = False
-    print("FAISS not installed. Install with: pip install faiss-cpu")
-
 import os
+import sys
+import argparse
+import shutil
+import inspect
+import tempfile
+from functools import partial
 from typing import List, Dict, Tuple, Optional
 import json
 
+from Benchmark_Corpus import (
+    BenchmarkCorpus, synthetic_corpus, text_corpus, read_text_file, latency_summary, recall_at_k,
+    per_query_recall, normalize_rows, blocked_top_k
+)
+from Load_Testing import qps_latency_curve
+from Ingestion_Benchmark import run_isolated
+from Results_History import DEFAULT_HISTORY_PATH, append_run, check_regressions
+from Embedding_Benchmark import (
+    PRECISIONS, default_thread_counts, cycle_to, document_chunks, throughput_sweep, best_runs
+)
+from Vector_Backends import BACKENDS, VectorBackend, create_backend, load_index_searcher
+
+# Backends compared by default; any name registered in Vector_Backends can be added with --backends
+DEFAULT_BACKENDS = ('chromadb', 'pinecone', 'faiss', 'numpy', 'hnsw')
+
 class VectorDatabaseComparison:
     """
-    Comprehensive comparison of ChromaDB, Pinecone, and FAISS vector databases.
+    Comprehensive comparison of vector databases (ChromaDB, Pinecone, FAISS, HNSW, NumPy).
     Tests setup complexity, search performance, accuracy, and feature richness.
+    Backends are adapters from the Vector_Backends registry, selected by name.
     """
     
-    def __init__(self):
+    def __init__(self, faiss_quantization: str = 'float32', rescore_multiplier: int = 4, faiss_nprobe: int = 8,
+                 backends: Optional[List[str]] = None, backend_options: Optional[Dict[str, Dict]] = None,
+                 history_path: Optional[str] = DEFAULT_HISTORY_PATH):
         self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        # Registered backend names to compare, and extra constructor options per backend
+        self.backend_names = list(backends or DEFAULT_BACKENDS)
+        self.backend_options = backend_options or {}
+        if 'pinecone' in self.backend_names and not (
+                os.getenv('PINECONE_API_KEY') or self.backend_options.get('pinecone', {}).get('api_key')):
+            print("PINECONE_API_KEY is not set, skipping Pinecone")
+            self.backend_names.remove('pinecone')
+        self.backends = {}
+        # FAISS storage mode: 'float32' (flat), 'int8' (scalar quantized), 'binary' (1-bit Hamming)
+        # or 'ivfpq' (inverted lists of product-quantized codes)
+        self.faiss_quantization = faiss_quantization
+        # Shortlist size multiplier for exact float rescoring of quantized search results
+        self.rescore_multiplier = rescore_multiplier
+        # Inverted lists scanned per query in 'ivfpq' mode
+        self.faiss_nprobe = faiss_nprobe
         self.documents = [
             "The quick brown fox jumps over the lazy dog",
             "Artificial intelligence is transforming technology",
@@ -66,6 +89,18 @@ class VectorDatabaseComparison:
             "What is computer programming?"
         ]
         self.results = {}
+        # Raw per-query measurements kept for regression checks ('<mode>.<backend>.latency_ms' / '.recall')
+        self.samples = {}
+        # Settings recorded with every run in the results history (None disables the history)
+        self.history_path = history_path
+        self.run_config = {
+            'faiss_quantization': faiss_quantization,
+            'rescore_multiplier': rescore_multiplier,
+            'faiss_nprobe': faiss_nprobe,
+            'backends': self.backend_names,
+            'backend_options': self.backend_options
+        }
+        self.last_run = None
         
     def generate_embeddings(self):
         """Generate embeddings for all documents."""
@@ -77,221 +112,122 @@ class VectorDatabaseComparison:
         print(f"Embedding dimension: {self.embeddings.shape[1]}")
         return embedding_time
 
-    def setup_chromadb(self) -> Tuple[bool, float, str]:
-        """Setup ChromaDB and measure setup time."""
-        print("\n=== Setting up ChromaDB ===")
-        try:
-            start_time = time.time()
-            
-            # Initialize ChromaDB
-            self.chroma_client = chromadb.Client()
-            
-            # Create collection
-            collection_name = "comparison_test"
-            try:
-                self.chroma_collection = self.chroma_client.get_collection(collection_name)
-                self.chroma_client.delete_collection(collection_name)
-            except:
-                pass
-            
-            self.chroma_collection = self.chroma_client.create_collection(
-                name=collection_name,
-                metadata={"description": "Database comparison test"}
-            )
-            
-            # Add documents
-            ids = [f"doc_{i}" for i in range(len(self.documents))]
-            metadatas = [{"source": "comparison", "index": i} for i in range(len(self.documents))]
-            
-            self.chroma_collection.add(
-                documents=self.documents,
-                embeddings=self.embeddings.tolist(),
-                ids=ids,
-                metadatas=metadatas
+    def backend_config(self, name: str, **options) -> Dict:
+        """Constructor options for a backend: this comparison's settings, then user options, then `options`."""
+        defaults = {
+            'faiss': {
+                'quantization': self.faiss_quantization,
+                'rescore_multiplier': self.rescore_multiplier,
+                'nprobe': self.faiss_nprobe
+            }
+        }.get(name, {})
+        return {**defaults, **self.backend_options.get(name, {}), **options}
+
+    def create_backend(self, name: str, **options) -> VectorBackend:
+        """Instantiate a registered backend with this comparison's settings for it."""
+        return create_backend(name, **self.backend_config(name, **options))
+
+    def build_backend(self, name: str, vectors: np.ndarray, documents: Optional[List[str]] = None,
+                      metadatas: Optional[List[Dict]] = None, batch_size: int = 65536,
+                      **options) -> Tuple[VectorBackend, float]:
+        """Build a backend over normalized vectors, adding them in batches; returns it with its build time."""
+        backend = self.create_backend(name, **options)
+        start_time = time.perf_counter()
+        backend.build(vectors.shape[1], train_vectors=vectors)
+        for start in range(0, len(vectors), batch_size):
+            end = min(start + batch_size, len(vectors))
+            backend.add_batch(
+                np.asarray(vectors[start:end], dtype=np.float32),
+                documents[start:end] if documents is not None else None,
+                metadatas[start:end] if metadatas is not None else None
             )
-            
-            setup_time = time.time() - start_time
-            print(f"✅ ChromaDB setup completed in {setup_time:.3f} seconds")
-            print(f"   Documents stored: {self.chroma_collection.count()}")
-            
-            return True, setup_time, "Success"
-            
-        except Exception as e:
-            print(f"❌ ChromaDB setup failed: {str(e)}")
-            return False, 0, str(e)
+        return backend, time.perf_counter() - start_time
 
-    def setup_pinecone(self) -> Tuple[bool, float, str]:
-        """Setup Pinecone and measure setup time."""
-        print("\n=== Setting up Pinecone ===")
-        
-        if not PINECONE_AVAILABLE:
-            return False, 0, "Pinecone not installed"
-            
+    def setup_backend(self, name: str) -> Tuple[bool, float, str]:
+        """Index the documents in one backend and measure setup time."""
+        print(f"\n=== Setting up {name} ===")
         try:
-            start_time = time.time()
-            
-            # Initialize Pinecone with direct API key
-            pc = Pinecone(api_key='pcsk_2GZce8_2VH6C9y7ToCoDeuWizMeJSh2PEmGyNQ46ugBGFn8ny7h4DtW5T3oRkGvL2yZ5kf')
-            
-            # Create index
-            index_name = "comparison-test"
-            dimension = self.embeddings.shape[1]
-            
-            # Delete existing index if it exists
-            if index_name in pc.list_indexes().names():
-                pc.delete_index(index_name)
-                time.sleep(5)  # Wait for deletion
-            
-            # Create new index with ServerlessSpec
-            pc.create_index(
-                name=index_name,
-                dimension=dimension,
-                metric="cosine",
-                spec=ServerlessSpec(
-                    cloud='aws',
-                    region='us-east-1'
-                )
+            backend, setup_time = self.build_backend(
+                name,
+                normalize_rows(self.embeddings),
+                documents=self.documents,
+                metadatas=[{"source": "comparison", "index": i} for i in range(len(self.documents))]
             )
-            
-            # Wait for index to be ready
-            time.sleep(10)
-            
-            # Connect to index
-            self.pinecone_index = pc.Index(index_name)
-            
-            # Prepare and upload vectors
-            vectors_to_upsert = []
-            for i, (doc, embedding) in enumerate(zip(self.documents, self.embeddings)):
-                vectors_to_upsert.append({
-                    'id': f'doc_{i}',
-                    'values': embedding.tolist(),
-                    'metadata': {
-                        'text': doc,
-                        'source': 'comparison',
-                        'index': i
-                    }
-                })
-            
-            # Upload vectors
-            upsert_response = self.pinecone_index.upsert(vectors=vectors_to_upsert)
-            
-            # Wait for indexing
-            time.sleep(5)
-            
-            setup_time = time.time() - start_time
-            print(f"✅ Pinecone setup completed in {setup_time:.3f} seconds")
-            print(f"   Vectors upserted: {upsert_response['upserted_count']}")
-            
+            self.backends[name] = backend
+            print(f"✅ {name} setup completed in {setup_time:.3f} seconds")
+            print(f"   Vectors indexed: {backend.count}")
             return True, setup_time, "Success"
-            
         except Exception as e:
-            print(f"❌ Pinecone setup failed: {str(e)}")
+            print(f"❌ {name} setup failed: {str(e)}")
             return False, 0, str(e)
 
-    def setup_faiss(self) -> Tuple[bool, float, str]:
-        """Setup FAISS and measure setup time."""
-        print("\n=== Setting up FAISS ===")
+    def evaluate_faiss_quantization(self, k: int = 3) -> Dict:
+        """
+        Report recall@k against exact search and the footprint of each FAISS storage mode:
+        the first-pass codes, the RAM actually held (codes, index structures and any in-RAM
+        rescoring vectors) and the float vectors that quantized modes rescore from.
+        """
+        print(f"\n=== Evaluating FAISS Quantization (recall@{k} vs float32) ===")
+        
+        if not BACKENDS['faiss'].is_available() or self.embeddings is None:
+            print("   FAISS not available, skipping")
+            return {}
+        
+        vectors = normalize_rows(self.embeddings)
+        k = min(k, len(vectors))
+        query_np = normalize_rows(self.model.encode(self.test_queries))
+        _, exact_indices = blocked_top_k(query_np, vectors, k)
+        dimension = vectors.shape[1]
+        
+        report = {}
+        for quantization in ['float32', 'int8', 'binary', 'ivfpq']:
+            backend, _ = self.build_backend('faiss', vectors, quantization=quantization)
+            _, indices = backend.search_batch(query_np, k)
+            recall = recall_at_k(indices, exact_indices)
+            code_bytes = backend.code_bytes_per_vector()
+            memory_bytes = backend.memory_bytes() / backend.count
+            rescore_storage = backend.floats.storage if backend.floats is not None else None
+            backend.teardown()
+            report[quantization] = {
+                'recall_at_k': float(recall),
+                'code_bytes_per_vector': float(code_bytes),
+                'memory_bytes_per_vector': float(memory_bytes),
+                'rescore_bytes_per_vector': dimension * 4 if rescore_storage else 0,
+                'rescore_storage': rescore_storage,
+                'memory_vs_float32': float(dimension * 4 / memory_bytes)
+            }
+            rescore_note = f" + {dimension * 4} B/vector float rescoring ({rescore_storage})" if rescore_storage else ""
+            print(f"   {quantization:>8}: recall {recall:.3f} | codes {code_bytes:.0f} B/vector | "
+                  f"RAM {memory_bytes:.0f} B/vector ({dimension * 4 / memory_bytes:.1f}x vs float32){rescore_note}")
         
-        if not FAISS_AVAILABLE:
-            return False, 0, "FAISS not installed"
-            
-        try:
-            start_time = time.time()
-            
-            # Convert embeddings to numpy array
-            embeddings_np = np.array(self.embeddings).astype('float32')
-            
-            # Create FAISS index
-            dimension = embeddings_np.shape[1]
-            self.faiss_index = faiss.IndexFlatIP(dimension)  # Inner Product for cosine similarity
-            
-            # Normalize vectors for cosine similarity
-            faiss.normalize_L2(embeddings_np)
-            
-            # Add vectors to index
-            self.faiss_index.add(embeddings_np)
-            
-            # Store documents separately (FAISS doesn't store metadata)
-            self.faiss_documents = self.documents.copy()
-            
-            setup_time = time.time() - start_time
-            print(f"✅ FAISS setup completed in {setup_time:.3f} seconds")
-            print(f"   Vectors indexed: {self.faiss_index.ntotal}")
-            
-            return True, setup_time, "Success"
-            
-        except Exception as e:
-            print(f"❌ FAISS setup failed: {str(e)}")
-            return False, 0, str(e)
+        self.results['faiss_quantization'] = report
+        return report
 
     def benchmark_search_performance(self, num_iterations: int = 100) -> Dict:
         """Benchmark search performance across all databases."""
         print(f"\n=== Benchmarking Search Performance ({num_iterations} iterations) ===")
         
-        performance_results = {
-            'chromadb': {'times': [], 'success': False},
-            'pinecone': {'times': [], 'success': False},
-            'faiss': {'times': [], 'success': False}
-        }
+        performance_results = {name: {'times': [], 'success': False} for name in self.backend_names}
         
         # Test query
         query = "What is artificial intelligence and machine learning?"
-        query_embedding = self.model.encode([query])
-        
-        # Benchmark ChromaDB
-        if hasattr(self, 'chroma_collection'):
-            print("Benchmarking ChromaDB...")
-            try:
-                for _ in range(num_iterations):
-                    start_time = time.time()
-                    results = self.chroma_collection.query(
-                        query_embeddings=query_embedding.tolist(),
-                        n_results=3
-                    )
-                    search_time = time.time() - start_time
-                    performance_results['chromadb']['times'].append(search_time)
-                performance_results['chromadb']['success'] = True
-                avg_time = np.mean(performance_results['chromadb']['times'])
-                print(f"   ChromaDB average search time: {avg_time*1000:.2f}ms")
-            except Exception as e:
-                print(f"   ChromaDB benchmark failed: {e}")
-        
-        # Benchmark Pinecone
-        if hasattr(self, 'pinecone_index'):
-            print("Benchmarking Pinecone...")
-            try:
-                for _ in range(num_iterations):
-                    start_time = time.time()
-                    results = self.pinecone_index.query(
-                        vector=query_embedding.tolist(),
-                        top_k=3,
-                        include_metadata=True
-                    )
-                    search_time = time.time() - start_time
-                    performance_results['pinecone']['times'].append(search_time)
-                performance_results['pinecone']['success'] = True
-                avg_time = np.mean(performance_results['pinecone']['times'])
-                print(f"   Pinecone average search time: {avg_time*1000:.2f}ms")
-            except Exception as e:
-                print(f"   Pinecone benchmark failed: {e}")
+        query_np = normalize_rows(self.model.encode([query]))
         
-        # Benchmark FAISS
-        if hasattr(self, 'faiss_index'):
-            print("Benchmarking FAISS...")
+        for name, backend in self.backends.items():
+            print(f"Benchmarking {name}...")
             try:
-                query_np = np.array(query_embedding).astype('float32')
-                faiss.normalize_L2(query_np)
-                
                 for _ in range(num_iterations):
-                    start_time = time.time()
-                    scores, indices = self.faiss_index.search(query_np, 3)
-                    search_time = time.time() - start_time
-                    performance_results['faiss']['times'].append(search_time)
-                performance_results['faiss']['success'] = True
-                avg_time = np.mean(performance_results['faiss']['times'])
-                print(f"   FAISS average search time: {avg_time*1000:.2f}ms")
+                    start_time = time.perf_counter()
+                    backend.search_batch(query_np, 3)
+                    search_time = time.perf_counter() - start_time
+                    performance_results[name]['times'].append(search_time)
+                performance_results[name]['success'] = True
+                performance_results[name]['memory_bytes'] = backend.memory_bytes()
+                self.samples[f'search.{name}.latency_ms'] = [t * 1000 for t in performance_results[name]['times']]
+                avg_time = np.mean(performance_results[name]['times'])
+                print(f"   {name} average search time: {avg_time*1000:.2f}ms")
             except Exception as e:
-                print(f"   FAISS benchmark failed: {e}")
+                print(f"   {name} benchmark failed: {e}")
         
         return performance_results
 
@@ -303,111 +239,351 @@ class VectorDatabaseComparison:
         
         for query in self.test_queries:
             print(f"\nQuery: '{query}'")
-            query_embedding = self.model.encode([query])
+            query_np = normalize_rows(self.model.encode([query]))
             query_results = {}
             
-            # ChromaDB search
-            if hasattr(self, 'chroma_collection'):
-                try:
-                    results = self.chroma_collection.query(
-                        query_embeddings=query_embedding.tolist(),
-                        n_results=3,
-                        include=['documents', 'distances']
-                    )
-                    query_results['chromadb'] = {
-                        'documents': results['documents'][0],
-                        'scores': [1 - d for d in results['distances'][0]]  # Convert distance to similarity
-                    }
-                    print("  ChromaDB results:")
-                    for i, (doc, score) in enumerate(zip(results['documents'][0], query_results['chromadb']['scores'])):
-                        print(f"    {i+1}. {score:.3f}: {doc[:50]}...")
-                except Exception as e:
-                    print(f"  ChromaDB search failed: {e}")
-            
-            # Pinecone search
-            if hasattr(self, 'pinecone_index'):
-                try:
-                    results = self.pinecone_index.query(
-                        vector=query_embedding.tolist(),
-                        top_k=3,
-                        include_metadata=True
-                    )
-                    query_results['pinecone'] = {
-                        'documents': [match['metadata']['text'] for match in results['matches']],
-                        'scores': [match['score'] for match in results['matches']]
-                    }
-                    print("  Pinecone results:")
-                    for i, match in enumerate(results['matches']):
-                        print(f"    {i+1}. {match['score']:.3f}: {match['metadata']['text'][:50]}...")
-                except Exception as e:
-                    print(f"  Pinecone search failed: {e}")
-            
-            # FAISS search
-            if hasattr(self, 'faiss_index'):
+            for name, backend in self.backends.items():
                 try:
-                    query_np = np.array(query_embedding).astype('float32')
-                    faiss.normalize_L2(query_np)
-                    scores, indices = self.faiss_index.search(query_np, 3)
-                    
-                    query_results['faiss'] = {
-                        'documents': [self.faiss_documents[idx] for idx in indices[0]],
-                        'scores': scores[0].tolist()
+                    scores, indices = backend.search_batch(query_np, 3)
+                    hits = [(float(score), int(idx)) for score, idx in zip(scores[0], indices[0]) if idx >= 0]
+                    query_results[name] = {
+                        'documents': [self.documents[idx] for _, idx in hits],
+                        'scores': [score for score, _ in hits]
                     }
-                    print("  FAISS results:")
-                    for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-                        print(f"    {i+1}. {score:.3f}: {self.faiss_documents[idx][:50]}...")
+                    print(f"  {name} results:")
+                    for i, (score, idx) in enumerate(hits):
+                        print(f"    {i+1}. {score:.3f}: {self.documents[idx][:50]}...")
                 except Exception as e:
-                    print(f"  FAISS search failed: {e}")
+                    print(f"  {name} search failed: {e}")
             
             accuracy_results[query] = query_results
         
         return accuracy_results
 
+    def load_benchmark_corpus(self, num_vectors: int = 10000, num_queries: int = 1000,
+                              source: str = 'synthetic', text_path: Optional[str] = None,
+                              dimension: Optional[int] = None) -> BenchmarkCorpus:
+        """Synthetic clustered vectors, or documents from `text_path` (one per line) encoded with the model."""
+        if source == 'synthetic':
+            dimension = dimension or self.model.get_sentence_embedding_dimension()
+            return synthetic_corpus(num_vectors, num_queries, dimension)
+        if source == 'text':
+            texts = read_text_file(text_path)[:num_vectors + num_queries]
+            return text_corpus(texts, self.model, num_queries)
+        raise ValueError(f"Unknown corpus source: {source}")
+
+    def _scale_backends(self, corpus: BenchmarkCorpus) -> Dict:
+        """Build every selected local backend over the corpus; returns {name: (backend, build_time)}."""
+        backends = {}
+        for name in self.backend_names:
+            if name not in BACKENDS or BACKENDS[name].remote:
+                continue  # Hosted services are not loaded with millions of benchmark vectors
+            print(f"Building {name} index...")
+            try:
+                backends[name] = self.build_backend(name, corpus.vectors)
+            except Exception as e:
+                print(f"❌ {name} scale setup failed: {str(e)}")
+        return backends
+
+    @staticmethod
+    def single_query_searcher(backend: VectorBackend, k: int):
+        """Wrap a backend's batch search as query vector -> top-k ids, the unit timed by the benchmarks."""
+        def search(query):
+            return backend.search_batch(query[None, :], k)[1][0]
+        return search
+
+    def benchmark_at_scale(self, num_vectors: int = 10000, num_queries: int = 1000, k: int = 10,
+                           source: str = 'synthetic', text_path: Optional[str] = None,
+                           warmup_queries: int = 10) -> Dict:
+        """
+        Per-query latency percentiles and recall@k of each local backend on a large corpus.
+        Every held-out query is timed individually with time.perf_counter; recall is measured
+        against cached brute-force ground truth. Pinecone is skipped (remote, billed per vector).
+        """
+        print(f"\n=== Scale Benchmark ({source}, {num_vectors:,} vectors, {num_queries} queries, k={k}) ===")
+        
+        corpus = self.load_benchmark_corpus(num_vectors, num_queries, source, text_path)
+        ground_truth = corpus.ground_truth(k)
+        
+        report = {}
+        for name, (backend, build_time) in self._scale_backends(corpus).items():
+            search = self.single_query_searcher(backend, k)
+            for query in corpus.queries[:warmup_queries]:
+                search(query)  # Warm caches and lazy initialization, not timed
+            
+            times, retrieved = [], []
+            for query in corpus.queries:
+                start_time = time.perf_counter()
+                ids = search(query)
+                times.append(time.perf_counter() - start_time)
+                retrieved.append(ids)
+            
+            self.samples[f'scale.{name}.latency_ms'] = [t * 1000 for t in times]
+            self.samples[f'scale.{name}.recall'] = per_query_recall(retrieved, ground_truth)
+            report[name] = {
+                **latency_summary(times),
+                'recall_at_k': recall_at_k(retrieved, ground_truth),
+                'build_time_s': build_time,
+                'memory_bytes': backend.memory_bytes()
+            }
+            backend.teardown()
+            stats = report[name]
+            print(f"   {name:>8}: p50 {stats['p50_ms']:.2f}ms | p95 {stats['p95_ms']:.2f}ms | "
+                  f"p99 {stats['p99_ms']:.2f}ms | recall@{k} {stats['recall_at_k']:.3f} | "
+                  f"build {build_time:.1f}s")
+        
+        self.results['scale_benchmark'] = {
+            'corpus': {
+                'name': corpus.name,
+                'source': source,
+                'num_vectors': corpus.num_vectors,
+                'num_queries': len(corpus.queries),
+                'dimension': corpus.dimension
+            },
+            'k': k,
+            'backends': report
+        }
+        return report
+
+    def benchmark_under_load(self, num_vectors: int = 10000, num_queries: int = 1000, k: int = 10,
+                             concurrency_levels: Tuple[int, ...] = (1, 2, 4, 8, 16),
+                             rates: Optional[List[float]] = None, duration_s: float = 5.0,
+                             pool: str = 'thread', source: str = 'synthetic',
+                             text_path: Optional[str] = None) -> Dict:
+        """
+        QPS vs tail-latency curves of each local backend under concurrent load.
+        A closed loop sweeps the number of concurrent clients; an open loop offers a fixed
+        arrival rate (by default 25%..125% of the best closed-loop QPS) so queueing shows up
+        in p95/p99. pool='process' runs the closed-loop clients in separate processes, each
+        loading its own copy of the index, for backends that can be saved to a file (FAISS, HNSW).
+        """
+        print(f"\n=== Load Test ({num_vectors:,} vectors, {pool} pool, {duration_s:g}s per point) ===")
+        
+        corpus = self.load_benchmark_corpus(num_vectors, num_queries, source, text_path)
+        queries = np.ascontiguousarray(corpus.queries, dtype=np.float32)
+        
+        report = {}
+        for name, (backend, _) in self._scale_backends(corpus).items():
+            search = self.single_query_searcher(backend, k)
+            print(f"   {name}:")
+            for query in queries[:10]:
+                search(query)  # Warm-up, not measured
+            
+            # The saved index only has to outlive the process clients of this backend
+            with tempfile.TemporaryDirectory(prefix="load_test_") as scratch_dir:
+                searcher_factory = None
+                if pool == 'process' and backend.persistable:
+                    index_path = os.path.join(scratch_dir, f"load_test_{name}.index")
+                    backend.save(index_path)
+                    searcher_factory = partial(load_index_searcher, index_path, k)
+                elif pool == 'process':
+                    print(f"      {name} backend cannot be saved to a file; using threads")
+                
+                report[name] = qps_latency_curve(
+                    search, queries, concurrency_levels, rates, duration_s,
+                    pool='process' if searcher_factory else 'thread', searcher_factory=searcher_factory
+                )
+            backend.teardown()
+        
+        self.results['load_test'] = {
+            'corpus': {'name': corpus.name, 'num_vectors': corpus.num_vectors, 'dimension': corpus.dimension},
+            'k': k,
+            'pool': pool,
+            'duration_s': duration_s,
+            'backends': report
+        }
+        return report
+
+    def benchmark_ingestion(self, corpus_sizes: Tuple[int, ...] = (10000, 100000),
+                            batch_sizes: Tuple[int, ...] = (256, 1024, 8192), source: str = 'synthetic',
+                            text_path: Optional[str] = None, isolate: bool = True) -> List[Dict]:
+        """
+        Index build throughput and footprint of each local backend, per corpus size and batch size.
+        Every build runs in a fresh process and reports vectors/sec, training and insert time,
+        peak RSS, in-memory and on-disk size and bytes per vector. Embedding time is reported
+        once per corpus, separately, since it does not depend on the backend.
+        """
+        print(f"\n=== Ingestion Benchmark (sizes {list(corpus_sizes)}, batch sizes {list(batch_sizes)}) ===")
+        
+        corpus = self.load_benchmark_corpus(max(corpus_sizes), 100, source, text_path)
+        if corpus.embedding_time_s is not None:
+            print(f"Embedding: {corpus.num_vectors:,} vectors in {corpus.embedding_time_s:.1f}s "
+                  f"({corpus.num_vectors / corpus.embedding_time_s:,.0f} vectors/sec)")
+        
+        scratch_dir = tempfile.mkdtemp(prefix="ingestion_")
+        vectors_path = corpus.vectors_path
+        if vectors_path is None:
+            # Worker processes read the vectors from a file instead of receiving a pickled copy
+            vectors_path = os.path.join(scratch_dir, "vectors.npy")
+            np.save(vectors_path, np.asarray(corpus.vectors, dtype=np.float32))
+        
+        def mb(value):
+            return f"{value / 2**20:,.1f}MB" if value is not None else "n/a"
+        
+        runs = []
+        try:
+            for name in self.backend_names:
+                if name not in BACKENDS or BACKENDS[name].remote or not BACKENDS[name].is_available():
+                    continue
+                for num_vectors in corpus_sizes:
+                    for batch_size in batch_sizes:
+                        options = self.backend_config(name)
+                        if 'persist_directory' in inspect.signature(BACKENDS[name].__init__).parameters:
+                            # Databases that persist as they ingest write to a fresh directory
+                            options['persist_directory'] = tempfile.mkdtemp(dir=scratch_dir)
+                        try:
+                            run = run_isolated(name, options, vectors_path, min(num_vectors, corpus.num_vectors),
+                                               batch_size, isolate)
+                        except Exception as e:
+                            print(f"   {name:>8} n={num_vectors:,} batch={batch_size}: failed ({e})")
+                            continue
+                        runs.append(run)
+                        print(f"   {name:>8} n={run['num_vectors']:>9,} batch={batch_size:>6}: "
+                              f"{run['vectors_per_sec']:>10,.0f} vec/s | build {run['build_time_s']:.2f}s "
+                              f"(train {run['train_time_s']:.2f}s) | peak RSS {mb(run['peak_rss_bytes'])} "
+                              f"(+{mb(run['rss_growth_bytes'])}) | "
+                              f"disk {mb(run['disk_bytes'])} | "
+                              f"{run['bytes_per_vector'] or 0:.0f} B/vector")
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+        
+        self.results['ingestion'] = {
+            'corpus': {
+                'name': corpus.name,
+                'source': source,
+                'dimension': corpus.dimension,
+                'embedding_time_s': corpus.embedding_time_s,
+                'embedding_vectors_per_sec': (corpus.num_vectors / corpus.embedding_time_s
+                                              if corpus.embedding_time_s else None)
+            },
+            'runs': runs
+        }
+        return runs
+
+    def benchmark_embedding_throughput(self, batch_sizes: Tuple[int, ...] = (1, 8, 32, 128),
+                                       thread_counts: Optional[List[int]] = None,
+                                       precisions: Tuple[str, ...] = ('float32', 'bfloat16', 'int8'),
+                                       num_docs: int = 512, text_path: Optional[str] = None,
+                                       repeats: int = 1) -> List[Dict]:
+        """
+        Encoding throughput of the embedding model over batch size, torch threads and precision,
+        for short queries and for 1000-character chunks cut by RecursiveCharacterTextSplitter.
+        Chunks come from `text_path` when given, otherwise from the comparison documents.
+        Reports docs/sec and tokens/sec (tokens after the model's truncation).
+        """
+        thread_counts = thread_counts or default_thread_counts()
+        print(f"\n=== Embedding Throughput ({num_docs} docs per set, threads {thread_counts}, "
+              f"precisions {list(precisions)}) ===")
+        
+        if text_path:
+            with open(text_path, 'r', encoding='utf-8') as f:
+                source_text = f.read()
+        else:
+            source_text = "\n\n".join(". ".join(cycle_to(self.documents[i:] + self.documents[:i], 12))
+                                      for i in range(len(self.documents)))
+        input_sets = {
+            'short_queries': cycle_to(self.test_queries + self.documents, num_docs),
+            'chunks_1000': document_chunks(source_text, num_docs)
+        }
+        
+        runs = throughput_sweep(self.model, input_sets, list(batch_sizes), thread_counts, list(precisions), repeats)
+        
+        print("\n   Fastest configuration per input set:")
+        for name, run in best_runs(runs).items():
+            print(f"   {name:>14}: {run['precision']}, {run['threads']} threads, batch {run['batch_size']} -> "
+                  f"{run['docs_per_sec']:.1f} docs/s, {run['tokens_per_sec']:.0f} tokens/s")
+        
+        self.results['embedding_throughput'] = {
+            'model': 'all-MiniLM-L6-v2',
+            'max_seq_length': getattr(self.model, 'max_seq_length', None),
+            'cpu_count': os.cpu_count(),
+            'runs': runs
+        }
+        return runs
+
+    def benchmark_filtered_search(self, num_vectors: int = 100000, num_queries: int = 200, k: int = 10,
+                                  selectivities: Tuple[float, ...] = (0.001, 0.01, 0.1, 0.5, 1.0),
+                                  filter_strategies: Tuple[str, ...] = ('selector', 'post'),
+                                  source: str = 'synthetic', text_path: Optional[str] = None) -> Dict:
+        """
+        Latency and recall of metadata-filtered top-k as the filter gets more selective.
+        Every vector gets a uniform random 'rank' in [0, 1), so {'rank': {'$lt': s}} keeps
+        approximately a fraction s of the corpus (the exact count is reported as matching_vectors).
+        Recall is against exact search over the matching vectors only.
+        Backends with a `filter_strategy` (FAISS, HNSW) are measured once per strategy.
+        """
+        print(f"\n=== Filtered Search ({num_vectors:,} vectors, selectivities {list(selectivities)}, k={k}) ===")
+        
+        corpus = self.load_benchmark_corpus(num_vectors, num_queries, source, text_path)
+        ranks = np.random.default_rng(7).random(corpus.num_vectors)
+        metadatas = [{'rank': float(rank)} for rank in ranks]
+        queries = np.ascontiguousarray(corpus.queries, dtype=np.float32)
+        
+        print("Computing filtered ground truth...")
+        ground_truth = {
+            selectivity: blocked_top_k(queries, corpus.vectors, k, mask=ranks < selectivity)[1]
+            for selectivity in selectivities
+        }
+        
+        report = {}
+        for name in self.backend_names:
+            if name not in BACKENDS or BACKENDS[name].remote:
+                continue
+            print(f"Building {name} index...")
+            try:
+                backend, _ = self.build_backend(name, corpus.vectors, metadatas=metadatas)
+            except Exception as e:
+                print(f"❌ {name} filtered setup failed: {str(e)}")
+                continue
+            
+            strategies = filter_strategies if hasattr(backend, 'filter_strategy') else (None,)
+            for strategy in strategies:
+                label = f"{name}[{strategy}]" if strategy else name
+                if strategy:
+                    backend.filter_strategy = strategy
+                report[label] = []
+                for selectivity in selectivities:
+                    where = {'rank': {'$lt': selectivity}}
+                    try:
+                        backend.search_batch(queries[:1], k, where=where)  # Warm-up (and filter evaluation)
+                        times, retrieved = [], []
+                        for query in queries:
+                            start_time = time.perf_counter()
+                            _, ids = backend.search_batch(query[None, :], k, where=where)
+                            times.append(time.perf_counter() - start_time)
+                            retrieved.append(ids[0])
+                    except Exception as e:
+                        print(f"   {label:>16} selectivity {selectivity:.3%}: failed ({e})")
+                        continue
+                    
+                    recalls = per_query_recall(retrieved, ground_truth[selectivity])
+                    key = f"filtered.{label}.s{selectivity:g}"
+                    self.samples[f"{key}.latency_ms"] = [t * 1000 for t in times]
+                    self.samples[f"{key}.recall"] = recalls
+                    point = {
+                        'selectivity': selectivity,
+                        'matching_vectors': int((ranks < selectivity).sum()),
+                        **latency_summary(times),
+                        'recall_at_k': float(np.mean(recalls))
+                    }
+                    report[label].append(point)
+                    print(f"   {label:>16} selectivity {selectivity:>7.3%}: p50 {point['p50_ms']:.2f}ms | "
+                          f"p95 {point['p95_ms']:.2f}ms | recall@{k} {point['recall_at_k']:.3f}")
+            backend.teardown()
+        
+        self.results['filtered_search'] = {
+            'corpus': {'name': corpus.name, 'num_vectors': corpus.num_vectors, 'dimension': corpus.dimension},
+            'k': k,
+            'filter': "{'rank': {'$lt': selectivity}} with rank ~ U[0, 1)",
+            'backends': report
+        }
+        return report
+
     def analyze_feature_richness(self) -> Dict:
         """Analyze feature richness of each database."""
         print("\n=== Analyzing Feature Richness ===")
         
-        features = {
-            'chromadb': {
-                'metadata_support': True,
-                'built_in_embeddings': False,
-                'cloud_managed': False,
-                'auto_scaling': False,
-                'real_time_updates': True,
-                'backup_restore': True,
-                'monitoring': False,
-                'multi_tenancy': True,
-                'cost': 'Free',
-                'setup_complexity': 'Low',
-                'production_ready': 'Medium'
-            },
-            'pinecone': {
-                'metadata_support': True,
-                'built_in_embeddings': False,
-                'cloud_managed': True,
-                'auto_scaling': True,
-                'real_time_updates': True,
-                'backup_restore': True,
-                'monitoring': True,
-                'multi_tenancy': True,
-                'cost': 'Paid (~$70/month for 1M vectors)',
-                'setup_complexity': 'Medium',
-                'production_ready': 'High'
-            },
-            'faiss': {
-                'metadata_support': False,
-                'built_in_embeddings': False,
-                'cloud_managed': False,
-                'auto_scaling': False,
-                'real_time_updates': True,
-                'backup_restore': True,
-                'monitoring': False,
-                'multi_tenancy': False,
-                'cost': 'Free',
-                'setup_complexity': 'High',
-                'production_ready': 'High (with effort)'
-            }
-        }
+        features = {name: BACKENDS[name].features for name in self.backend_names if name in BACKENDS}
         
         for db_name, db_features in features.items():
             print(f"\n{db_name.upper()} Features:")
@@ -433,9 +609,11 @@ class VectorDatabaseComparison:
                 min_time = np.min(results['times']) * 1000
                 max_time = np.max(results['times']) * 1000
                 std_time = np.std(results['times']) * 1000
+                tail = latency_summary(results['times'])
                 
                 print(f"\n{db_name.upper()}:")
                 print(f"  Average: {avg_time:.2f}ms")
+                print(f"  p50 / p95 / p99: {tail['p50_ms']:.2f} / {tail['p95_ms']:.2f} / {tail['p99_ms']:.2f}ms")
                 print(f"  Min: {min_time:.2f}ms")
                 print(f"  Max: {max_time:.2f}ms")
                 print(f"  Std Dev: {std_time:.2f}ms")
@@ -499,6 +677,34 @@ class VectorDatabaseComparison:
         plt.show()
         
         print("Performance comparison chart saved as 'vector_database_performance_comparison.png'")
+        
+        if 'load_test' in self.results:
+            self.plot_load_curves(self.results['load_test'])
+
+    def plot_load_curves(self, load_results: Dict):
+        """Plot throughput against p95/p99 latency for every backend of a load test."""
+        fig, axes = plt.subplots(1, 2, figsize=(14, 6))
+        
+        for ax, mode, title in zip(axes, ('closed_loop', 'open_loop'),
+                                   ('Closed Loop (concurrent clients)', 'Open Loop (offered arrival rate)')):
+            for backend, curves in load_results['backends'].items():
+                points = sorted(curves[mode], key=lambda point: point['throughput_qps'])
+                qps = [point['throughput_qps'] for point in points]
+                ax.plot(qps, [point['p95_ms'] for point in points], marker='o', label=f'{backend.upper()} p95')
+                ax.plot(qps, [point['p99_ms'] for point in points], marker='x', linestyle='--',
+                        label=f'{backend.upper()} p99')
+            ax.set_title(title, fontsize=14, fontweight='bold')
+            ax.set_xlabel('Throughput (QPS)', fontsize=12)
+            ax.set_ylabel('Latency (ms)', fontsize=12)
+            ax.set_yscale('log')
+            ax.grid(alpha=0.3)
+            ax.legend()
+        
+        plt.tight_layout()
+        plt.savefig('vector_database_qps_latency.png', dpi=300, bbox_inches='tight')
+        plt.show()
+        
+        print("QPS vs latency chart saved as 'vector_database_qps_latency.png'")
 
     def save_results_to_json(self, performance_results: Dict, accuracy_results: Dict, features: Dict):
         """Save all results to JSON file."""
@@ -520,21 +726,34 @@ class VectorDatabaseComparison:
         # Process performance results
         for db_name, results in performance_results.items():
             if results['success'] and results['times']:
+                tail = latency_summary(results['times'])
                 json_results['performance'][db_name] = {
                     'average_time_ms': float(np.mean(results['times']) * 1000),
                     'min_time_ms': float(np.min(results['times']) * 1000),
                     'max_time_ms': float(np.max(results['times']) * 1000),
                     'std_dev_ms': float(np.std(results['times']) * 1000),
+                    'p50_ms': tail['p50_ms'],
+                    'p95_ms': tail['p95_ms'],
+                    'p99_ms': tail['p99_ms'],
+                    'memory_bytes': results.get('memory_bytes'),
                     'total_queries': len(results['times'])
                 }
             else:
                 json_results['performance'][db_name] = {'status': 'failed or not available'}
         
+        # Extra analyses collected during the run (e.g. FAISS quantization recall)
+        json_results.update(self.results)
+        
         # Save to file
         with open('vector_database_comparison_results.json', 'w') as f:
             json.dump(json_results, f, indent=2)
         
         print("Results saved to 'vector_database_comparison_results.json'")
+        
+        # Append-only history: every run is kept, tagged with commit, host and config
+        if self.history_path:
+            self.last_run = append_run(json_results, self.run_config, self.samples, self.history_path)
+            print(f"Run {self.last_run['run_id']} appended to '{self.history_path}'")
 
     def run_full_comparison(self):
         """Run the complete database comparison."""
@@ -545,10 +764,7 @@ class VectorDatabaseComparison:
         embedding_time = self.generate_embeddings()
         
         # Setup databases
-        setup_results = {}
-        setup_results['chromadb'] = self.setup_chromadb()
-        setup_results['pinecone'] = self.setup_pinecone()
-        setup_results['faiss'] = self.setup_faiss()
+        setup_results = {name: self.setup_backend(name) for name in self.backend_names}
         
         # Print setup summary
         print("\n📋 SETUP SUMMARY")
@@ -563,6 +779,9 @@ class VectorDatabaseComparison:
         # Accuracy testing
         accuracy_results = self.test_search_accuracy()
         
+        # Recall / memory trade-off of quantized FAISS storage
+        self.evaluate_faiss_quantization()
+        
         # Feature analysis
         features = self.analyze_feature_richness()
         
@@ -575,14 +794,135 @@ class VectorDatabaseComparison:
         # Save results
         self.save_results_to_json(performance_results, accuracy_results, features)
         
+        for backend in self.backends.values():
+            backend.teardown()
+        
         print(f"\n🎉 Comparison completed! Check the generated files for detailed results.")
 
 
+def parse_args():
+    """Command line options for the optional benchmark modes."""
+    parser = argparse.ArgumentParser(description="Compare vector databases")
+    parser.add_argument("--backends", default=",".join(DEFAULT_BACKENDS),
+                        help=f"Comma-separated backends to compare (registered: {', '.join(sorted(BACKENDS))})")
+    parser.add_argument("--backend-option", action="append", default=[], metavar="BACKEND.NAME=VALUE",
+                        help="Constructor option for a backend, e.g. hnsw.ef_search=128 (repeatable)")
+    parser.add_argument("--history-path", default=DEFAULT_HISTORY_PATH,
+                        help="Append-only results history (JSON lines)")
+    parser.add_argument("--no-history", action="store_true", help="Do not record this run in the history")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Compare with the baseline run and exit 1 on p95 latency / recall regressions")
+    parser.add_argument("--baseline", help="Baseline run id or git commit (default: previous comparable run)")
+    parser.add_argument("--faiss-quantization", default="float32",
+                        choices=["float32", "int8", "binary", "ivfpq"])
+    parser.add_argument("--scale", type=int, default=0,
+                        help="Also run the scale benchmark with this many corpus vectors (e.g. 10000 to 10000000)")
+    parser.add_argument("--queries", type=int, default=1000, help="Held-out queries for the scale benchmark")
+    parser.add_argument("--k", type=int, default=10, help="Top-k for recall and latency measurements")
+    parser.add_argument("--corpus", default="synthetic", choices=["synthetic", "text"])
+    parser.add_argument("--text-path", help="Text file with one document per line (--corpus text)")
+    parser.add_argument("--ingest", action="store_true",
+                        help="Also benchmark index build throughput, peak RSS and on-disk size")
+    parser.add_argument("--ingest-sizes", default="10000,100000", help="Comma-separated corpus sizes to ingest")
+    parser.add_argument("--ingest-batch-sizes", default="256,1024,8192",
+                        help="Comma-separated insert batch sizes")
+    parser.add_argument("--embed-bench", action="store_true",
+                        help="Also benchmark embedding throughput (docs/sec, tokens/sec)")
+    parser.add_argument("--embed-batch-sizes", default="1,8,32,128", help="Comma-separated encode batch sizes")
+    parser.add_argument("--embed-threads", help="Comma-separated torch thread counts (default: 1, 2, 4, ... CPUs)")
+    parser.add_argument("--embed-precisions", default="float32,bfloat16,int8",
+                        help=f"Comma-separated precisions ({', '.join(PRECISIONS)})")
+    parser.add_argument("--embed-docs", type=int, default=512, help="Texts per input set")
+    parser.add_argument("--filtered", action="store_true",
+                        help="Also benchmark metadata-filtered search across filter selectivities")
+    parser.add_argument("--filter-vectors", type=int, default=100000, help="Corpus size for the filtered benchmark")
+    parser.add_argument("--filter-queries", type=int, default=200, help="Queries per selectivity in the filtered benchmark")
+    parser.add_argument("--selectivities", default="0.001,0.01,0.1,0.5,1",
+                        help="Comma-separated fractions of the corpus passing the filter")
+    parser.add_argument("--filter-strategies", default="selector,post",
+                        help="FAISS/HNSW filter strategies: selector (IDSelector in the search), post (post-filter)")
+    parser.add_argument("--load-test", action="store_true",
+                        help="Also measure QPS vs p95/p99 latency under concurrent load")
+    parser.add_argument("--load-vectors", type=int, default=10000, help="Corpus size for the load test")
+    parser.add_argument("--concurrency", default="1,2,4,8,16",
+                        help="Comma-separated client counts for the closed-loop sweep")
+    parser.add_argument("--rates", help="Comma-separated arrival rates (QPS) for the open loop "
+                                        "(default: 25%%-125%% of the best closed-loop QPS)")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per load point")
+    parser.add_argument("--pool", default="thread", choices=["thread", "process"],
+                        help="Worker pool for closed-loop clients")
+    args = parser.parse_args()
+    if args.fail_on_regression and args.no_history:
+        parser.error("--fail-on-regression compares against the history; it cannot be used with --no-history")
+    return args
+
+
+def parse_backend_options(options: List[str]) -> Dict[str, Dict]:
+    """Turn ['hnsw.ef_search=128', ...] into {'hnsw': {'ef_search': 128}}; values are parsed as JSON when possible."""
+    parsed = {}
+    for option in options:
+        key, value = option.split('=', 1)
+        backend, name = key.split('.', 1)
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            pass  # Plain strings such as a quantization mode
+        parsed.setdefault(backend, {})[name] = value
+    return parsed
+
+
 def main():
     """Main function to run the comparison."""
+    args = parse_args()
+    
     # Run comparison
-    comparator = VectorDatabaseComparison()
+    comparator = VectorDatabaseComparison(
+        faiss_quantization=args.faiss_quantization,
+        backends=args.backends.split(','),
+        backend_options=parse_backend_options(args.backend_option),
+        history_path=None if args.no_history else args.history_path
+    )
+    # Everything that changes what is measured, so only comparable runs are used as baselines
+    comparator.run_config['cli'] = {
+        key: value for key, value in vars(args).items()
+        if key not in ('history_path', 'no_history', 'fail_on_regression', 'baseline')
+    }
+    if args.scale:
+        # Runs first so its results are included in the saved JSON
+        comparator.benchmark_at_scale(args.scale, args.queries, args.k, args.corpus, args.text_path)
+    if args.ingest:
+        comparator.benchmark_ingestion(
+            tuple(int(n) for n in args.ingest_sizes.split(',')),
+            tuple(int(b) for b in args.ingest_batch_sizes.split(',')),
+            source=args.corpus, text_path=args.text_path
+        )
+    if args.embed_bench:
+        comparator.benchmark_embedding_throughput(
+            tuple(int(b) for b in args.embed_batch_sizes.split(',')),
+            [int(t) for t in args.embed_threads.split(',')] if args.embed_threads else None,
+            tuple(args.embed_precisions.split(',')),
+            num_docs=args.embed_docs, text_path=args.text_path
+        )
+    if args.filtered:
+        comparator.benchmark_filtered_search(
+            args.filter_vectors, args.filter_queries, args.k,
+            selectivities=tuple(float(s) for s in args.selectivities.split(',')),
+            filter_strategies=tuple(args.filter_strategies.split(',')),
+            source=args.corpus, text_path=args.text_path
+        )
+    if args.load_test:
+        comparator.benchmark_under_load(
+            args.load_vectors, args.queries, args.k,
+            concurrency_levels=tuple(int(c) for c in args.concurrency.split(',')),
+            rates=[float(r) for r in args.rates.split(',')] if args.rates else None,
+            duration_s=args.duration, pool=args.pool, source=args.corpus, text_path=args.text_path
+        )
     comparator.run_full_comparison()
+    
+    if args.fail_on_regression and comparator.last_run is not None:
+        print("\n🔎 Checking for regressions against the baseline run...")
+        if check_regressions(comparator.last_run, args.history_path, args.baseline):
+            sys.exit(1)
 
 
 if __name__ == "__main__":
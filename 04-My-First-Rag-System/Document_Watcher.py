@@ -0,0 +1,161 @@
+# Standard libraries
+import os  # File listing and stat calls
+import json  # The manifest is a small JSON file
+import hashlib  # Content hashes to tell real edits from touched files
+import threading  # Background thread that applies updates while questions are answered
+
+# LangChain core modules
+from langchain_core.documents import Document  # Wraps the text of a file for the chunking function
+
+
+# The manifest lives next to (not inside) the Chroma directory, e.g. ./chroma_groq_db.manifest.json
+def manifest_path_for(persist_directory):
+    return os.path.normpath(persist_directory) + ".manifest.json"
+
+
+# Incrementally keeps a Chroma vector store in sync with a directory of `.txt` files
+class IncrementalIndexer:
+    """
+    Keeps a manifest of {filename: mtime, size, sha256, chunk ids} and, on every sync,
+    re-chunks and re-embeds only added or modified files and deletes the vectors of removed files.
+    Chunk ids are deterministic ("<filename>::<chunk number>"), so every vector in the store
+    belongs to exactly one manifest entry.
+    """
+
+    def __init__(self, vectorstore, directory_path, chunk_fn, manifest_path):
+        self.vectorstore = vectorstore          # Chroma store that answers the questions
+        self.directory_path = directory_path    # Directory being watched
+        self.chunk_fn = chunk_fn                # Same chunking function as the full rebuild
+        self.manifest_path = manifest_path      # Where the manifest is persisted
+        self._lock = threading.Lock()           # Only one sync may run at a time
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        self._reconcile()
+
+    # Make the store and the manifest agree before the first sync
+    def _reconcile(self):
+        existing_ids = set(self.vectorstore.get(include=[])["ids"])
+        stale_ids = set(existing_ids)
+
+        for filename, entry in list(self.manifest.items()):
+            if all(chunk_id in existing_ids for chunk_id in entry["ids"]):
+                stale_ids.difference_update(entry["ids"])
+            else:
+                # Some vectors of this file are gone (e.g. the Chroma directory was reset): re-index it
+                del self.manifest[filename]
+
+        # Vectors no manifest entry owns (interrupted sync, older indexes) would show up as duplicates
+        if stale_ids:
+            print(f"Clearing {len(stale_ids)} vectors not tracked by the manifest")
+            self.vectorstore.delete(ids=list(stale_ids))
+
+    # List the `.txt` files currently in the directory with their (mtime, size)
+    def _scan(self):
+        files = {}
+        with os.scandir(self.directory_path) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith('.txt'):
+                    stat = entry.stat()
+                    files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    # Write the manifest atomically so a crash never leaves a half-written file
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    # Bring the vector store up to date with the directory; returns counts of changes
+    def sync(self):
+        with self._lock:
+            current = self._scan()
+            added, modified, failed = [], [], []
+            removed = [filename for filename in self.manifest if filename not in current]
+
+            # Drop vectors of removed files
+            stale_ids = []
+            for filename in removed:
+                stale_ids.extend(self.manifest.pop(filename)["ids"])
+            if stale_ids:
+                self.vectorstore.delete(ids=stale_ids)
+
+            for filename, (mtime, size) in current.items():
+                entry = self.manifest.get(filename)
+                if entry is not None and entry["mtime"] == mtime and entry["size"] == size:
+                    continue  # Cheap stat check passed, nothing to do
+
+                # Read once: the hash is taken over exactly the bytes that get chunked
+                path = os.path.join(self.directory_path, filename)
+                try:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                    sha256 = hashlib.sha256(data).hexdigest()
+
+                    if entry is not None and entry["sha256"] == sha256:
+                        entry["mtime"], entry["size"] = mtime, size  # Touched but not edited
+                        continue
+
+                    # Re-chunk and re-embed only the new and changed files
+                    document = Document(page_content=data.decode("utf-8"), metadata={"source": path})
+                    chunks = self.chunk_fn([document])
+                except (OSError, UnicodeDecodeError) as e:
+                    # Skip this file (its old vectors stay) so one bad file never blocks the others;
+                    # its manifest entry is unchanged, so it is retried on the next sync
+                    print(f"Skipping {filename}: {e}")
+                    failed.append(filename)
+                    continue
+                ids = [f"{filename}::{i}" for i in range(len(chunks))]
+
+                if entry is not None:
+                    self.vectorstore.delete(ids=entry["ids"])
+                    modified.append(filename)
+                else:
+                    added.append(filename)
+                if chunks:
+                    self.vectorstore.add_documents(chunks, ids=ids)
+                self.manifest[filename] = {
+                    "mtime": mtime,
+                    "size": size,
+                    "sha256": sha256,
+                    "ids": ids
+                }
+
+            self._save_manifest()
+
+        if added or modified or removed or failed:
+            print(f"Index updated: {len(added)} added, {len(modified)} modified, {len(removed)} removed"
+                  f"{f', {len(failed)} skipped' if failed else ''}")
+        return {"added": len(added), "modified": len(modified), "removed": len(removed), "failed": len(failed)}
+
+    # Delete every vector and index the directory from scratch
+    def rebuild(self):
+        with self._lock:
+            existing_ids = self.vectorstore.get(include=[])["ids"]
+            if existing_ids:
+                self.vectorstore.delete(ids=existing_ids)
+            self.manifest = {}
+        return self.sync()
+
+    # Poll the directory in a daemon thread so the interactive loop keeps answering
+    def start(self, interval=2.0):
+        def _run():
+            while not self._stop.wait(interval):
+                try:
+                    self.sync()
+                except Exception as e:  # Keep watching even if one file fails to load
+                    print(f"\nIndex update failed: {e}")
+
+        self._thread = threading.Thread(target=_run, name="document-watcher", daemon=True)
+        self._thread.start()
+
+    # Stop the background thread
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -1,12 +1,13 @@
 # Standard libraries
-import os  # For interacting with the file system
+import sys  # For reading the optional --watch flag
 from dotenv import load_dotenv  # For loading environment variables from a .env file
 
 # LangChain community modules
-from langchain_community.document_loaders import TextLoader  # Loads text documents
 from langchain.text_splitter import RecursiveCharacterTextSplitter  # Splits text into smaller chunks
 from langchain_community.embeddings import HuggingFaceEmbeddings  # Embedding model from HuggingFace
 from langchain_community.vectorstores import Chroma  # Chroma vector database for storing document embeddings
+from Embedding_Cache import CachedEmbeddings  # Persistent cache so unchanged chunks are never re-embedded
+from Document_Watcher import IncrementalIndexer, manifest_path_for  # Incremental re-indexing for watch mode
 
 # LLM and chain
 from langchain_groq import ChatGroq  # ChatGroq connects to Groq’s LLMs (e.g., LLaMA3)
@@ -16,17 +17,6 @@ from langchain.chains import RetrievalQA  # Retrieval-based QA chain
 load_dotenv()
 
 
-# Function to load all `.txt` files from the given directory
-def load_documents(directory_path):
-    documents = []
-    for filename in os.listdir(directory_path):
-        if filename.endswith('.txt'):  # Only consider text files
-            loader = TextLoader(os.path.join(directory_path, filename))  # Load text file
-            documents.extend(loader.load())  # Append loaded document(s) to list
-    print(f"Loaded {len(documents)} documents")
-    return documents
-
-
 # Function to split large documents into manageable chunks
 def chunk_documents(documents):
     splitter = RecursiveCharacterTextSplitter(
@@ -38,20 +28,35 @@ def chunk_documents(documents):
     return chunks
 
 
-# Function to create vector store using HuggingFace embeddings + Chroma DB
-def create_vector_store(chunks):
-    # Load a small, fast sentence transformer model
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-    
-    # Store chunks + their embeddings in Chroma DB
-    vectorstore = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        persist_directory="./chroma_groq_db"  # Location to store the vector DB on disk
+# Function to load the embedding model used for both indexing and querying
+def load_embeddings():
+    # Load a small, fast sentence transformer model, wrapped in the on-disk embedding cache
+    return CachedEmbeddings(
+        HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"),
+        model_name="all-MiniLM-L6-v2"
     )
-    
-    print("Vector store created and persisted.")
-    return vectorstore
+
+
+# Function to open the persisted Chroma DB and sync it with the documents directory (or rebuild it from scratch)
+def open_incremental_vector_store(directory_path, rebuild=False):
+    persist_directory = "./chroma_groq_db"
+    vectorstore = Chroma(
+        persist_directory=persist_directory,
+        embedding_function=load_embeddings()
+    )
+
+    # Only added/modified files are re-embedded and removed files are deleted
+    indexer = IncrementalIndexer(
+        vectorstore,
+        directory_path,
+        chunk_fn=chunk_documents,
+        manifest_path=manifest_path_for(persist_directory)
+    )
+    if rebuild:
+        indexer.rebuild()
+    else:
+        indexer.sync()
+    return vectorstore, indexer
 
 
 # Function to set up the retrieval-based question-answering chain using Groq LLaMA3
@@ -74,14 +79,18 @@ def setup_qa_chain(vectorstore):
 
 # Main logic
 def main():
-    print("Loading documents...")
-    documents = load_documents("./documents")  # Step 1: Load from ./documents directory
-
-    print("Chunking documents...")
-    chunks = chunk_documents(documents)  # Step 2: Split into chunks
-
-    print("Creating vectorstore...")
-    vectorstore = create_vector_store(chunks)  # Step 3: Convert chunks to vector DB
+    # Watch mode: reuse the persisted index and keep it in sync with ./documents in the background
+    watch = "--watch" in sys.argv
+    indexer = None
+
+    if watch:
+        print("Syncing vectorstore with ./documents...")
+        vectorstore, indexer = open_incremental_vector_store("./documents")
+        indexer.start()  # Poll for changes while the question loop runs
+    else:
+        # Full rebuild, through the same manifest and chunk ids as watch mode
+        print("Rebuilding vectorstore from ./documents...")
+        vectorstore, indexer = open_incremental_vector_store("./documents", rebuild=True)
 
     print("Setting up QA chain...")
     qa_chain = setup_qa_chain(vectorstore)  # Step 4: Connect Groq LLM to Chroma retriever
@@ -93,6 +102,8 @@ def main():
     while True:
         query = input("Your question: ")  # Take user input
         if query.lower() == 'quit':       # Stop if user types 'quit'
+            if indexer is not None:
+                indexer.stop()            # Stop watching the documents directory
             break
 
         # Use `invoke` instead of deprecated __call__
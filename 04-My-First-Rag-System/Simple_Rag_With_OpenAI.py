@@ -1,30 +1,20 @@
 # Core imports
-import os
+import sys  # For reading the optional --watch flag
 from dotenv import load_dotenv  # Load environment variables from .env file
 
 # Updated LangChain imports (v0.2+)
-from langchain_community.document_loaders import TextLoader  # Loads plain text files
 from langchain.text_splitter import RecursiveCharacterTextSplitter  # Splits documents into chunks
 from langchain_community.embeddings import OpenAIEmbeddings  # OpenAI embedding model
 from langchain_community.vectorstores import Chroma  # Vector store to persist embeddings
 from langchain_openai import ChatOpenAI  # OpenAI LLM wrapper for LangChain
+from Embedding_Cache import CachedEmbeddings  # Persistent cache so unchanged chunks are never re-embedded
+from Document_Watcher import IncrementalIndexer, manifest_path_for  # Incremental re-indexing for watch mode
 from langchain.chains import RetrievalQA  # Retrieval-augmented QA chain
 
 # Load environment variables like OPENAI_API_KEY
 load_dotenv()
 
 
-# Function to load all .txt files from a directory as LangChain documents
-def load_documents(directory_path):
-    documents = []
-    for filename in os.listdir(directory_path):
-        if filename.endswith('.txt'):  # Only pick .txt files
-            loader = TextLoader(os.path.join(directory_path, filename))
-            documents.extend(loader.load())  # Load and extend the document list
-    print(f"Loaded {len(documents)} documents")
-    return documents
-
-
 # Function to split large documents into manageable overlapping chunks
 def chunk_documents(documents):
     splitter = RecursiveCharacterTextSplitter(
@@ -36,16 +26,32 @@ def chunk_documents(documents):
     return chunks
 
 
-# Create Chroma vector store using OpenAI embeddings
-def create_vector_store(chunks):
-    embeddings = OpenAIEmbeddings()  # Use default embedding model from OpenAI
-    vectorstore = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        persist_directory="./chroma_openai_db"  # Store vector DB locally
+# Load the OpenAI embedding model used for both indexing and querying
+def load_embeddings():
+    base_embeddings = OpenAIEmbeddings()  # Use default embedding model from OpenAI
+    return CachedEmbeddings(base_embeddings, model_name=base_embeddings.model)  # Skip already-embedded chunks
+
+
+# Open the persisted Chroma DB and sync it with the documents directory (or rebuild it from scratch)
+def open_incremental_vector_store(directory_path, rebuild=False):
+    persist_directory = "./chroma_openai_db"
+    vectorstore = Chroma(
+        persist_directory=persist_directory,
+        embedding_function=load_embeddings()
     )
-    print("Vector store created and persisted.")
-    return vectorstore
+
+    # Only added/modified files are re-embedded and removed files are deleted
+    indexer = IncrementalIndexer(
+        vectorstore,
+        directory_path,
+        chunk_fn=chunk_documents,
+        manifest_path=manifest_path_for(persist_directory)
+    )
+    if rebuild:
+        indexer.rebuild()
+    else:
+        indexer.sync()
+    return vectorstore, indexer
 
 
 # Build a retrieval-based QA chain using OpenAI's GPT model
@@ -67,14 +73,18 @@ def setup_qa_chain(vectorstore):
 
 # Main application loop
 def main():
-    print("Loading documents...")
-    documents = load_documents("./documents")  # Load all documents in ./documents
-
-    print("Chunking documents...")
-    chunks = chunk_documents(documents)  # Split into manageable chunks
-
-    print("Creating vectorstore...")
-    vectorstore = create_vector_store(chunks)  # Generate and persist vector database
+    # Watch mode: reuse the persisted index and keep it in sync with ./documents in the background
+    watch = "--watch" in sys.argv
+    indexer = None
+
+    if watch:
+        print("Syncing vectorstore with ./documents...")
+        vectorstore, indexer = open_incremental_vector_store("./documents")
+        indexer.start()  # Poll for changes while the question loop runs
+    else:
+        # Full rebuild, through the same manifest and chunk ids as watch mode
+        print("Rebuilding vectorstore from ./documents...")
+        vectorstore, indexer = open_incremental_vector_store("./documents", rebuild=True)
 
     print("Setting up QA chain...")
     qa_chain = setup_qa_chain(vectorstore)  # Create the RAG pipeline
@@ -85,6 +95,8 @@ def main():
     while True:
         query = input("Your question: ")
         if query.lower() == 'quit':
+            if indexer is not None:
+                indexer.stop()  # Stop watching the documents directory
             break
 
         result = qa_chain.invoke({"query": query})  # Use `invoke()` as recommended
@@ -0,0 +1,224 @@
+# -------------------------------
+# Imports
+# -------------------------------
+
+import os                              # For the cache directory and environment overrides
+import json                            # Serialize collection versions and source chunks
+import sqlite3                         # Small, persistent store shipped with Python
+import threading                       # The cache is shared by Streamlit sessions and worker threads
+import time                            # Timestamps for TTL expiry and LRU eviction
+
+import numpy as np                     # Similarity search over cached question embeddings
+
+# -------------------------------
+# Defaults
+# -------------------------------
+
+# Where cached answers live (one SQLite file)
+DEFAULT_ANSWER_CACHE_DIR = os.getenv("ANSWER_CACHE_DIR", "./answer_cache")
+
+# Minimum cosine similarity between two questions for the cached answer to be reused
+DEFAULT_SIMILARITY_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+
+# Upper bound on cached answers, and how long an answer may be served (seconds)
+DEFAULT_MAX_ANSWERS = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "10000"))
+DEFAULT_ANSWER_TTL = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+
+
+# -------------------------------
+# Semantic Answer Cache
+# -------------------------------
+
+class SemanticAnswerCache:
+    """
+    Persistent cache of LLM answers, looked up by question similarity instead of exact text.
+
+    Each answer is stored with the embedding of its question, the scope it was produced in
+    (vector store, LLM backend, k) and the version of the vector store at that time.
+    A new question reuses a cached answer when its embedding is at least `threshold`
+    cosine-similar to a cached question of the same scope and the same store version.
+    Answers for older store versions are deleted once an answer for the new version is stored,
+    the least recently used answers are evicted over `max_entries`, and answers older than
+    `ttl_seconds` are never served and are deleted on the next store.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_ANSWER_CACHE_DIR, threshold=DEFAULT_SIMILARITY_THRESHOLD,
+                 max_entries=DEFAULT_MAX_ANSWERS, ttl_seconds=DEFAULT_ANSWER_TTL):
+        """
+        Parameters:
+        - cache_dir: directory holding the cache file
+        - threshold: minimum cosine similarity for a hit (1.0 = identical question embeddings only)
+        - max_entries: maximum number of answers kept before LRU eviction kicks in
+        - ttl_seconds: age after which an answer is no longer served (None = never expires)
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "answers.sqlite3")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        # In-memory copy of the question embeddings per (scope, version): (row ids, created_at, matrix)
+        self._matrices = {}
+        # (scope, version) pairs whose older versions were already deleted by this process
+        self._pruned = set()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " scope TEXT NOT NULL,"
+            " version TEXT NOT NULL,"
+            " question TEXT NOT NULL,"
+            " embedding BLOB NOT NULL,"
+            " answer TEXT NOT NULL,"
+            " sources TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_scope ON answers(scope, version)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_last_used ON answers(last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _load_matrix(self, scope, version):
+        """Question embeddings of one scope/version, read from SQLite once and kept in memory."""
+        key = (scope, version)
+        if key not in self._matrices:
+            rows = self._conn.execute(
+                "SELECT id, created_at, embedding FROM answers WHERE scope = ? AND version = ?", (scope, version)
+            ).fetchall()
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            created_at = np.array([row[1] for row in rows], dtype=np.float64)
+            matrix = np.array([np.frombuffer(row[2], dtype=np.float32) for row in rows], dtype=np.float32)
+            self._matrices[key] = (ids, created_at, matrix)
+        return self._matrices[key]
+
+    def _delete(self, condition, params=()):
+        """
+        Delete the answers matching an SQL condition and drop the in-memory matrices of
+        the (scope, version) pairs they belonged to; the others stay valid.
+        """
+        affected = self._conn.execute(
+            f"SELECT DISTINCT scope, version FROM answers WHERE {condition}", params
+        ).fetchall()
+        if affected:
+            self._conn.execute(f"DELETE FROM answers WHERE {condition}", params)
+            for key in affected:
+                self._matrices.pop(tuple(key), None)
+
+    def lookup(self, scope, version, embedding):
+        """
+        Find a cached answer for a question similar enough to the given one.
+
+        Parameters:
+        - scope: string identifying vector store, backend and retrieval settings
+        - version: JSON-serializable version of the vector store (e.g. collection_version())
+        - embedding: embedding of the new question
+
+        Returns:
+        - Dictionary with 'answer', 'sources' (list of {'page_content', 'metadata'}),
+          'question' (the cached one) and 'similarity', or None on a miss
+        """
+        version = json.dumps(version)
+        query = self._normalize(embedding)
+        now = time.time()
+
+        with self._lock:
+            ids, created_at, matrix = self._load_matrix(scope, version)
+            row = None
+            if len(ids):
+                similarities = matrix @ query
+                if self.ttl_seconds is not None:
+                    # Expired answers must not hide a fresh one that is slightly less similar
+                    similarities = np.where(now - created_at > self.ttl_seconds, -np.inf, similarities)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    row = self._conn.execute(
+                        "SELECT question, answer, sources FROM answers WHERE id = ?", (int(ids[best]),)
+                    ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (now, int(ids[best])))
+            self._conn.commit()
+            self.hits += 1
+
+        question, answer, sources = row
+        return {
+            "answer": answer,
+            "sources": json.loads(sources),
+            "question": question,
+            "similarity": float(similarities[best])
+        }
+
+    def store(self, scope, version, question, embedding, answer, sources):
+        """
+        Save an answer and evict expired and least recently used answers.
+
+        Parameters:
+        - scope / version: as in `lookup`
+        - question: the question text (kept for inspection)
+        - embedding: embedding of the question
+        - answer: the LLM's answer
+        - sources: list of {'page_content', 'metadata'} dictionaries
+        """
+        version = json.dumps(version)
+        vector = self._normalize(embedding)
+        now = time.time()
+
+        key = (scope, version)
+
+        with self._lock:
+            if key not in self._pruned:
+                # Answers produced against another version of the store are stale: drop them once
+                self._delete("scope = ? AND version != ?", (scope, version))
+                self._pruned.add(key)
+            # Replace a previous answer for the same question, e.g. an expired one
+            self._delete("scope = ? AND version = ? AND question = ?", (scope, version, question))
+            cursor = self._conn.execute(
+                "INSERT INTO answers (scope, version, question, embedding, answer, sources, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (scope, version, question, vector.tobytes(), answer, json.dumps(sources), now, now)
+            )
+            if key in self._matrices:
+                ids, created_at, matrix = self._matrices[key]
+                self._matrices[key] = (
+                    np.append(ids, cursor.lastrowid),
+                    np.append(created_at, now),
+                    np.vstack([matrix.reshape(len(ids), -1), vector[None, :]]) if len(ids) else vector[None, :]
+                )
+            if self.ttl_seconds is not None:
+                self._delete("created_at < ?", (now - self.ttl_seconds,))
+            overflow = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._delete("id IN (SELECT id FROM answers ORDER BY last_used ASC LIMIT ?)", (overflow,))
+            self._conn.commit()
+
+    def clear(self, scope=None):
+        """Delete every cached answer, or only those of one scope."""
+        with self._lock:
+            if scope is None:
+                self._conn.execute("DELETE FROM answers")
+            else:
+                self._conn.execute("DELETE FROM answers WHERE scope = ?", (scope,))
+            self._conn.commit()
+            self._matrices.clear()
+            self._pruned.clear()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -2,10 +2,9 @@
 # Imports
 # -------------------------------
 
-import nltk                          # Natural Language Toolkit for tokenization
-from nltk.tokenize import sent_tokenize  # Function to split text into sentences
 import logging                       # For logging information and warnings
 import re                            # For cleaning and normalizing text using regex
+from Document_Processor import ensure_punkt_tokenizer  # Shared, one-time NLTK punkt check
 
 # -------------------------------
 # Logging Configuration
@@ -14,18 +13,6 @@ import re                            # For cleaning and normalizing text using r
 # Set up logging to print INFO level messages with a clean format
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
-# -------------------------------
-# Ensure Tokenizer Availability
-# -------------------------------
-
-# Check if 'punkt' sentence tokenizer is downloaded; download if missing
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    logging.info("Downloading NLTK punkt tokenizer...")
-    nltk.download('punkt')
-
-
 # -------------------------------
 # Text Cleaning Utility
 # -------------------------------
@@ -111,6 +98,10 @@ def sentence_based_chunking(text, max_sentences=5, overlap_sentences=1, min_leng
         logging.warning("Input text is empty.")
         return []
 
+    # NLTK is only imported (and punkt checked) when sentence chunking is actually used
+    from nltk.tokenize import sent_tokenize
+    ensure_punkt_tokenizer()
+
     sentences = sent_tokenize(text)  # Tokenize entire text into individual sentences
     chunks = []
 
@@ -4,15 +4,18 @@
 
 import os                     # For interacting with the operating system and file paths (not directly used in this script)
 import json                   # For parsing JSON content
-import PyPDF2                 # Library to read and extract text from PDF files
-import pandas as pd           # For reading and manipulating CSV and tabular data
 import re                     # For regex operations like cleaning text
 import logging                # For logging information, warnings, or errors
-import nltk                   # Natural Language Toolkit, used for tokenizing text
-from bs4 import BeautifulSoup # For parsing HTML and cleaning it from tags like <script>, <style>
-from nltk.tokenize import sent_tokenize  # NLTK's sentence-level tokenizer
+from functools import lru_cache  # Run the NLTK tokenizer check only once per process
 from io import StringIO       # Allows treating a string as a file (used for reading CSV from a string)
 
+# Heavy parsers are imported inside the functions that need them, so importing this
+# module is instant and e.g. a CSV-only ingest never loads the PDF or HTML stacks:
+# - PyPDF2        -> extract_text_from_pdf
+# - bs4           -> extract_text_from_html
+# - pandas        -> extract_text_from_csv
+# - nltk          -> tokenize_sentences
+
 # -------------------------------
 # Logging Setup
 # -------------------------------
@@ -26,13 +29,20 @@ logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 # NLTK Punkt Tokenizer Setup
 # -------------------------------
 
-# Make sure the sentence tokenizer is downloaded before using it
-# It’s needed for splitting text into sentences (tokenizing)
-try:
-    nltk.data.find('tokenizers/punkt')  # Check if tokenizer is available
-except LookupError:
-    logging.info("Downloading NLTK punkt tokenizer...")
-    nltk.download('punkt')  # Download if not found
+@lru_cache(maxsize=None)
+def ensure_punkt_tokenizer():
+    """
+    Make sure the sentence tokenizer is downloaded before using it.
+    It’s needed for splitting text into sentences (tokenizing).
+    Runs on the first sentence split instead of at import time.
+    """
+    import nltk  # Natural Language Toolkit, used for tokenizing text
+
+    try:
+        nltk.data.find('tokenizers/punkt')  # Check if tokenizer is available
+    except LookupError:
+        logging.info("Downloading NLTK punkt tokenizer...")
+        nltk.download('punkt')  # Download if not found
 
 # -------------------------------
 # Function: Extract Text from PDF
@@ -43,6 +53,8 @@ def extract_text_from_pdf(file) -> str:
     Extract text from a PDF file or file-like object.
     Iterates through all pages and extracts the visible text.
     """
+    import PyPDF2  # Library to read and extract text from PDF files
+
     text = ""
     try:
         pdf_reader = PyPDF2.PdfReader(file)  # Load the PDF file
@@ -63,6 +75,8 @@ def extract_text_from_html(html_content: str) -> str:
     Extract readable and visible text from raw HTML content.
     Strips out scripts, styles, and unnecessary tags.
     """
+    from bs4 import BeautifulSoup  # For parsing HTML and cleaning it from tags like <script>, <style>
+
     try:
         soup = BeautifulSoup(html_content, 'html.parser')  # Parse HTML
 
@@ -86,6 +100,8 @@ def extract_text_from_csv(csv_content: str, delimiter=',', include_headers=True)
     Extracts text from a CSV string.
     Optionally includes column headers. Each row becomes a sentence-like string.
     """
+    import pandas as pd  # For reading and manipulating CSV and tabular data
+
     try:
         df = pd.read_csv(StringIO(csv_content), delimiter=delimiter)  # Read CSV from string
 
@@ -174,6 +190,9 @@ def tokenize_sentences(text: str) -> list:
     """
     Split a large text block into individual sentences using NLTK.
     """
+    from nltk.tokenize import sent_tokenize  # NLTK's sentence-level tokenizer
+
+    ensure_punkt_tokenizer()
     try:
         return sent_tokenize(text)  # Return list of sentences
     except Exception as e:
@@ -0,0 +1,270 @@
+# Vendored: identical copies live in 04-My-First-Rag-System and 05-Document-Chunking-Strategies
+# because each tutorial folder runs on its own (no cross-folder imports); edit them together.
+
+# -------------------------------
+# Imports
+# -------------------------------
+
+import os                              # For the cache directory and environment overrides
+import hashlib                         # Content hashes used as cache keys
+import sqlite3                         # Small, persistent key/value store shipped with Python
+import threading                       # The cache can be shared between threads (e.g. watch mode)
+import time                            # Access timestamps for LRU eviction
+from array import array                # Compact float32 (de)serialization without extra dependencies
+
+from langchain_core.embeddings import Embeddings  # Base interface every LangChain embedding model implements
+from Query_Cache import normalize_text            # Same text normalization as the query cache keys
+
+# -------------------------------
+# Defaults
+# -------------------------------
+
+# Where cached vectors live; point several projects at the same directory to share one cache
+DEFAULT_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./embedding_cache")
+
+# Upper bound on cached vectors (~1.5 KB each for all-MiniLM-L6-v2, so ~750 MB at the default)
+DEFAULT_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+
+# SQLite limits the number of "?" parameters per statement, so lookups are done in slices
+_SQL_BATCH = 500
+
+
+# -------------------------------
+# Key Helpers
+# -------------------------------
+
+def cache_key(model_name, model_revision, text):
+    """
+    Build the content address of one embedding.
+
+    Parameters:
+    - model_name: name of the embedding model (e.g. "all-MiniLM-L6-v2")
+    - model_revision: model revision / version tag (see resolve_model_revision), so upgrading
+      the model never reuses stale vectors
+    - text: raw chunk text (normalized before hashing)
+
+    Returns:
+    - Hex SHA-256 digest identifying (model, revision, text)
+    """
+    payload = "\0".join([model_name, model_revision, normalize_text(text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def resolve_model_revision(embeddings):
+    """
+    Identify the exact version of an embedding model.
+
+    - Local models (HuggingFace / sentence-transformers, exposing a torch module as `.client`):
+      SHA-256 of the weights, so a re-downloaded or fine-tuned model gets new cache keys.
+    - Hosted models (OpenAI, ...): the provider versions models by name, so the model name and
+      the requested output dimensions are used.
+
+    Returns:
+    - Short string used as the model revision in cache keys
+    """
+    client = getattr(embeddings, "client", None)
+    if callable(getattr(client, "state_dict", None)):
+        digest = hashlib.sha256()
+        for name, tensor in sorted(client.state_dict().items()):
+            digest.update(name.encode("utf-8"))
+            digest.update(tensor.detach().float().cpu().numpy().tobytes())
+        return "weights-" + digest.hexdigest()[:16]
+
+    model = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None)
+    return f"{type(embeddings).__name__}:{model}:{getattr(embeddings, 'dimensions', None)}"
+
+
+# Model classes whose embed_query(text) equals embed_documents([text])[0] (no query instruction)
+_SYMMETRIC_MODELS = {"HuggingFaceEmbeddings", "SentenceTransformerEmbeddings", "OpenAIEmbeddings",
+                     "AzureOpenAIEmbeddings"}
+
+
+def encodes_queries_as_documents(embeddings):
+    """
+    True if the model embeds a query exactly like a document, so several queries can be
+    encoded in one embed_documents call. Unknown models, and models configured with a query
+    instruction or query-specific encode arguments (BGE, E5, Instructor, ...), return False.
+    """
+    if type(embeddings).__name__ not in _SYMMETRIC_MODELS:
+        return False
+    return not (getattr(embeddings, "query_instruction", None) or getattr(embeddings, "query_encode_kwargs", None))
+
+
+# -------------------------------
+# Persistent Store
+# -------------------------------
+
+class EmbeddingCache:
+    """
+    On-disk embedding store keyed by content hash with size-bounded LRU eviction.
+    Vectors are stored as float32 blobs in a single SQLite file inside `cache_dir`.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "embeddings.sqlite3")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")      # Readers never block the writer
+        self._conn.execute("PRAGMA synchronous=NORMAL")    # Durable enough for a cache, much faster
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._size = self._count()  # Kept up to date by put_many, so inserts never scan the table
+
+    def get_many(self, keys):
+        """
+        Look up several keys at once.
+
+        Returns:
+        - Dictionary {key: list of floats} for the keys that were found
+        """
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        now = time.time()
+
+        with self._lock:
+            for start in range(0, len(unique_keys), _SQL_BATCH):
+                batch = unique_keys[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+
+            # Refresh access time of the hits so they survive the next eviction
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(now, key) for key in found]
+            )
+            self._conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(unique_keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        """
+        Store {key: vector} pairs and evict the least recently used entries over the size bound.
+        Keys are content addresses, so a key that is already stored holds the same vector and is kept.
+        """
+        now = time.time()
+        rows = [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+
+        with self._lock:
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            ).rowcount
+            self._size += max(inserted, 0)
+            if self._size > self.max_entries:
+                # Other processes may share the file: recount before deleting anything
+                self._size = self._count()
+                overflow = self._size - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM embeddings WHERE key IN ("
+                        " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                        (overflow,)
+                    )
+                    self._size -= overflow
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._count()
+
+    def _count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# -------------------------------
+# LangChain Embeddings Wrapper
+# -------------------------------
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps any LangChain embedding model so that documents are only embedded once.
+    Chunks whose (model, revision, normalized text) were seen before are served from disk;
+    only the new chunks are sent to the underlying model, in a single batch.
+    Queries can go through an in-memory LRU/TTL cache (Query_Cache.QueryEmbeddingCache).
+    """
+
+    def __init__(self, embeddings, model_name, model_revision=None,
+                 cache_dir=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES, query_cache=None,
+                 batch_queries=None):
+        """
+        Parameters:
+        - embeddings: the underlying LangChain embedding model (HuggingFace, OpenAI, ...)
+        - model_name: model identifier used in the cache key
+        - model_revision: model revision used in the cache key (resolved from the model if None)
+        - cache_dir: directory holding the cache file (shared between projects if identical)
+        - max_entries: maximum number of vectors kept before LRU eviction kicks in
+        - query_cache: QueryEmbeddingCache shared by embed_query/embed_queries (queries are not cached if None)
+        - batch_queries: encode query misses in one embed_documents call; only correct when the
+          model embeds queries like documents (detected with encodes_queries_as_documents if None)
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.model_revision = model_revision or resolve_model_revision(embeddings)
+        self.cache = EmbeddingCache(cache_dir=cache_dir, max_entries=max_entries)
+        self.query_cache = query_cache
+        self.batch_queries = encodes_queries_as_documents(embeddings) if batch_queries is None else batch_queries
+
+    def embed_documents(self, texts):
+        keys = [cache_key(self.model_name, self.model_revision, text) for text in texts]
+        vectors = self.cache.get_many(keys)
+
+        # Embed each missing text once, even if it appears several times in this batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), new_vectors))
+            self.cache.put_many(computed)
+            vectors.update(computed)
+
+        print(f"Embedding cache: {len(texts) - len(missing)} reused, {len(missing)} newly embedded")
+        return [list(vectors[key]) for key in keys]
+
+    def embed_query(self, text):
+        if self.query_cache is None:
+            # Without a query cache there is nothing to look up, so embed the query directly
+            return self.embeddings.embed_query(text)
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts):
+        """
+        Embed several queries, encoding only those missing from the query cache.
+        The misses are encoded in a single embed_documents call when the model embeds queries
+        like documents (batch_queries); models with query instructions or asymmetric encoders
+        get one embed_query call per miss, so the cache never holds a document vector under a
+        query key. Queries are not written to the on-disk document cache, and without a
+        query_cache every query is encoded.
+        """
+        def compute(missing_texts):
+            if self.batch_queries:
+                return self.embeddings.embed_documents(missing_texts)  # One encoder call for all misses
+            return [self.embeddings.embed_query(text) for text in missing_texts]
+
+        if self.query_cache is None:
+            return [list(vector) for vector in compute(list(texts))]
+
+        model_id = f"{self.model_name}@{self.model_revision}"
+        return [list(vector) for vector in self.query_cache.get_or_compute(model_id, texts, compute)]
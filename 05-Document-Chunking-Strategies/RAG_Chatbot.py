@@ -3,14 +3,23 @@
 # -------------------------------
 
 import os                              # To work with environment variables
+import time                            # Latency measurements for the streaming path
+import asyncio                         # Async streaming answer path
+import threading                       # Lock protecting the shared QA chain registry
+from functools import lru_cache        # Load the embedding model only once per process
 from dotenv import load_dotenv         # Load variables from a .env file (e.g., API keys)
 
 # Chroma vector DB and embeddings
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import HuggingFaceEmbeddings
+from Embedding_Cache import CachedEmbeddings  # Wraps the model so queries go through the query cache
+from Query_Cache import QueryEmbeddingCache   # Repeated questions skip the encoder (in-memory LRU/TTL)
+from Answer_Cache import SemanticAnswerCache  # Near-duplicate questions skip the LLM (persistent, similarity-based)
 
 # RAG chain wrapper
 from langchain.chains import RetrievalQA
+from langchain.schema import Document  # Rebuild source chunks from batched vector-store results
+from langchain_core.prompts import format_document  # Render chunks exactly like the "stuff" chain does
 
 # Groq integration (uses LLaMA3)
 from langchain_groq import ChatGroq
@@ -28,52 +37,89 @@ load_dotenv()  # Loads API keys or config from .env file
 # Load Vector Database
 # -------------------------------
 
-def load_vector_db(persist_dir="./chroma_groq_db"):
+@lru_cache(maxsize=None)
+def load_embeddings(model_name="all-MiniLM-L6-v2"):
+    """
+    Load the sentence-transformer embedding model once per process.
+    Later calls (including Streamlit reruns, which keep imported modules) reuse the same instance.
+    Query embeddings are cached, so popular questions are only encoded once
+    (hit/miss counters: load_embeddings().query_cache.stats()).
+    """
+    return CachedEmbeddings(HuggingFaceEmbeddings(model_name=model_name), model_name=model_name,
+                            query_cache=QueryEmbeddingCache())
+
+
+def load_vector_db(persist_dir="./chroma_groq_db", k=3):
     """
     Load a persisted Chroma vector database with embedded documents.
 
     Parameters:
     - persist_dir: path where Chroma vector DB is stored.
+    - k: number of similar chunks returned per query.
 
     Returns:
     - Retriever object to fetch relevant documents using vector similarity.
     """
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")  # Load embedding model
+    embeddings = load_embeddings()  # Shared embedding model
 
     # Load the existing Chroma DB and associate it with embedding function
     vectorstore = Chroma(persist_directory=persist_dir, embedding_function=embeddings)
 
-    # Return a retriever that will return top 3 similar chunks
-    return vectorstore.as_retriever(search_kwargs={"k": 3})
+    # Return a retriever that will return top k similar chunks
+    return vectorstore.as_retriever(search_kwargs={"k": k})
+
+
+def collection_version(persist_dir):
+    """
+    Fingerprint of the Chroma files on disk.
+    Changes whenever chunks are added to or removed from the collection, and only then.
+
+    Returns:
+    - Tuple of (file name, modification time, size) for the Chroma SQLite files, or None if missing.
+    """
+    version = []
+    for name in ("chroma.sqlite3", "chroma.sqlite3-wal"):
+        path = os.path.join(persist_dir, name)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            version.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(version) or None
 
 # -------------------------------
 # Set Up RetrievalQA Chain
 # -------------------------------
 
-def get_qa_chain(use_groq=True):
+def build_llm(use_groq=True):
     """
-    Initialize a RetrievalQA chain using Groq (LLaMA3) or OpenAI (GPT-3.5).
-    
+    Create the chat model for the chosen backend (Groq LLaMA3 or OpenAI GPT-3.5).
+    """
+    if use_groq:
+        return ChatGroq(
+            model_name="llama3-8b-8192",  # Groq supports LLaMA3 model
+            temperature=0.7               # Creativity level
+        )
+
+    from langchain_openai import ChatOpenAI  # Lazy import to avoid import error
+    return ChatOpenAI(
+        model_name="gpt-3.5-turbo",
+        temperature=0.7
+    )
+
+
+def build_qa_chain(use_groq=True, persist_dir="./chroma_groq_db", k=3):
+    """
+    Build a new RetrievalQA chain using Groq (LLaMA3) or OpenAI (GPT-3.5).
+
     Parameters:
     - use_groq: Boolean, whether to use Groq LLaMA3 or OpenAI's GPT.
+    - persist_dir: path where Chroma vector DB is stored.
+    - k: number of chunks retrieved per question.
 
     Returns:
     - RetrievalQA chain that uses the retriever and LLM to answer questions.
     """
-    retriever = load_vector_db()  # Load retriever (vector search)
-
-    # Choose which LLM to use
-    if use_groq:
-        llm = ChatGroq(
-            model_name="llama3-8b-8192",  # Groq supports LLaMA3 model
-            temperature=0.7               # Creativity level
-        )
-    else:
-        from langchain_openai import ChatOpenAI  # Lazy import to avoid import error
-        llm = ChatOpenAI(
-            model_name="gpt-3.5-turbo",
-            temperature=0.7
-        )
+    retriever = load_vector_db(persist_dir, k=k)  # Load retriever (vector search)
+    llm = build_llm(use_groq)                     # Choose which LLM to use
 
     # Build the QA chain using "stuff" strategy (concatenate documents)
     qa_chain = RetrievalQA.from_chain_type(
@@ -85,31 +131,350 @@ def get_qa_chain(use_groq=True):
 
     return qa_chain
 
+# -------------------------------
+# Warm QA Chain Registry
+# -------------------------------
+
+# Process-wide registry: (persist_dir, backend, k) -> {"version": ..., "chain": ...}
+# Module state survives Streamlit reruns, so each chain is built once per process.
+_qa_chain_registry = {}
+_registry_lock = threading.Lock()  # Guards the two dictionaries, never held while building
+_build_locks = {}                  # One lock per key: a cold build only blocks callers of that key
+
+
+def get_qa_chain(use_groq=True, persist_dir="./chroma_groq_db", k=3):
+    """
+    Return a warm RetrievalQA chain, building it only on first use.
+    The chain is rebuilt only when the underlying Chroma collection changes on disk.
+
+    Parameters:
+    - use_groq: Boolean, whether to use Groq LLaMA3 or OpenAI's GPT.
+    - persist_dir: path where Chroma vector DB is stored.
+    - k: number of chunks retrieved per question.
+
+    Returns:
+    - RetrievalQA chain shared by every caller with the same settings.
+    """
+    key = (os.path.abspath(persist_dir), "groq" if use_groq else "openai", k)
+    version = collection_version(persist_dir)
+
+    with _registry_lock:
+        entry = _qa_chain_registry.get(key)
+        if entry is not None and entry["version"] == version:
+            return entry["chain"]
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+
+    with build_lock:
+        # Another caller may have built it while this one waited
+        with _registry_lock:
+            entry = _qa_chain_registry.get(key)
+        if entry is None or entry["version"] != version:
+            entry = {
+                "version": version,
+                "chain": build_qa_chain(use_groq=use_groq, persist_dir=persist_dir, k=k)
+            }
+            with _registry_lock:
+                _qa_chain_registry[key] = entry
+        return entry["chain"]
+
+
+def invalidate_qa_chains(persist_dir=None):
+    """
+    Drop cached chains (all of them, or only those for `persist_dir`).
+    Call after writing to a collection to force a rebuild on the next question.
+    """
+    with _registry_lock:
+        if persist_dir is None:
+            _qa_chain_registry.clear()
+            return
+        target = os.path.abspath(persist_dir)
+        for key in [key for key in _qa_chain_registry if key[0] == target]:
+            del _qa_chain_registry[key]
+
+def warm_up_qa_chain(use_groq=True, persist_dir="./chroma_groq_db", k=3, background=True):
+    """
+    Build the QA chain ahead of the first question (embedding model, Chroma, LLM client).
+
+    Parameters:
+    - use_groq / persist_dir / k: settings of the chain to warm up
+    - background: run in a daemon thread and return it instead of blocking
+
+    Failures (e.g. a missing API key) are logged and left for the first real question to report.
+    """
+    def warm():
+        try:
+            get_qa_chain(use_groq=use_groq, persist_dir=persist_dir, k=k)
+        except Exception as e:
+            print(f"QA chain warm-up failed: {e}")
+
+    if not background:
+        warm()
+        return None
+    thread = threading.Thread(target=warm, name="qa-chain-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+# -------------------------------
+# Semantic Answer Cache
+# -------------------------------
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """
+    Process-wide semantic answer cache, opened on first use.
+    Threshold, size, TTL and location come from the ANSWER_CACHE_* environment variables.
+    """
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            _answer_cache = SemanticAnswerCache()
+        return _answer_cache
+
+
+def _answer_scope(use_groq, persist_dir, k):
+    # Answers are only shared between questions asked against the same store, backend and k
+    return f"{os.path.abspath(persist_dir)}|{'groq' if use_groq else 'openai'}|k={k}"
+
+
+def lookup_cached_answer(query, use_groq=True, persist_dir="./chroma_groq_db", k=3, embedding=None):
+    """
+    Return a previously generated answer to a similar question, without calling the LLM.
+
+    Parameters:
+    - embedding: embedding of `query`, if already computed (embedded here otherwise)
+
+    Returns:
+    - Dictionary with 'answer', 'sources' (Document objects) and 'cached': True, or None on a miss.
+      Answers produced before the Chroma collection last changed are never returned.
+    """
+    if embedding is None:
+        embedding = load_embeddings().embed_query(query)  # Served from the query cache when repeated
+    hit = get_answer_cache().lookup(_answer_scope(use_groq, persist_dir, k), collection_version(persist_dir), embedding)
+    if hit is None:
+        return None
+    sources = [Document(page_content=src["page_content"], metadata=src["metadata"]) for src in hit["sources"]]
+    return {"answer": hit["answer"], "sources": sources, "cached": True}
+
+
+def cache_answer(query, answer, sources, use_groq=True, persist_dir="./chroma_groq_db", k=3, embedding=None):
+    """
+    Store a generated answer and its source chunks in the semantic answer cache.
+    `embedding` is the embedding of `query`, if already computed.
+    """
+    if embedding is None:
+        embedding = load_embeddings().embed_query(query)
+    get_answer_cache().store(
+        _answer_scope(use_groq, persist_dir, k),
+        collection_version(persist_dir),
+        query,
+        embedding,
+        answer,
+        [{"page_content": doc.page_content, "metadata": dict(doc.metadata or {})} for doc in sources]
+    )
+
 # -------------------------------
 # Main Query Handler
 # -------------------------------
 
-def answer_question(query: str, use_groq=True):
+def answer_question(query: str, use_groq=True, persist_dir="./chroma_groq_db", k=3, use_cache=True):
     """
     Answers a question by retrieving relevant chunks and generating an answer.
 
     Parameters:
     - query: user's natural language question
     - use_groq: whether to use Groq or OpenAI as the backend LLM
+    - persist_dir: path where Chroma vector DB is stored
+    - k: number of chunks retrieved for the answer
+    - use_cache: reuse the answer to a near-identical earlier question (no LLM call)
 
     Returns:
     - Dictionary with:
         - 'answer': LLM's answer
         - 'sources': list of source Document objects used to answer
+        - 'cached': True if the answer came from the semantic answer cache
     """
-    chain = get_qa_chain(use_groq=use_groq)  # Set up RAG chain
+    if use_cache:
+        # Checked before the chain is built: a hit needs neither the vector store nor the LLM
+        cached = lookup_cached_answer(query, use_groq=use_groq, persist_dir=persist_dir, k=k)
+        if cached is not None:
+            return cached
+
+    chain = get_qa_chain(use_groq=use_groq, persist_dir=persist_dir, k=k)  # Warm RAG chain from the registry
     result = chain.invoke({"query": query})  # Send the query to the chain
 
     # Parse response
     answer = result["result"]
     sources = result["source_documents"]
 
+    if use_cache:
+        cache_answer(query, answer, sources, use_groq=use_groq, persist_dir=persist_dir, k=k)
+
     return {
         "answer": answer,
-        "sources": sources
+        "sources": sources,
+        "cached": False
+    }
+
+# -------------------------------
+# Batched Query Handler
+# -------------------------------
+
+def answer_questions(queries, use_groq=True, persist_dir="./chroma_groq_db", k=3, max_concurrency=8,
+                     use_cache=True):
+    """
+    Answers many questions at once, for offline evaluation or FAQ pre-generation.
+    Questions found in the semantic answer cache are answered from it; the others are
+    retrieved with one vector-store query and their LLM calls are dispatched concurrently.
+
+    Parameters:
+    - queries: list of natural language questions
+    - use_groq: whether to use Groq or OpenAI as the backend LLM
+    - persist_dir: path where Chroma vector DB is stored
+    - k: number of chunks retrieved per question
+    - max_concurrency: maximum number of LLM calls in flight at the same time
+    - use_cache: answer near-identical earlier questions from the semantic answer cache
+
+    Returns:
+    - List of dictionaries (same order as `queries`) with:
+        - 'answer': LLM's answer (None if the LLM call failed)
+        - 'sources': list of source Document objects used to answer
+        - 'cached': True if the answer came from the semantic answer cache
+        - 'error': error message, only present if the LLM call failed
+    """
+    queries = list(queries)
+    if not queries:
+        return []
+
+    # Step 1: embed every query not already in the query cache (one encoder call for symmetric models)
+    query_embeddings = load_embeddings().embed_queries(queries)
+
+    # Step 2: serve what the answer cache already knows; only the misses go further
+    answers = [None] * len(queries)
+    if use_cache:
+        for i, (query, embedding) in enumerate(zip(queries, query_embeddings)):
+            answers[i] = lookup_cached_answer(query, use_groq=use_groq, persist_dir=persist_dir, k=k,
+                                              embedding=embedding)
+    pending = [i for i, answer in enumerate(answers) if answer is None]
+    if not pending:
+        return answers
+
+    chain = get_qa_chain(use_groq=use_groq, persist_dir=persist_dir, k=k)  # Warm RAG chain
+    vectorstore = chain.retriever.vectorstore
+
+    # Step 3: top-k retrieval for the remaining questions in a single Chroma query
+    results = vectorstore._collection.query(
+        query_embeddings=[query_embeddings[i] for i in pending],
+        n_results=k,
+        include=["documents", "metadatas"]
+    )
+    sources = [
+        [Document(page_content=text, metadata=metadata or {}) for text, metadata in zip(texts, metadatas)]
+        for texts, metadatas in zip(results["documents"], results["metadatas"])
+    ]
+
+    # Step 4: run the "stuff" LLM step concurrently, skipping the per-question retrieval
+    outputs = chain.combine_documents_chain.batch(
+        [{"input_documents": docs, "question": queries[i]} for i, docs in zip(pending, sources)],
+        config={"max_concurrency": max_concurrency},
+        return_exceptions=True  # One failed call should not discard thousands of answers
+    )
+
+    for i, docs, output in zip(pending, sources, outputs):
+        if isinstance(output, Exception):
+            answers[i] = {"answer": None, "sources": docs, "cached": False, "error": str(output)}
+            continue
+        answers[i] = {"answer": output["output_text"], "sources": docs, "cached": False}
+        if use_cache:
+            cache_answer(queries[i], output["output_text"], docs, use_groq=use_groq, persist_dir=persist_dir,
+                         k=k, embedding=query_embeddings[i])
+
+    return answers
+
+# -------------------------------
+# Async Streaming Query Handler
+# -------------------------------
+
+async def astream_answer(query: str, use_groq=True, persist_dir="./chroma_groq_db", k=3, llm=None,
+                         use_cache=True):
+    """
+    Async variant of `answer_question` that streams the answer as it is generated.
+    Retrieval runs in a worker thread so the event loop is never blocked.
+
+    Parameters:
+    - query: user's natural language question
+    - use_groq: whether to use Groq or OpenAI as the backend LLM
+    - persist_dir: path where Chroma vector DB is stored
+    - k: number of chunks retrieved for the answer
+    - llm: optional LangChain LLM / chat model overriding the chain's one
+           (e.g. a fake streaming LLM from langchain_core for tests); disables the answer cache
+    - use_cache: serve near-identical questions from the semantic answer cache
+                 (the whole answer then arrives as a single token event)
+
+    Yields dictionaries, in this order:
+    - {'type': 'sources', 'sources': [...], 'retrieval_latency': seconds}
+    - {'type': 'token', 'token': str}   (one per streamed token)
+    - {'type': 'done', 'answer': str, 'sources': [...],
+       'time_to_first_token': seconds or None, 'total_latency': seconds, 'cached': bool}
+    """
+    start = time.perf_counter()
+    use_cache = use_cache and llm is None
+
+    if use_cache:
+        # Checked before the chain is built: a hit needs neither the vector store nor the LLM
+        cached = await asyncio.to_thread(lookup_cached_answer, query, use_groq, persist_dir, k)
+        if cached is not None:
+            yield {"type": "sources", "sources": cached["sources"], "retrieval_latency": time.perf_counter() - start}
+            yield {"type": "token", "token": cached["answer"]}
+            latency = time.perf_counter() - start
+            yield {
+                "type": "done",
+                "answer": cached["answer"],
+                "sources": cached["sources"],
+                "time_to_first_token": latency,
+                "total_latency": latency,
+                "cached": True
+            }
+            return
+
+    # Chain lookup may load the embedding model on first use, so keep it off the event loop too
+    chain = await asyncio.to_thread(get_qa_chain, use_groq, persist_dir, k)
+    sources = await asyncio.to_thread(chain.retriever.invoke, query)
+    yield {"type": "sources", "sources": sources, "retrieval_latency": time.perf_counter() - start}
+
+    # Build the same prompt the "stuff" chain would send, then stream the completion
+    stuff_chain = chain.combine_documents_chain
+    context = stuff_chain.document_separator.join(
+        format_document(doc, stuff_chain.document_prompt) for doc in sources
+    )
+    prompt_value = stuff_chain.llm_chain.prompt.invoke({
+        stuff_chain.document_variable_name: context,
+        "question": query
+    })
+    model = llm or stuff_chain.llm_chain.llm
+
+    parts = []
+    time_to_first_token = None
+    async for chunk in model.astream(prompt_value):
+        token = getattr(chunk, "content", chunk)  # Chat models yield message chunks, plain LLMs yield strings
+        if not token:
+            continue
+        if time_to_first_token is None:
+            time_to_first_token = time.perf_counter() - start
+        parts.append(token)
+        yield {"type": "token", "token": token}
+
+    answer = "".join(parts)
+    if use_cache:
+        await asyncio.to_thread(cache_answer, query, answer, sources, use_groq, persist_dir, k)
+
+    yield {
+        "type": "done",
+        "answer": answer,
+        "sources": sources,
+        "time_to_first_token": time_to_first_token,
+        "total_latency": time.perf_counter() - start,
+        "cached": False
     }
@@ -8,6 +8,7 @@ import os  # For handling file paths (not directly used but useful for dir check
 from langchain_community.vectorstores import Chroma                       # Chroma = persistent vector DB
 from langchain_community.embeddings import HuggingFaceEmbeddings         # For generating vector embeddings
 from langchain.schema import Document                                    # LangChain's Document object for storing text and metadata
+from Embedding_Cache import CachedEmbeddings                             # Persistent cache so unchanged chunks are never re-embedded
 
 
 # -------------------------------
@@ -27,7 +28,11 @@ def save_chunks_to_vectorstore(chunks, persist_dir="./chroma_groq_db"):
     """
 
     # Initialize HuggingFace embeddings (MiniLM is small and fast, ideal for many RAG apps)
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    # and wrap them in the on-disk cache so re-ingesting unchanged text costs nothing
+    embeddings = CachedEmbeddings(
+        HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"),
+        model_name="all-MiniLM-L6-v2"
+    )
 
     # Convert text chunks to LangChain Document objects
     documents = []
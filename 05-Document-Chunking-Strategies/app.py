@@ -4,6 +4,8 @@
 
 import streamlit as st                           # Streamlit for interactive UI
 import os                                        # OS module (not used directly here, might be used by other modules)
+import asyncio                                   # Drives the async streaming answer path
+import threading                                 # Background warm-up of the chatbot
 
 # Import custom modules for document processing and RAG pipeline
 from Document_Processor import (
@@ -14,8 +16,52 @@ from Document_Processor import (
 from Chunking_Strategies import (
     fixed_size_chunking, sentence_based_chunking, paragraph_based_chunking
 )
-from Vector_Store_Manager import save_chunks_to_vectorstore  # To store processed chunks into a vector DB
-from RAG_Chatbot import answer_question                      # To query the documents using a chatbot interface
+# Vector_Store_Manager and RAG_Chatbot (LangChain, Chroma, embedding model) are imported
+# where they are first needed, so the page renders before those stacks are loaded
+
+# -------------------------------
+# Background Warm-up
+# -------------------------------
+
+def _warm_up_chatbot():
+    """Import the RAG stack and build the default QA chain off the UI thread."""
+    from RAG_Chatbot import warm_up_qa_chain
+    warm_up_qa_chain(background=False)
+
+
+@st.cache_resource
+def start_background_warm_up():
+    """Start the warm-up once per process (cached across reruns and sessions)."""
+    thread = threading.Thread(target=_warm_up_chatbot, name="chatbot-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+# -------------------------------
+# Streaming Helper
+# -------------------------------
+
+async def stream_answer_to_ui(query, use_groq, answer_box, sources_box):
+    """
+    Consume the streaming RAG answer and render it progressively.
+    Source chunks are shown as soon as retrieval finishes, then tokens as they arrive.
+    Returns the final 'done' event with latency figures.
+    """
+    from RAG_Chatbot import astream_answer  # Already loaded if the warm-up finished
+
+    answer = ""
+    async for event in astream_answer(query, use_groq=use_groq):
+        if event["type"] == "sources":
+            with sources_box.container():
+                with st.expander("📚 Source Chunks"):
+                    for i, doc in enumerate(event["sources"]):
+                        st.markdown(f"**Chunk {i+1}**")
+                        st.write(str(doc)[:500])  # Truncate long texts
+        elif event["type"] == "token":
+            answer += event["token"]
+            answer_box.markdown(answer + "▌")  # Cursor while the answer is still streaming
+        else:
+            answer_box.success(event["answer"])
+            return event
 
 # -------------------------------
 # UI Setup (Streamlit)
@@ -30,6 +76,9 @@ st.title("📚 RAG-powered Document Playground")
 # Create two tabs: one for chunking/uploading, another for chatting
 tab1, tab2 = st.tabs(["📄 Chunk & Save", "🤖 Chatbot"])
 
+# Load the embedding model and QA chain in the background while the user reads the page
+start_background_warm_up()
+
 # -------------------------------
 # Tab 1: Chunk & Save
 # -------------------------------
@@ -101,7 +150,10 @@ with tab1:
 
             # Button to save chunks to a persistent Chroma Vector DB
             if st.button("📥 Save to Vector DB"):
+                from Vector_Store_Manager import save_chunks_to_vectorstore  # To store processed chunks into a vector DB
+                from RAG_Chatbot import invalidate_qa_chains                 # Drop chains built over the old chunks
                 save_chunks_to_vectorstore(chunks, persist_dir="./chroma_groq_db")
+                invalidate_qa_chains("./chroma_groq_db")  # Next question rebuilds the chain over the new chunks
                 st.success("Chunks embedded and stored in Chroma Vector DB!")
 
         except Exception as e:
@@ -125,19 +177,23 @@ with tab2:
     user_query = st.text_input("💬 Enter your question about the documents:")
 
     if user_query:
-        with st.spinner("Thinking..."):
-            try:
-                # Call the RAG pipeline to get an answer
-                result = answer_question(user_query, use_groq=use_groq)
-
-                # Display the main answer
-                st.success(result['answer'])
-
-                # Show the chunks (documents) used to answer
-                with st.expander("📚 Source Chunks"):
-                    for i, doc in enumerate(result['sources']):
-                        st.markdown(f"**Chunk {i+1}**")
-                        st.write(str(doc)[:500])  # Truncate long texts
+        try:
+            # Placeholders filled while the answer streams in
+            answer_box = st.empty()
+            sources_box = st.empty()
+            answer_box.info("Thinking...")
+
+            # Call the streaming RAG pipeline; the answer appears token by token
+            result = asyncio.run(stream_answer_to_ui(user_query, use_groq, answer_box, sources_box))
+
+            # Report latency: time until the first token and until the full answer
+            if result.get("cached"):
+                st.caption(f"♻️ Answered from the semantic answer cache in {result['total_latency']:.2f}s (no LLM call)")
+            elif result["time_to_first_token"] is not None:
+                st.caption(
+                    f"⏱️ First token after {result['time_to_first_token']:.2f}s, "
+                    f"full answer after {result['total_latency']:.2f}s"
+                )
 
-            except Exception as e:
-                st.error(f"❌ Error answering question: {e}")
+        except Exception as e:
+            st.error(f"❌ Error answering question: {e}")
@@ -1,22 +1,31 @@
 """
 Complete Advanced Retrieval Pipeline
-Simple implementation without classes for easy understanding
+Simple function-based implementation for easy understanding
+
+Importing this module is cheap: the embedding model, the corpus embeddings and
+the BM25 index live in a RetrievalPipeline object that loads them on first use
+(or in the background via pipeline.warm_up()).
 """
 
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from rank_bm25 import BM25Okapi
-from sklearn.metrics.pairwise import cosine_similarity
+from Dense_Indexes import ShardedFlatIndex, Int8Index, BinaryIndex, HNSWIndex, IVFPQIndex, evaluate_index, resident_nbytes, top_k_rows
+from Retriever_Snapshot import load_snapshot, save_snapshot, snapshot_exists, SnapshotBM25
+from Sparse_Index import SparseIndex
+from Query_Cache import QueryEmbeddingCache
 
 # Install required packages:
-# pip install sentence-transformers rank-bm25 scikit-learn numpy
+# pip install sentence-transformers rank-bm25 numpy scipy faiss-cpu
 
 # =============================================================================
 # SAMPLE DATA
 # =============================================================================
 
 # Sample documents - you can replace with your own
-documents = [
+# (the module attribute `documents` is the corpus actually served, see __getattr__ below)
+SAMPLE_DOCUMENTS = [
     "Machine learning algorithms are powerful tools for data analysis and prediction",
     "Deep learning neural networks can process complex patterns in data",
     "Python is a popular programming language for artificial intelligence",
@@ -34,139 +43,485 @@ documents = [
     "Web scraping extracts data from websites automatically"
 ]
 
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+def min_max_normalize(scores):
+    """
+    Scale each row (last axis) to the 0-1 range
+    Rows whose scores are all equal (e.g. a single score) become 1.0, or 0.0 when that
+    score is not positive (e.g. no query term matched), never the raw score
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    low = scores.min(axis=-1, keepdims=True)
+    spread = scores.max(axis=-1, keepdims=True) - low
+    constant = np.broadcast_to(np.where(low > 0, 1.0, 0.0), scores.shape)
+    return np.where(spread > 0, (scores - low) / np.where(spread > 0, spread, 1), constant)
+
+def normalize_rows(vectors):
+    """L2-normalize vectors (last axis) so that dot products equal cosine similarities"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
 # =============================================================================
 # INITIALIZATION
 # =============================================================================
 
-print("Initializing retrieval pipeline...")
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+class RetrievalPipeline:
+    """
+    Embedding model, corpus embeddings and BM25 index, each loaded on first use
+    
+    If snapshot_path points to a directory written by save_retriever_snapshot(),
+    the corpus state is memory-mapped from it instead of being re-encoded.
+    """
+    
+    def __init__(self, documents, model_name=MODEL_NAME, snapshot_path=None, fusion_workers=None):
+        self.source_documents = documents
+        self.model_name = model_name
+        self.snapshot_path = snapshot_path
+        # fusion_retrieval runs 2 tasks per call: by default one call per core runs without queueing
+        self.fusion_workers = fusion_workers or 2 * (os.cpu_count() or 1)
+        self._fusion_executor = None
+        self.dense_indexes = {}          # Optional dense engines, built on first use
+        self.query_cache = QueryEmbeddingCache()  # Normalized query embeddings, LRU + TTL
+        self._model = None
+        self._sparse_index = None
+        self._corpus = None
+        self._lock = threading.RLock()   # Loading happens once even with concurrent callers
+    
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    # Imported here: sentence-transformers pulls in torch, which takes seconds
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+    
+    def _load_corpus(self):
+        print("Initializing retrieval pipeline...")
+        
+        if self.snapshot_path and snapshot_exists(self.snapshot_path):
+            # Memory-mapped snapshot: loads in milliseconds, pages shared between worker processes
+            snapshot = load_snapshot(self.snapshot_path)
+            if snapshot.meta['model_name'] != self.model_name:
+                raise ValueError(f"Snapshot was built with {snapshot.meta['model_name']}, not {self.model_name}")
+            corpus = {
+                'documents': snapshot.documents,
+                'doc_embeddings': snapshot.embeddings,       # Stored already normalized
+                'doc_embeddings_norm': snapshot.embeddings,
+                'bm25': snapshot.bm25
+            }
+        else:
+            from rank_bm25 import BM25Okapi
+            
+            # Create embeddings for all documents
+            doc_embeddings = self.model.encode(self.source_documents)
+            
+            # Prepare documents for BM25 (sparse retrieval)
+            tokenized_docs = [doc.lower().split() for doc in self.source_documents]
+            corpus = {
+                'documents': self.source_documents,
+                'doc_embeddings': doc_embeddings,
+                # L2-normalized copy: dot products on these are cosine similarities
+                'doc_embeddings_norm': normalize_rows(doc_embeddings),
+                'bm25': BM25Okapi(tokenized_docs)
+            }
+        
+        print(f"Loaded {len(corpus['documents'])} documents")
+        print(f"Created embeddings with shape: {corpus['doc_embeddings'].shape}")
+        print("-" * 50)
+        return corpus
+    
+    @property
+    def corpus(self):
+        if self._corpus is None:
+            with self._lock:
+                if self._corpus is None:
+                    self._corpus = self._load_corpus()
+        return self._corpus
+    
+    @property
+    def documents(self):
+        # The texts alone need no model: without a snapshot they are the source documents
+        if self._corpus is None and not (self.snapshot_path and snapshot_exists(self.snapshot_path)):
+            return self.source_documents
+        return self.corpus['documents']
+    
+    @property
+    def doc_embeddings(self):
+        return self.corpus['doc_embeddings']
+    
+    @property
+    def doc_embeddings_norm(self):
+        return self.corpus['doc_embeddings_norm']
+    
+    @property
+    def bm25(self):
+        return self.corpus['bm25']
+    
+    @property
+    def sparse_index(self):
+        """Inverted BM25 index with per-term upper bounds, built from the BM25 state on first use"""
+        if self._sparse_index is None:
+            with self._lock:
+                if self._sparse_index is None:
+                    if isinstance(self.bm25, SnapshotBM25):
+                        self._sparse_index = SparseIndex.from_snapshot(self.bm25)
+                    else:
+                        self._sparse_index = SparseIndex.from_bm25(self.bm25)
+        return self._sparse_index
+    
+    @property
+    def fusion_executor(self):
+        """
+        Thread pool running the dense and sparse retrievers of fusion_retrieval side by side
+        (encoding, matrix products and the NumPy postings work release the GIL)
+        """
+        if self._fusion_executor is None:
+            with self._lock:
+                if self._fusion_executor is None:
+                    self._fusion_executor = ThreadPoolExecutor(
+                        max_workers=self.fusion_workers, thread_name_prefix="fusion"
+                    )
+        return self._fusion_executor
+    
+    def encode_queries(self, queries):
+        """
+        (num_queries, d) L2-normalized query embeddings
+        Only queries missing from the query cache are sent to the encoder, in one batch
+        """
+        def compute(texts):
+            # Row copies: cached vectors must not keep the whole batch array alive
+            return [row.copy() for row in normalize_rows(self.model.encode(texts))]
+        
+        return np.stack(self.query_cache.get_or_compute(self.model_name, list(queries), compute))
+    
+    def warm_up(self, background=True):
+        """Load the model and corpus now, in a daemon thread unless background=False"""
+        def load():
+            self.model
+            self.corpus
+        
+        if not background:
+            load()
+            return None
+        thread = threading.Thread(target=load, name="retrieval-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+# Default pipeline over the sample documents
+# Set RETRIEVER_SNAPSHOT to a directory written by save_retriever_snapshot() to skip encoding at startup
+pipeline = RetrievalPipeline(SAMPLE_DOCUMENTS, snapshot_path=os.getenv('RETRIEVER_SNAPSHOT'))
 
-# Load the embedding model
-model = SentenceTransformer('all-MiniLM-L6-v2')
+def __getattr__(name):
+    # Backwards-compatible module attributes (Combined_PipeLine.documents, .model, .bm25, ...), loaded lazily;
+    # `documents` follows the pipeline, so it is the snapshot corpus when RETRIEVER_SNAPSHOT is set
+    if name in ('documents', 'model', 'doc_embeddings', 'doc_embeddings_norm', 'bm25'):
+        return getattr(pipeline, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Create embeddings for all documents
-doc_embeddings = model.encode(documents)
+def build_hnsw_index(p):
+    """
+    HNSW graph over the normalized embeddings
+    If HNSW_INDEX_PATH is set, the graph is loaded from there, or built once and saved there;
+    a saved graph built over a different corpus (or model) is rebuilt and overwritten
+    """
+    index_path = os.getenv('HNSW_INDEX_PATH')
+    if index_path and os.path.exists(index_path):
+        index = HNSWIndex.load(index_path)
+        if index.matches(p.doc_embeddings_norm):
+            return index
+        print(f"{index_path} does not match the current corpus, rebuilding the HNSW graph")
+    index = HNSWIndex(p.doc_embeddings_norm, M=32, ef_construction=200, ef_search=64)
+    if index_path:
+        index.save(index_path)
+    return index
 
-# Prepare documents for BM25 (sparse retrieval)
-tokenized_docs = [doc.lower().split() for doc in documents]
-bm25 = BM25Okapi(tokenized_docs)
+def memory_mapped_embeddings(p):
+    """
+    The normalized embeddings if they are memory-mapped from RETRIEVER_SNAPSHOT, else None
+    Compressed engines rescore only from vectors left on disk: keeping them in RAM for the
+    rescore would cost more than the codes save
+    """
+    return p.doc_embeddings_norm if resident_nbytes(p.doc_embeddings_norm) == 0 else None
 
-print(f"Loaded {len(documents)} documents")
-print(f"Created embeddings with shape: {doc_embeddings.shape}")
-print("-" * 50)
+def build_ivfpq_index(p):
+    """IVF-PQ index over the normalized embeddings, reranked exactly only from a snapshot"""
+    float_embeddings = memory_mapped_embeddings(p)
+    return IVFPQIndex(
+        p.doc_embeddings_norm, nprobe=8,
+        rerank_multiplier=4 if float_embeddings is not None else None,
+        float_embeddings=float_embeddings
+    )
+
+# Optional dense search engines, built on first use (see get_dense_index)
+DENSE_ENGINES = {
+    'sharded': lambda p: ShardedFlatIndex(p.doc_embeddings_norm),
+    # Codes 4x / 32x smaller than float32; the shortlist is rescored exactly only from a snapshot
+    'int8': lambda p: Int8Index(p.doc_embeddings_norm, float_embeddings=memory_mapped_embeddings(p)),
+    'binary': lambda p: BinaryIndex(p.doc_embeddings_norm, float_embeddings=memory_mapped_embeddings(p)),
+    'hnsw': build_hnsw_index,                                # Graph ANN search, sub-linear in corpus size
+    # Inverted lists + PQ codes (~m bytes/vector), exact rerank of 4x top_k from a snapshot
+    'ivfpq': build_ivfpq_index,
+}
+
+# =============================================================================
+# SNAPSHOTS
+# =============================================================================
+
+def save_retriever_snapshot(path):
+    """
+    Save embeddings, BM25 postings and texts so later runs can start from
+    RETRIEVER_SNAPSHOT=path instead of re-encoding the corpus
+    """
+    from rank_bm25 import BM25Okapi
+    
+    if not isinstance(pipeline.bm25, BM25Okapi):
+        raise ValueError("Pipeline was loaded from a snapshot already")
+    save_snapshot(path, pipeline.documents, pipeline.doc_embeddings_norm, pipeline.bm25, pipeline.model_name)
+    print(f"Saved retriever snapshot to {path}")
 
 # =============================================================================
 # RETRIEVAL FUNCTIONS
 # =============================================================================
 
-def dense_retrieval(query, top_k=10):
-    """Dense retrieval using embeddings"""
-    query_embedding = model.encode([query])
-    similarities = cosine_similarity(query_embedding, doc_embeddings)[0]
+def get_dense_index(engine):
+    """Return the dense index for `engine`, building it the first time it is used"""
+    if engine not in pipeline.dense_indexes:
+        pipeline.dense_indexes[engine] = DENSE_ENGINES[engine](pipeline)
+    return pipeline.dense_indexes[engine]
+
+def dense_retrieval(query, top_k=10, engine="exact"):
+    """
+    Dense retrieval using embeddings
+    engine: "exact" (single-core brute force) or a key of DENSE_ENGINES
+            ("sharded" = exact multi-core search with a top-k heap merge,
+             "int8" / "binary" = quantized first pass with float rescoring,
+             "hnsw" = approximate graph search, see hnsw_recall_report,
+             "ivfpq" = inverted lists of product-quantized codes, reranked exactly from a snapshot)
+    """
+    query_embedding = pipeline.encode_queries([query])
+    
+    if engine != "exact":
+        scores, indices = get_dense_index(engine).search(query_embedding, top_k)
+        return [(pipeline.documents[idx], score) for idx, score in zip(indices[0], scores[0]) if idx >= 0]
+    
+    similarities = pipeline.doc_embeddings_norm @ query_embedding[0]  # Cosine similarity
     
     # Get top results
     top_indices = np.argsort(similarities)[::-1][:top_k]
-    results = [(documents[idx], similarities[idx]) for idx in top_indices]
+    results = [(pipeline.documents[idx], similarities[idx]) for idx in top_indices]
     
     return results
 
-def sparse_retrieval(query, top_k=10):
-    """Sparse retrieval using BM25"""
+def sparse_retrieval(query, top_k=10, engine="maxscore"):
+    """
+    Sparse retrieval using BM25
+    engine: "maxscore" (inverted index, only postings that can reach the top-k are
+            scanned; returns documents matching at least one query term) or
+            "exhaustive" (BM25Okapi.get_scores over every document)
+    """
     query_tokens = query.lower().split()
-    scores = bm25.get_scores(query_tokens)
+    
+    if engine == "maxscore":
+        scores, indices = pipeline.sparse_index.search(query_tokens, top_k)
+        return [(pipeline.documents[idx], score) for idx, score in zip(indices, scores)]
+    
+    scores = pipeline.bm25.get_scores(query_tokens)
     
     # Get top results
     top_indices = np.argsort(scores)[::-1][:top_k]
-    results = [(documents[idx], scores[idx]) for idx in top_indices]
+    results = [(pipeline.documents[idx], scores[idx]) for idx in top_indices]
     
     return results
 
+def hybrid_scores(query_embedding, query_tokens, alpha=0.7):
+    """
+    Hybrid scores for every document from an already-encoded query
+    Returns (hybrid_scores, dense_scores) so later stages can reuse the dense part
+    """
+    # Dense scores: cosine similarity via dot products on normalized embeddings
+    dense_scores = pipeline.doc_embeddings_norm @ query_embedding
+    
+    # Get sparse scores (only the query terms' postings are touched)
+    sparse_scores = pipeline.sparse_index.get_scores(query_tokens)
+    
+    # Normalize scores to 0-1 range and combine
+    return alpha * min_max_normalize(dense_scores) + (1 - alpha) * min_max_normalize(sparse_scores), dense_scores
+
 def hybrid_retrieval(query, alpha=0.7, top_k=10):
     """
     Hybrid retrieval combining dense and sparse
     alpha: weight for dense retrieval (0.7 = 70% dense, 30% sparse)
     """
-    # Get dense scores
-    query_embedding = model.encode([query])
-    dense_scores = cosine_similarity(query_embedding, doc_embeddings)[0]
+    query_embedding = pipeline.encode_queries([query])[0]
+    scores, _ = hybrid_scores(query_embedding, query.lower().split(), alpha)
     
-    # Get sparse scores
-    query_tokens = query.lower().split()
-    sparse_scores = bm25.get_scores(query_tokens)
+    # Get top results
+    top_indices = np.argsort(scores)[::-1][:top_k]
+    results = [(pipeline.documents[idx], scores[idx]) for idx in top_indices]
     
-    # Normalize scores to 0-1 range
-    dense_min, dense_max = dense_scores.min(), dense_scores.max()
-    if dense_max > dense_min:
-        dense_norm = (dense_scores - dense_min) / (dense_max - dense_min)
+    return results
+
+def dense_top_n(query, top_n, engine="exact"):
+    """(doc indices, scores) of the dense top-n, best first"""
+    query_embedding = pipeline.encode_queries([query])
+    if engine == "exact":
+        scores, indices = top_k_rows(query_embedding @ pipeline.doc_embeddings_norm.T, top_n)
     else:
-        dense_norm = dense_scores
+        scores, indices = get_dense_index(engine).search(query_embedding, top_n)
+    keep = indices[0] >= 0
+    return indices[0][keep], scores[0][keep]
+
+def sparse_top_n(query, top_n):
+    """(doc indices, scores) of the BM25 top-n via the MaxScore index, best first"""
+    scores, indices = pipeline.sparse_index.search(query.lower().split(), top_n)
+    return indices, scores
+
+def reciprocal_rank_fusion(ranked_lists, weights=None, rrf_k=60):
+    """
+    score(d) = sum_i weight_i / (rrf_k + rank_i(d)), ranks starting at 1
+    Only ranks are used, so score scales of the retrievers do not matter
+    """
+    weights = weights or [1.0] * len(ranked_lists)
+    fused = {}
+    for weight, indices in zip(weights, ranked_lists):
+        for rank, idx in enumerate(indices, 1):
+            fused[idx] = fused.get(idx, 0.0) + weight / (rrf_k + rank)
+    return fused
+
+def truncated_min_max_fusion(scored_lists, weights):
+    """
+    Weighted sum of min-max normalized scores, where each retriever is normalized over
+    its own top-n only; a document missing from a list gets 0 for that retriever
+    """
+    fused = {}
+    for weight, (indices, scores) in zip(weights, scored_lists):
+        for idx, score in zip(indices, min_max_normalize(scores) if len(scores) else scores):
+            fused[idx] = fused.get(idx, 0.0) + weight * score
+    return fused
+
+def fusion_retrieval(query, top_k=10, method="rrf", top_n=100, alpha=0.7, dense_engine="exact", rrf_k=60):
+    """
+    Hybrid retrieval over truncated result lists
+    The dense and sparse retrievers each return only their top_n, concurrently, and the
+    fused score is computed over the union of the two lists, so any top-k index
+    (dense engines, the MaxScore sparse index) can be used on either side.
     
-    sparse_min, sparse_max = sparse_scores.min(), sparse_scores.max()
-    if sparse_max > sparse_min:
-        sparse_norm = (sparse_scores - sparse_min) / (sparse_max - sparse_min)
+    method: "rrf" (reciprocal rank fusion) or "minmax" (min-max normalization over each top_n)
+    alpha: weight for the dense list (0.7 = 70% dense, 30% sparse)
+    """
+    dense_future = pipeline.fusion_executor.submit(dense_top_n, query, top_n, dense_engine)
+    sparse_future = pipeline.fusion_executor.submit(sparse_top_n, query, top_n)
+    dense_list, sparse_list = dense_future.result(), sparse_future.result()
+    
+    weights = [alpha, 1 - alpha]
+    if method == "rrf":
+        fused = reciprocal_rank_fusion([dense_list[0], sparse_list[0]], weights, rrf_k)
+    elif method == "minmax":
+        fused = truncated_min_max_fusion([dense_list, sparse_list], weights)
     else:
-        sparse_norm = sparse_scores
-    
-    # Combine scores
-    hybrid_scores = alpha * dense_norm + (1 - alpha) * sparse_norm
-    
-    # Get top results
-    top_indices = np.argsort(hybrid_scores)[::-1][:top_k]
-    results = [(documents[idx], hybrid_scores[idx]) for idx in top_indices]
+        raise ValueError(f"Unknown fusion method: {method}")
     
-    return results
+    ranked = sorted(fused.items(), key=lambda item: -item[1])[:top_k]
+    return [(pipeline.documents[idx], score) for idx, score in ranked]
 
-def mmr_retrieval(query, lambda_param=0.7, top_k=5):
+def batch_hybrid_retrieval(queries, alpha=0.7, top_k=10, batch_size=256):
     """
-    Maximum Marginal Relevance retrieval for diverse results
-    lambda_param: balance between relevance and diversity
+    Hybrid retrieval for many queries at once
+    All queries are encoded in one call; per batch of queries the dense scores are one
+    matrix-matrix product, the sparse scores one CSR sparse product (query term counts
+    x BM25 impacts), and normalization, fusion and top-k are vectorized over rows.
+    batch_size bounds the (batch_size, num_docs) score matrices held in memory.
     """
-    # Get query embedding
-    query_embedding = model.encode([query])
+    queries = list(queries)
+    query_embeddings = pipeline.encode_queries(queries)
+    queries_tokens = [query.lower().split() for query in queries]
+    
+    results = []
+    for start in range(0, len(queries), batch_size):
+        end = start + batch_size
+        dense_scores = query_embeddings[start:end] @ pipeline.doc_embeddings_norm.T
+        sparse_scores = pipeline.sparse_index.batch_get_scores(queries_tokens[start:end])
+        scores = alpha * min_max_normalize(dense_scores) + (1 - alpha) * min_max_normalize(sparse_scores)
+        
+        top_scores, top_indices = top_k_rows(scores, top_k)
+        results.extend(
+            [(pipeline.documents[idx], score) for idx, score in zip(row_indices, row_scores)]
+            for row_indices, row_scores in zip(top_indices, top_scores)
+        )
+    return results
+
+def mmr_select(query_embeddings, candidate_embeddings, lambda_param=0.7, top_k=5, relevance_scores=None):
+    """
+    Vectorized Maximum Marginal Relevance over pre-normalized embeddings
     
-    # Calculate relevance scores
-    relevance_scores = cosine_similarity(query_embedding, doc_embeddings)[0]
+    Keeps a running "max similarity to the selected set" vector per query, updated
+    with one matrix-vector product per selection step, instead of comparing every
+    (candidate, selected) pair in Python.
     
-    selected_docs = []
-    selected_indices = []
-    remaining_indices = list(range(len(documents)))
+    query_embeddings: (d,) for one query or (B, d) for a batch, L2-normalized
+    candidate_embeddings: (N, d) pool shared by all queries, or (B, N, d) one pool per query
+    relevance_scores: optional precomputed relevance, (N,) or (B, N); defaults to cosine similarity
+    Returns candidate indices in selection order: (top_k,) or (B, top_k)
+    """
+    single = np.ndim(query_embeddings) == 1
+    queries = np.atleast_2d(query_embeddings)
+    shared = candidate_embeddings.ndim == 2
+    
+    def similarities(vectors):
+        # (B, d) against the candidate pool(s) -> (B, N)
+        if shared:
+            return vectors @ candidate_embeddings.T
+        return np.einsum('bd,bnd->bn', vectors, candidate_embeddings)
+    
+    if relevance_scores is None:
+        relevance = similarities(queries)
+    else:
+        relevance = np.atleast_2d(np.asarray(relevance_scores, dtype=np.float32))
+    
+    batch_size, num_candidates = relevance.shape
+    k = min(top_k, num_candidates)
+    rows = np.arange(batch_size)
     
-    # Select first document (highest relevance)
-    first_idx = np.argmax(relevance_scores)
-    selected_docs.append(documents[first_idx])
-    selected_indices.append(first_idx)
-    remaining_indices.remove(first_idx)
+    # Max similarity of each candidate to anything selected so far (0 before any selection)
+    max_sim_to_selected = np.zeros_like(relevance)
+    available = np.ones(relevance.shape, dtype=bool)
+    selected = np.empty((batch_size, k), dtype=np.int64)
     
-    # Select remaining documents using MMR
-    for _ in range(min(top_k - 1, len(remaining_indices))):
-        best_mmr_score = -float('inf')
-        best_idx = None
+    for step in range(k):
+        mmr_scores = lambda_param * relevance - (1 - lambda_param) * max_sim_to_selected
+        best = np.where(available, mmr_scores, -np.inf).argmax(axis=1)
         
-        for idx in remaining_indices:
-            # Relevance component
-            relevance = relevance_scores[idx]
-            
-            # Diversity component (max similarity to selected docs)
-            max_sim_to_selected = 0
-            for selected_idx in selected_indices:
-                sim = cosine_similarity(
-                    doc_embeddings[idx].reshape(1, -1),
-                    doc_embeddings[selected_idx].reshape(1, -1)
-                )[0][0]
-                max_sim_to_selected = max(max_sim_to_selected, sim)
-            
-            # MMR score
-            mmr_score = lambda_param * relevance - (1 - lambda_param) * max_sim_to_selected
-            
-            if mmr_score > best_mmr_score:
-                best_mmr_score = mmr_score
-                best_idx = idx
+        selected[:, step] = best
+        available[rows, best] = False
         
-        if best_idx is not None:
-            selected_docs.append(documents[best_idx])
-            selected_indices.append(best_idx)
-            remaining_indices.remove(best_idx)
+        # Only the newly selected vector can raise the running max
+        chosen = candidate_embeddings[best] if shared else candidate_embeddings[rows, best]
+        np.maximum(max_sim_to_selected, similarities(chosen), out=max_sim_to_selected)
     
-    return selected_docs
+    return selected[0] if single else selected
+
+def mmr_retrieval(query, lambda_param=0.7, top_k=5):
+    """
+    Maximum Marginal Relevance retrieval for diverse results
+    lambda_param: balance between relevance and diversity
+    """
+    query_embedding = pipeline.encode_queries([query])[0]
+    selected_indices = mmr_select(query_embedding, pipeline.doc_embeddings_norm, lambda_param, top_k)
+    return [pipeline.documents[idx] for idx in selected_indices]
+
+def batch_mmr_retrieval(queries, lambda_param=0.7, top_k=5):
+    """MMR retrieval for many queries at once (one encoder call, batched selection)"""
+    query_embeddings = pipeline.encode_queries(queries)
+    selected_indices = mmr_select(query_embeddings, pipeline.doc_embeddings_norm, lambda_param, top_k)
+    return [[pipeline.documents[idx] for idx in row] for row in selected_indices]
 
 def advanced_retrieval_pipeline(query, config=None):
     """
@@ -190,25 +545,29 @@ def advanced_retrieval_pipeline(query, config=None):
     print(f"Configuration: {config}")
     print("-" * 40)
     
+    # Step 0: encode the query once and share it between both stages
+    query_embedding = pipeline.encode_queries([query])[0]
+    query_tokens = query.lower().split()
+    
     # Step 1: Hybrid retrieval to get initial candidates
     print("Step 1: Hybrid retrieval...")
-    hybrid_results = hybrid_retrieval(
-        query, 
-        alpha=config['hybrid_alpha'], 
-        top_k=config['initial_candidates']
-    )
+    scores, dense_scores = hybrid_scores(query_embedding, query_tokens, alpha=config['hybrid_alpha'])
+    candidate_indices = np.argsort(scores)[::-1][:config['initial_candidates']]
     
-    # Step 2: Apply MMR for diversity (optional)
+    # Step 2: Apply MMR for diversity (optional), restricted to the candidate pool
     if config['use_mmr']:
         print("Step 2: Applying MMR for diversity...")
-        final_results = mmr_retrieval(
-            query,
+        selected = mmr_select(
+            query_embedding,
+            pipeline.doc_embeddings_norm[candidate_indices],
             lambda_param=config['mmr_lambda'],
-            top_k=config['final_results']
+            top_k=config['final_results'],
+            relevance_scores=dense_scores[candidate_indices]  # Reuse stage-1 similarities
         )
+        final_results = [pipeline.documents[candidate_indices[i]] for i in selected]
     else:
         print("Step 2: Skipping MMR, using hybrid results...")
-        final_results = [doc for doc, score in hybrid_results[:config['final_results']]]
+        final_results = [pipeline.documents[idx] for idx in candidate_indices[:config['final_results']]]
     
     return final_results
 
@@ -224,7 +583,9 @@ def test_single_method(method_name, method_func, query, **kwargs):
     
     results = method_func(query, **kwargs)
     
-    if isinstance(results[0], tuple):  # Results with scores
+    if not results:
+        print("No matching documents")
+    elif isinstance(results[0], tuple):  # Results with scores
         for i, (doc, score) in enumerate(results[:5], 1):
             print(f"{i}. Score: {score:.3f}")
             print(f"   {doc}")
@@ -242,8 +603,46 @@ def compare_all_methods(query):
     test_single_method("Dense Retrieval", dense_retrieval, query, top_k=5)
     test_single_method("Sparse Retrieval", sparse_retrieval, query, top_k=5)
     test_single_method("Hybrid Retrieval", hybrid_retrieval, query, alpha=0.7, top_k=5)
+    test_single_method("Fusion Retrieval (RRF)", fusion_retrieval, query, method="rrf", top_k=5)
     test_single_method("MMR Retrieval", mmr_retrieval, query, lambda_param=0.7, top_k=5)
 
+def compare_dense_engines(queries, top_k=5, engines=None):
+    """Recall@k against float32 exact search, latency and memory of each dense engine"""
+    print("\n" + "=" * 80)
+    print(f"DENSE ENGINE COMPARISON (recall@{top_k} vs float32 exact search)")
+    print("=" * 80)
+    
+    query_embeddings = pipeline.encode_queries(queries)
+    report = {}
+    for engine in engines or DENSE_ENGINES:
+        report[engine] = evaluate_index(get_dense_index(engine), query_embeddings, pipeline.doc_embeddings_norm, top_k)
+        stats = report[engine]
+        codes = f", codes {stats['code_bytes_per_vector']:.1f}" if 'code_bytes_per_vector' in stats else ""
+        print(f"{engine:>10}: recall {stats['recall_at_k']:.3f} | "
+              f"{stats['latency_ms_per_query']:.3f} ms/query | "
+              f"{stats['bytes_per_vector']:.1f} bytes/vector in RAM{codes} ({stats['compression_vs_float32']:.1f}x)")
+    return report
+
+def hnsw_recall_report(queries, top_k=5, ef_values=(16, 32, 64, 128, 256)):
+    """Recall@k and latency of the HNSW engine for several efSearch values"""
+    print("\n" + "=" * 80)
+    print(f"HNSW efSearch SWEEP (recall@{top_k} vs float32 exact search)")
+    print("=" * 80)
+    
+    query_embeddings = pipeline.encode_queries(queries)
+    index = get_dense_index('hnsw')
+    default_ef = index.ef_search
+    report = {}
+    try:
+        for ef in ef_values:
+            index.ef_search = ef
+            report[ef] = evaluate_index(index, query_embeddings, pipeline.doc_embeddings_norm, top_k)
+            print(f"efSearch {ef:>4}: recall {report[ef]['recall_at_k']:.3f} | "
+                  f"{report[ef]['latency_ms_per_query']:.3f} ms/query")
+    finally:
+        index.ef_search = default_ef
+    return report
+
 def test_advanced_pipeline():
     """Test the complete advanced retrieval pipeline"""
     print("\n" + "=" * 80)
@@ -301,6 +700,10 @@ def test_advanced_pipeline():
             print("Results:")
             for i, doc in enumerate(results, 1):
                 print(f"{i}. {doc}")
+    
+    # Every configuration re-uses the query embedding computed by the first one
+    stats = pipeline.query_cache.stats()
+    print(f"\nQuery embedding cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
 
 # =============================================================================
 # INTERACTIVE SEARCH FUNCTION
@@ -339,6 +742,9 @@ if __name__ == "__main__":
     print("Advanced Retrieval Pipeline Demo")
     print("=" * 50)
     
+    # Start loading the model and corpus while the demo banner is printed
+    pipeline.warm_up()
+    
     # Test individual methods
     test_query = "machine learning algorithms"
     compare_all_methods(test_query)
@@ -346,6 +752,24 @@ if __name__ == "__main__":
     # Test advanced pipeline
     test_advanced_pipeline()
     
+    # Many queries scored together (offline evaluation, bulk pre-retrieval)
+    print("\nBATCH HYBRID RETRIEVAL")
+    print("=" * 40)
+    batch_queries = ["machine learning algorithms", "python programming language", "data analysis techniques"]
+    for query, results in zip(batch_queries, batch_hybrid_retrieval(batch_queries, top_k=3)):
+        print(f"Query: '{query}' -> {results[0][0]}")
+    
+    # Recall / memory trade-off of the dense search engines
+    compare_dense_engines([
+        "machine learning algorithms",
+        "python programming language",
+        "data analysis techniques",
+        "artificial intelligence applications"
+    ])
+    
+    # Latency / recall points of the HNSW engine
+    hnsw_recall_report(["machine learning algorithms", "python programming language"])
+    
     # Option for interactive search
     print("\n" + "=" * 60)
     response = input("Would you like to try interactive search? (y/n): ").strip().lower()
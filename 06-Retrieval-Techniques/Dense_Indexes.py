@@ -0,0 +1,412 @@
+"""
+Dense Search Indexes
+Drop-in search engines for the dense side of Combined_PipeLine.
+
+Every index takes L2-normalized document embeddings and exposes
+    search(query_embeddings, top_k) -> (scores, indices)
+with arrays of shape (num_queries, top_k), best match first.
+"""
+
+import abc
+import heapq
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+def top_k_rows(scores, top_k):
+    """
+    Top-k per row of a (num_queries, n) score matrix, best first
+    Uses partial selection (argpartition) so only the k winners are sorted
+    """
+    k = min(top_k, scores.shape[1])
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return np.take_along_axis(candidate_scores, order, axis=1), np.take_along_axis(candidates, order, axis=1)
+
+def resident_nbytes(array):
+    """Bytes an array keeps in RAM: 0 for memory-mapped arrays, whose pages stay on disk until read"""
+    base = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return 0
+        base = getattr(base, "base", None)
+    return array.nbytes
+
+# =============================================================================
+# SHARDED EXACT SEARCH
+# =============================================================================
+
+class ShardedFlatIndex:
+    """
+    Exact inner-product search over a row-partitioned embedding matrix
+
+    Each shard is scored in a thread pool (NumPy's matrix products release the
+    GIL, so shards run on separate cores), keeps its own top-k via partial
+    selection, and the per-shard winners are merged with a heap.
+    """
+
+    def __init__(self, embeddings, num_shards=None, max_workers=None):
+        self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        num_shards = num_shards or self.max_workers
+        num_shards = max(1, min(num_shards, len(self.embeddings)))
+
+        # Contiguous row ranges: shards are views, no copy of the matrix
+        bounds = np.linspace(0, len(self.embeddings), num_shards + 1).astype(int)
+        self.shards = [(start, self.embeddings[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def _search_shard(self, shard, query_embeddings, top_k):
+        offset, vectors = shard
+        scores, indices = top_k_rows(query_embeddings @ vectors.T, top_k)
+        return scores, indices + offset
+
+    def search(self, query_embeddings, top_k=10):
+        query_embeddings = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        k = min(top_k, len(self.embeddings))
+
+        shard_results = list(self.executor.map(
+            lambda shard: self._search_shard(shard, query_embeddings, k), self.shards
+        ))
+
+        scores = np.empty((len(query_embeddings), k), dtype=np.float32)
+        indices = np.empty((len(query_embeddings), k), dtype=np.int64)
+        for row in range(len(query_embeddings)):
+            # Each shard list is already sorted best-first, so a k-way heap merge suffices
+            runs = [zip(shard_scores[row], shard_indices[row]) for shard_scores, shard_indices in shard_results]
+            merged = list(islice(heapq.merge(*runs, key=lambda item: -item[0]), k))
+            scores[row] = [score for score, _ in merged]
+            indices[row] = [idx for _, idx in merged]
+
+        return scores, indices
+
+    def close(self):
+        self.executor.shutdown()
+
+# =============================================================================
+# QUANTIZED STORAGE (INT8 SCALAR AND 1-BIT BINARY) WITH FLOAT RESCORING
+# =============================================================================
+
+# Number of set bits in every possible byte, used for Hamming distances
+POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+class QuantizedIndex(abc.ABC):
+    """
+    Base class for compressed indexes: a fast first pass over the codes picks a
+    shortlist of `top_k * rescore_multiplier` candidates, which are rescored
+    exactly with the float32 vectors
+
+    float_embeddings is only read for the shortlist and must be a memory-mapped
+    array (np.load(..., mmap_mode='r')) that stays on disk: an in-RAM float copy
+    would cost more than the codes save. Without it, the first-pass scores of the
+    top_k are returned as they are
+    """
+
+    block_size = 65536  # Rows scored per block, bounds the temporary float memory
+
+    def __init__(self, embeddings, rescore_multiplier=4, float_embeddings=None):
+        self.num_vectors, self.dimension = embeddings.shape
+        if float_embeddings is not None and resident_nbytes(float_embeddings):
+            raise ValueError("float_embeddings for the rescore must be memory-mapped (e.g. a snapshot)")
+        self.rescore_multiplier = rescore_multiplier
+        self.float_embeddings = float_embeddings
+
+    @abc.abstractmethod
+    def first_pass_scores(self, query_embeddings, start, end):
+        """Approximate scores (higher is better) of rows [start, end) for every query"""
+
+    def search(self, query_embeddings, top_k=10):
+        query_embeddings = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        k = min(top_k, self.num_vectors)
+        rescore = self.float_embeddings is not None
+        shortlist_size = min(self.num_vectors, k * self.rescore_multiplier) if rescore else k
+
+        # First pass: best shortlist_size rows per query over the compressed codes, block by block
+        best_scores = np.full((len(query_embeddings), 0), -np.inf, dtype=np.float32)
+        best_indices = np.empty((len(query_embeddings), 0), dtype=np.int64)
+        for start in range(0, self.num_vectors, self.block_size):
+            end = min(start + self.block_size, self.num_vectors)
+            block_scores, block_indices = top_k_rows(
+                self.first_pass_scores(query_embeddings, start, end), shortlist_size
+            )
+            merged_scores = np.concatenate([best_scores, block_scores], axis=1)
+            merged_indices = np.concatenate([best_indices, block_indices + start], axis=1)
+            best_scores, order = top_k_rows(merged_scores, shortlist_size)
+            best_indices = np.take_along_axis(merged_indices, order, axis=1)
+        if not rescore:
+            return best_scores, best_indices
+
+        # Second pass: exact float scores for the shortlist only
+        shortlist_vectors = np.asarray(self.float_embeddings[best_indices.ravel()], dtype=np.float32)
+        shortlist_vectors = shortlist_vectors.reshape(len(query_embeddings), shortlist_size, self.dimension)
+        exact_scores = np.einsum('bd,bnd->bn', query_embeddings, shortlist_vectors)
+        scores, order = top_k_rows(exact_scores, k)
+        return scores, np.take_along_axis(best_indices, order, axis=1)
+
+    @property
+    @abc.abstractmethod
+    def code_nbytes(self):
+        """Memory used by the compressed codes the first pass scans"""
+
+    @property
+    def nbytes(self):
+        """Total RAM footprint: the codes (the rescoring vectors are memory-mapped and stay on disk)"""
+        return self.code_nbytes
+
+class Int8Index(QuantizedIndex):
+    """
+    Scalar quantization: every dimension is mapped linearly from its [min, max]
+    range onto 256 levels and stored as int8 (codes 4x smaller than float32)
+    """
+
+    def __init__(self, embeddings, rescore_multiplier=4, float_embeddings=None):
+        super().__init__(embeddings, rescore_multiplier, float_embeddings)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        self.minimum = embeddings.min(axis=0)
+        self.scale = np.maximum(embeddings.max(axis=0) - self.minimum, 1e-12) / 255.0
+        levels = np.rint((embeddings - self.minimum) / self.scale)
+        self.codes = (levels - 128).astype(np.int8)
+
+    def first_pass_scores(self, query_embeddings, start, end):
+        # q . x  ~=  q . (minimum + (code + 128) * scale)  =  (q * scale) . (code + 128) + q . minimum
+        levels = self.codes[start:end].astype(np.float32) + 128.0
+        return (query_embeddings * self.scale) @ levels.T + (query_embeddings @ self.minimum)[:, None]
+
+    @property
+    def code_nbytes(self):
+        return self.codes.nbytes + self.minimum.nbytes + self.scale.nbytes
+
+class BinaryIndex(QuantizedIndex):
+    """
+    1-bit quantization: only the sign of every dimension is kept, packed 8 per
+    byte (codes 32x smaller than float32); the first pass ranks by Hamming distance
+    """
+
+    block_size = 8192  # XOR of every (query, row) pair is materialized per block
+
+    def __init__(self, embeddings, rescore_multiplier=10, float_embeddings=None):
+        super().__init__(embeddings, rescore_multiplier, float_embeddings)
+        self.codes = np.packbits(np.asarray(embeddings) > 0, axis=1)
+
+    def first_pass_scores(self, query_embeddings, start, end):
+        query_codes = np.packbits(query_embeddings > 0, axis=1)
+        differing_bits = POPCOUNT_TABLE[query_codes[:, None, :] ^ self.codes[None, start:end, :]]
+        # Fewer differing bits = more similar, so negate the Hamming distance
+        return -differing_bits.sum(axis=2, dtype=np.int32).astype(np.float32)
+
+    @property
+    def code_nbytes(self):
+        return self.codes.nbytes
+
+# =============================================================================
+# HNSW GRAPH INDEX (FAISS)
+# =============================================================================
+
+def import_faiss():
+    """FAISS is only needed by the graph and IVF-PQ engines, so it is imported on first use"""
+    try:
+        import faiss
+    except ImportError as e:
+        raise ImportError("This dense engine needs FAISS: pip install faiss-cpu") from e
+    return faiss
+
+class HNSWIndex:
+    """
+    Approximate inner-product search over a Hierarchical Navigable Small World graph
+    (FAISS IndexHNSWFlat), built and searched in-process on the CPU
+
+    M: graph neighbours per node (more = better recall, more memory)
+    ef_construction: candidate list size while inserting (more = better graph, slower build)
+    ef_search: candidate list size while searching (the latency/recall knob, can be changed later)
+    num_threads: OpenMP threads used to build and search (default: all cores)
+    """
+
+    def __init__(self, embeddings=None, M=32, ef_construction=200, ef_search=64, num_threads=None, index=None):
+        faiss = import_faiss()
+        if num_threads:
+            faiss.omp_set_num_threads(num_threads)
+
+        if index is None:
+            embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+            index = faiss.IndexHNSWFlat(embeddings.shape[1], M, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = ef_construction
+            index.add(embeddings)  # Insertions run in parallel over OpenMP threads
+        self.index = index
+        self.ef_search = ef_search
+
+    def search(self, query_embeddings, top_k=10):
+        faiss = import_faiss()
+        query_embeddings = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        # Per-call parameters keep concurrent searches independent; efSearch below top_k would cut results short
+        params = faiss.SearchParametersHNSW(efSearch=max(self.ef_search, top_k))
+        return self.index.search(query_embeddings, top_k, params=params)
+
+    def save(self, path):
+        import_faiss().write_index(self.index, path)
+
+    @classmethod
+    def load(cls, path, ef_search=64, num_threads=None):
+        return cls(index=import_faiss().read_index(path), ef_search=ef_search, num_threads=num_threads)
+
+    def matches(self, embeddings, num_checks=16):
+        """
+        True if the graph was built over these embeddings: same count and dimension,
+        and evenly spaced stored vectors equal to the corresponding rows
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or self.index.ntotal != embeddings.shape[0] or self.index.d != embeddings.shape[1]:
+            return False
+        if embeddings.shape[0] == 0:
+            return True
+        rows = np.unique(np.linspace(0, embeddings.shape[0] - 1, num_checks).astype(np.int64))
+        stored = np.vstack([self.index.reconstruct(int(row)) for row in rows])
+        return bool(np.allclose(stored, embeddings[rows], atol=1e-6))
+
+    @property
+    def nbytes(self):
+        """Float vectors plus the int32 neighbour lists of every graph level"""
+        return self.index.ntotal * self.index.d * 4 + self.index.hnsw.neighbors.size() * 4
+
+# =============================================================================
+# IVF-PQ COMPRESSED INDEX (FAISS)
+# =============================================================================
+
+def ivfpq_parameters(num_vectors, dimension, nlist=None, m=None, nbits=8):
+    """
+    Defaults that also work for small corpora
+    nlist ~ 4 * sqrt(N) coarse centroids (at least 39 training points each);
+    m = largest divisor of the dimension <= dimension / 8 (e.g. 48 one-byte codes for 384-d);
+    nbits lowered when there are fewer than 2**nbits training points per codebook
+    Deliberate copy of ivfpq_parameters in 03-VectorDatabases-Explained/Part-2/Vector_Backends.py
+    (tutorial folders never import from each other), so change both together
+    """
+    nlist = nlist or max(1, min(int(4 * np.sqrt(num_vectors)), num_vectors // 39))
+    m = m or max(divisor for divisor in range(1, max(1, dimension // 8) + 1) if dimension % divisor == 0)
+    nbits = max(1, min(nbits, int(np.log2(max(num_vectors, 2)))))
+    return nlist, m, nbits
+
+class IVFPQIndex:
+    """
+    Inverted file + product quantization (FAISS IndexIVFPQ)
+
+    Vectors are assigned to one of nlist coarse centroids and stored as m PQ codes of
+    nbits each, so a 384-d float32 vector (1536 bytes) takes about m bytes. A query
+    scans only the nprobe closest inverted lists. With rerank_multiplier set, a shortlist
+    of top_k * rerank_multiplier is rescored exactly with float_embeddings, which must be
+    a memory-mapped array left on disk (in RAM they would cost more than the codes save);
+    without it the PQ scores are returned as they are.
+
+    train_size: number of vectors sampled to train the centroids and codebooks
+    """
+
+    add_block_size = 65536  # Vectors added per call, so memory-mapped inputs are streamed
+
+    def __init__(self, embeddings=None, nlist=None, m=None, nbits=8, nprobe=8, train_size=100000,
+                 rerank_multiplier=None, float_embeddings=None, index=None):
+        faiss = import_faiss()
+        if rerank_multiplier:
+            if float_embeddings is None:
+                raise ValueError("rerank_multiplier needs float_embeddings")
+            if resident_nbytes(float_embeddings):
+                raise ValueError("float_embeddings for the rerank must be memory-mapped (e.g. a snapshot)")
+        self.nprobe = nprobe
+        self.rerank_multiplier = rerank_multiplier
+        self.float_embeddings = float_embeddings if rerank_multiplier else None
+
+        if index is None:
+            num_vectors, dimension = embeddings.shape
+            nlist, m, nbits = ivfpq_parameters(num_vectors, dimension, nlist, m, nbits)
+            quantizer = faiss.IndexFlatIP(dimension)
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, m, nbits, faiss.METRIC_INNER_PRODUCT)
+
+            # Train on a random sample; the rows are read in order, which suits memory-mapped files
+            sample = np.sort(np.random.default_rng(0).choice(num_vectors, min(train_size, num_vectors), replace=False))
+            index.train(np.ascontiguousarray(embeddings[sample], dtype=np.float32))
+            for start in range(0, num_vectors, self.add_block_size):
+                index.add(np.ascontiguousarray(embeddings[start:start + self.add_block_size], dtype=np.float32))
+        self.index = index
+
+    def search(self, query_embeddings, top_k=10):
+        faiss = import_faiss()
+        query_embeddings = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        k = min(top_k, self.index.ntotal)
+        params = faiss.SearchParametersIVF(nprobe=self.nprobe)
+
+        if not self.rerank_multiplier:
+            return self.index.search(query_embeddings, k, params=params)
+
+        # Shortlist from the PQ codes, then exact float scores for the shortlist only
+        shortlist_size = min(self.index.ntotal, k * self.rerank_multiplier)
+        _, shortlist = self.index.search(query_embeddings, shortlist_size, params=params)
+        valid = shortlist >= 0  # Fewer than shortlist_size hits in the probed lists are padded with -1
+        vectors = np.asarray(self.float_embeddings[np.where(valid, shortlist, 0).ravel()], dtype=np.float32)
+        vectors = vectors.reshape(len(query_embeddings), shortlist_size, -1)
+        exact_scores = np.einsum('bd,bnd->bn', query_embeddings, vectors)
+        exact_scores[~valid] = -np.inf
+        scores, order = top_k_rows(exact_scores, k)
+        indices = np.take_along_axis(shortlist, order, axis=1)
+        indices[np.isneginf(scores)] = -1
+        return scores, indices
+
+    def save(self, path):
+        import_faiss().write_index(self.index, path)
+
+    @classmethod
+    def load(cls, path, nprobe=8, rerank_multiplier=None, float_embeddings=None):
+        return cls(index=import_faiss().read_index(path), nprobe=nprobe,
+                   rerank_multiplier=rerank_multiplier, float_embeddings=float_embeddings)
+
+    @property
+    def nbytes(self):
+        """
+        PQ codes and int64 ids of every vector, plus coarse centroids and PQ codebooks
+        (the memory-mapped rerank vectors stay on disk)
+        """
+        index = self.index
+        codebooks = index.pq.centroids.size() * 4
+        return index.ntotal * (index.code_size + 8) + index.nlist * index.d * 4 + codebooks
+
+# =============================================================================
+# EVALUATION
+# =============================================================================
+
+def recall_at_k(approx_indices, exact_indices):
+    """Average fraction of the exact top-k found by the approximate top-k"""
+    hits = [len(set(approx) & set(exact)) / len(exact) for approx, exact in zip(approx_indices, exact_indices)]
+    return float(np.mean(hits))
+
+def evaluate_index(index, query_embeddings, embeddings, top_k=10):
+    """
+    Compare an index against exact float32 search
+    Returns recall@k, average latency per query and RAM per vector (everything the index
+    keeps in memory, plus the compressed codes alone for quantized indexes)
+    """
+    query_embeddings = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+    _, exact_indices = top_k_rows(query_embeddings @ np.asarray(embeddings, dtype=np.float32).T, top_k)
+
+    start_time = time.perf_counter()
+    _, approx_indices = index.search(query_embeddings, top_k)
+    elapsed = time.perf_counter() - start_time
+
+    index_bytes = getattr(index, "nbytes", embeddings.nbytes)
+    report = {
+        'recall_at_k': recall_at_k(approx_indices, exact_indices),
+        'latency_ms_per_query': elapsed * 1000 / len(query_embeddings),
+        'bytes_per_vector': index_bytes / len(embeddings),
+        'compression_vs_float32': embeddings.shape[1] * 4 / (index_bytes / len(embeddings))
+    }
+    if hasattr(index, "code_nbytes"):
+        report['code_bytes_per_vector'] = index.code_nbytes / len(embeddings)
+    return report
@@ -0,0 +1,95 @@
+"""
+Query Embedding Cache
+Bounded, thread-safe LRU + TTL cache of query embeddings, so repeated and
+popular queries skip the encoder.
+
+Vendored: identical copies live in 04-My-First-Rag-System, 05-Document-Chunking-Strategies and
+06-Retrieval-Techniques because each tutorial folder runs on its own (no cross-folder imports);
+edit them together.
+"""
+
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# Number of query vectors kept, and how long each one stays valid
+DEFAULT_QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "10000"))
+DEFAULT_QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600"))
+
+# =============================================================================
+# QUERY EMBEDDING CACHE
+# =============================================================================
+
+def normalize_text(text):
+    """Unicode NFC normalization and whitespace collapsing, so cosmetic differences still hit"""
+    text = unicodedata.normalize("NFC", text)
+    return " ".join(text.split())
+
+class QueryEmbeddingCache:
+    """
+    LRU cache of query embeddings keyed on (model id, normalized query text)
+
+    max_entries: vectors kept; the least recently used are dropped first
+    ttl_seconds: age after which an entry counts as missing (None = never expires)
+    """
+
+    def __init__(self, max_entries=DEFAULT_QUERY_CACHE_SIZE, ttl_seconds=DEFAULT_QUERY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stored_at, vector), oldest access first
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, model_id, texts, compute):
+        """
+        One vector per text, in order; `compute` (list of texts -> list of vectors)
+        is called once for all cache misses
+        """
+        keys = [(model_id, normalize_text(text)) for text in texts]
+        vectors = {}
+        missing = {}
+        now = time.monotonic()
+
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in vectors or key in missing:
+                    continue
+                entry = self._entries.get(key)
+                if entry is not None and (self.ttl_seconds is None or now - entry[0] <= self.ttl_seconds):
+                    self._entries.move_to_end(key)  # Mark as most recently used
+                    vectors[key] = entry[1]
+                    self.hits += 1
+                else:
+                    missing[key] = text
+                    self.misses += 1
+
+        # Encode outside the lock so other threads can keep reading the cache
+        if missing:
+            computed = dict(zip(missing.keys(), compute(list(missing.values()))))
+            vectors.update(computed)
+            with self._lock:
+                for key, vector in computed.items():
+                    self._entries[key] = (now, vector)
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)  # Evict the least recently used entry
+
+        return [vectors[key] for key in keys]
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries)
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
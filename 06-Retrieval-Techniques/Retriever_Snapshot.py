@@ -0,0 +1,227 @@
+"""
+Retriever Snapshots
+Save the dense and sparse state of the retrieval pipeline once, then load it in
+milliseconds from memory-mapped files instead of re-encoding the corpus.
+
+Snapshot layout (one directory):
+    meta.json             BM25 parameters, corpus sizes, embedding model name
+    embeddings.npy        (N, d) float32, L2-normalized document embeddings
+    text_offsets.npy      (N + 1,) int64 byte offsets into texts.bin
+    texts.bin             UTF-8 document texts, concatenated
+    term_offsets.npy      (V + 1,) int64 byte offsets into terms.bin
+    terms.bin             UTF-8 vocabulary, sorted (term id = position)
+    idf.npy               (V,) float64 BM25 idf per term id
+    postings_offsets.npy  (V + 1,) int64 start of each term's postings
+    postings_docs.npy     (P,) int32 document ids, ascending within a term
+    postings_tfs.npy      (P,) float32 term frequencies
+    length_norm.npy       (N,) float64 k1 * (1 - b + b * doc_len / avgdl)
+    postings_impacts.npy  (P,) float32 precomputed BM25 contribution of each posting
+    upper_bounds.npy      (V,) float32 largest impact per term (MaxScore bounds)
+
+Every array is opened with mmap_mode='r', so loading does no real work and the
+page cache is shared by all worker processes that open the same snapshot.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from bisect import bisect_left
+
+import numpy as np
+
+from Sparse_Index import bm25_impacts, max_impacts
+
+# =============================================================================
+# STRING TABLE
+# =============================================================================
+
+class StringTable:
+    """
+    Read-only list of strings backed by a memory-mapped byte blob and offsets
+    Supports len(), indexing and iteration, so it can stand in for a list
+    """
+
+    def __init__(self, blob_path, offsets_path):
+        self.offsets = np.load(offsets_path, mmap_mode='r')
+        size = int(self.offsets[-1])
+        # np.memmap cannot map an empty file
+        self.blob = np.memmap(blob_path, dtype=np.uint8, mode='r') if size else np.empty(0, dtype=np.uint8)
+
+    @staticmethod
+    def write(strings, blob_path, offsets_path):
+        offsets = [0]
+        with open(blob_path, 'wb') as f:
+            for text in strings:
+                data = text.encode('utf-8')
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+        np.save(offsets_path, np.asarray(offsets, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        idx = int(idx)
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("StringTable index out of range")
+        return self.blob[self.offsets[idx]:self.offsets[idx + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+# =============================================================================
+# SPARSE (BM25) STATE
+# =============================================================================
+
+class SnapshotBM25:
+    """
+    BM25Okapi scores computed from array-backed postings
+    Drop-in for rank_bm25.BM25Okapi.get_scores with identical results
+    """
+
+    def __init__(self, path, meta):
+        self.num_docs = meta['num_docs']
+        self.k1 = meta['k1']
+        self.b = meta['b']
+        self.avgdl = meta['avgdl']
+        self.terms = StringTable(os.path.join(path, 'terms.bin'), os.path.join(path, 'term_offsets.npy'))
+        self.idf = np.load(os.path.join(path, 'idf.npy'), mmap_mode='r')
+        self.postings_offsets = np.load(os.path.join(path, 'postings_offsets.npy'), mmap_mode='r')
+        self.postings_docs = np.load(os.path.join(path, 'postings_docs.npy'), mmap_mode='r')
+        self.postings_tfs = np.load(os.path.join(path, 'postings_tfs.npy'), mmap_mode='r')
+        self.length_norm = np.load(os.path.join(path, 'length_norm.npy'), mmap_mode='r')
+        # Written since the sparse index was added; older snapshots recompute them on load
+        impacts_path = os.path.join(path, 'postings_impacts.npy')
+        if os.path.exists(impacts_path):
+            self.postings_impacts = np.load(impacts_path, mmap_mode='r')
+            self.upper_bounds = np.load(os.path.join(path, 'upper_bounds.npy'), mmap_mode='r')
+        else:
+            self.postings_impacts = None
+            self.upper_bounds = None
+
+    def term_id(self, term):
+        """Binary search in the sorted vocabulary; -1 if the term is unknown"""
+        position = bisect_left(self.terms, term)
+        if position < len(self.terms) and self.terms[position] == term:
+            return position
+        return -1
+
+    def postings(self, term_id):
+        """(doc ids, term frequencies) of one term"""
+        start, end = self.postings_offsets[term_id], self.postings_offsets[term_id + 1]
+        return self.postings_docs[start:end], self.postings_tfs[start:end]
+
+    def get_scores(self, query_tokens):
+        scores = np.zeros(self.num_docs)
+        for token in query_tokens:
+            term_id = self.term_id(token)
+            if term_id < 0:
+                continue
+            docs, tfs = self.postings(term_id)
+            scores[docs] += self.idf[term_id] * tfs * (self.k1 + 1) / (tfs + self.length_norm[docs])
+        return scores
+
+# =============================================================================
+# SAVE / LOAD
+# =============================================================================
+
+class RetrieverSnapshot:
+    """Everything the retrieval functions need, opened from a snapshot directory"""
+
+    def __init__(self, path):
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.documents = StringTable(os.path.join(path, 'texts.bin'), os.path.join(path, 'text_offsets.npy'))
+        self.embeddings = np.load(os.path.join(path, 'embeddings.npy'), mmap_mode='r')
+        self.bm25 = SnapshotBM25(path, self.meta)
+
+def save_snapshot(path, documents, embeddings, bm25, model_name):
+    """
+    Write a retriever snapshot
+
+    documents: list of document texts
+    embeddings: (N, d) L2-normalized document embeddings
+    bm25: fitted rank_bm25.BM25Okapi over the same documents
+    model_name: embedding model used, stored so loaders can check compatibility
+
+    The files are written to a staging directory next to `path`, which then replaces
+    it with os.replace, so an existing snapshot is never seen half overwritten
+    """
+    path = os.path.abspath(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".{os.path.basename(path)}.", dir=os.path.dirname(path))
+    try:
+        os.chmod(staging, 0o755)  # mkdtemp creates it private to the current user
+        _write_snapshot(staging, documents, embeddings, bm25, model_name)
+        if os.path.exists(path):
+            # Directories cannot be replaced while non-empty: move the old one aside first.
+            # Readers that already opened it keep their memory maps of the old files
+            retired = staging + ".old"
+            os.replace(path, retired)
+            os.replace(staging, path)
+            shutil.rmtree(retired, ignore_errors=True)
+        else:
+            os.replace(staging, path)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+def _write_snapshot(path, documents, embeddings, bm25, model_name):
+    """Write every snapshot file into the (empty) directory `path`"""
+    # Dense side and texts
+    np.save(os.path.join(path, 'embeddings.npy'), np.asarray(embeddings, dtype=np.float32))
+    StringTable.write(documents, os.path.join(path, 'texts.bin'), os.path.join(path, 'text_offsets.npy'))
+
+    # Sparse side: invert the per-document term frequencies into per-term postings
+    vocabulary = sorted(bm25.idf)
+    term_ids = {term: term_id for term_id, term in enumerate(vocabulary)}
+    postings = [[] for _ in vocabulary]
+    for doc_id, frequencies in enumerate(bm25.doc_freqs):
+        for term, tf in frequencies.items():
+            postings[term_ids[term]].append((doc_id, tf))
+
+    postings_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    postings_offsets[1:] = np.cumsum([len(plist) for plist in postings])
+    flat = [entry for plist in postings for entry in plist]  # doc ids ascend within each term
+    postings_docs = np.asarray([doc for doc, _ in flat], dtype=np.int32)
+    postings_tfs = np.asarray([tf for _, tf in flat], dtype=np.float32)
+    np.save(os.path.join(path, 'postings_offsets.npy'), postings_offsets)
+    np.save(os.path.join(path, 'postings_docs.npy'), postings_docs)
+    np.save(os.path.join(path, 'postings_tfs.npy'), postings_tfs)
+
+    StringTable.write(vocabulary, os.path.join(path, 'terms.bin'), os.path.join(path, 'term_offsets.npy'))
+    idf = np.asarray([bm25.idf[term] for term in vocabulary], dtype=np.float64)
+    np.save(os.path.join(path, 'idf.npy'), idf)
+
+    doc_len = np.asarray(bm25.doc_len, dtype=np.float64)
+    length_norm = bm25.k1 * (1 - bm25.b + bm25.b * doc_len / bm25.avgdl)
+    np.save(os.path.join(path, 'length_norm.npy'), length_norm)
+
+    # Precomputed impacts and per-term upper bounds for Sparse_Index.SparseIndex
+    impacts = bm25_impacts(postings_offsets, postings_docs, postings_tfs, idf, length_norm, bm25.k1)
+    np.save(os.path.join(path, 'postings_impacts.npy'), impacts)
+    np.save(os.path.join(path, 'upper_bounds.npy'), max_impacts(postings_offsets, impacts))
+
+    meta = {
+        'num_docs': len(documents),
+        'dimension': int(np.shape(embeddings)[1]),
+        'vocabulary_size': len(vocabulary),
+        'k1': bm25.k1,
+        'b': bm25.b,
+        'avgdl': bm25.avgdl,
+        'model_name': model_name
+    }
+    # meta.json is written last: its presence marks a complete snapshot directory
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+def load_snapshot(path):
+    """Open a snapshot written by save_snapshot (memory-mapped, no copying)"""
+    return RetrieverSnapshot(path)
+
+def snapshot_exists(path):
+    return os.path.exists(os.path.join(path, 'meta.json'))
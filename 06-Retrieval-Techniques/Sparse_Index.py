@@ -0,0 +1,191 @@
+"""
+Sparse (BM25) Inverted Index
+Array-backed postings with precomputed BM25 impacts and MaxScore top-k search.
+
+BM25Okapi.get_scores scores every document for every query token. Here each
+term owns a slice of three flat arrays (doc ids ascending, impacts), and the
+largest impact of each term is its score upper bound. MaxScore processes terms
+from the highest upper bound down; once the current k-th best score is larger
+than everything the remaining terms could add, those terms can no longer bring
+new documents into the top-k, so their postings are only probed (binary search)
+for the documents already in the candidate set instead of being scanned.
+"""
+
+from collections import Counter
+
+import numpy as np
+
+# =============================================================================
+# BUILD HELPERS
+# =============================================================================
+
+def bm25_impacts(postings_offsets, postings_docs, postings_tfs, idf, length_norm, k1):
+    """
+    Per-posting BM25 contribution: idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+    Summing the impacts of the query terms gives BM25Okapi's score up to float32 rounding
+    """
+    posting_idf = np.repeat(np.asarray(idf, dtype=np.float64), np.diff(postings_offsets))
+    tfs = np.asarray(postings_tfs, dtype=np.float64)
+    doc_norm = np.asarray(length_norm, dtype=np.float64)[postings_docs]
+    return (posting_idf * tfs * (k1 + 1) / (tfs + doc_norm)).astype(np.float32)
+
+def max_impacts(postings_offsets, postings_impacts):
+    """Largest impact of every term (its score upper bound); 0 for empty postings"""
+    offsets = np.asarray(postings_offsets)
+    bounds = np.zeros(len(offsets) - 1, dtype=np.float32)
+    non_empty = np.diff(offsets) > 0
+    if len(postings_impacts):
+        bounds[non_empty] = np.maximum.reduceat(postings_impacts, offsets[:-1][non_empty])
+    return bounds
+
+# =============================================================================
+# SPARSE INDEX
+# =============================================================================
+
+class SparseIndex:
+    """
+    BM25 inverted index with compact integer term ids
+
+    term_id: callable mapping a token to its integer id, or -1 if unknown
+    postings_offsets: (V + 1,) start of each term's postings
+    postings_docs: (P,) document ids, ascending within each term
+    postings_impacts: (P,) precomputed BM25 contribution of each posting
+    """
+
+    def __init__(self, term_id, postings_offsets, postings_docs, postings_impacts, num_docs, upper_bounds=None):
+        self.term_id = term_id
+        self.postings_offsets = postings_offsets
+        self.postings_docs = postings_docs
+        self.postings_impacts = postings_impacts
+        self.num_docs = num_docs
+        self.upper_bounds = max_impacts(postings_offsets, postings_impacts) if upper_bounds is None else upper_bounds
+        self._term_doc = None
+
+    @classmethod
+    def from_bm25(cls, bm25):
+        """Build from a fitted rank_bm25.BM25Okapi"""
+        vocabulary = {term: term_id for term_id, term in enumerate(sorted(bm25.idf))}
+        postings = [[] for _ in vocabulary]
+        for doc_id, frequencies in enumerate(bm25.doc_freqs):
+            for term, tf in frequencies.items():
+                postings[vocabulary[term]].append((doc_id, tf))
+
+        postings_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        postings_offsets[1:] = np.cumsum([len(plist) for plist in postings])
+        postings_docs = np.asarray([doc for plist in postings for doc, _ in plist], dtype=np.int32)
+        postings_tfs = np.asarray([tf for plist in postings for _, tf in plist], dtype=np.float32)
+
+        idf = np.asarray([bm25.idf[term] for term in sorted(bm25.idf)])
+        doc_len = np.asarray(bm25.doc_len, dtype=np.float64)
+        length_norm = bm25.k1 * (1 - bm25.b + bm25.b * doc_len / bm25.avgdl)
+        impacts = bm25_impacts(postings_offsets, postings_docs, postings_tfs, idf, length_norm, bm25.k1)
+
+        return cls(lambda term: vocabulary.get(term, -1), postings_offsets, postings_docs, impacts, len(doc_len))
+
+    @classmethod
+    def from_snapshot(cls, snapshot_bm25):
+        """Reuse the memory-mapped postings of a Retriever_Snapshot.SnapshotBM25"""
+        if snapshot_bm25.postings_impacts is None:
+            # Older snapshot without stored impacts: compute them once in memory
+            impacts = bm25_impacts(
+                snapshot_bm25.postings_offsets, snapshot_bm25.postings_docs, snapshot_bm25.postings_tfs,
+                snapshot_bm25.idf, snapshot_bm25.length_norm, snapshot_bm25.k1
+            )
+            upper_bounds = None
+        else:
+            impacts = snapshot_bm25.postings_impacts
+            upper_bounds = snapshot_bm25.upper_bounds
+        return cls(snapshot_bm25.term_id, snapshot_bm25.postings_offsets, snapshot_bm25.postings_docs,
+                   impacts, snapshot_bm25.num_docs, upper_bounds)
+
+    def postings(self, term_id):
+        start, end = self.postings_offsets[term_id], self.postings_offsets[term_id + 1]
+        return self.postings_docs[start:end], self.postings_impacts[start:end]
+
+    def _query_terms(self, query_tokens):
+        """[(term id, weight)] where weight counts repeated query tokens, like BM25Okapi"""
+        counts = Counter(self.term_id(token) for token in query_tokens)
+        counts.pop(-1, None)
+        return list(counts.items())
+
+    def get_scores(self, query_tokens):
+        """Exhaustive BM25 scores for every document (same values as BM25Okapi.get_scores)"""
+        scores = np.zeros(self.num_docs)
+        for term_id, weight in self._query_terms(query_tokens):
+            docs, impacts = self.postings(term_id)
+            scores[docs] += weight * impacts
+        return scores
+
+    def term_doc_matrix(self):
+        """(V, N) scipy CSR matrix of impacts; the postings arrays already are its CSR layout"""
+        if self._term_doc is None:
+            from scipy.sparse import csr_matrix
+            num_terms = len(self.postings_offsets) - 1
+            self._term_doc = csr_matrix(
+                (self.postings_impacts, self.postings_docs, self.postings_offsets), shape=(num_terms, self.num_docs)
+            )
+        return self._term_doc
+
+    def query_matrix(self, queries_tokens):
+        """(Q, V) scipy CSR matrix of query term counts"""
+        from scipy.sparse import csr_matrix
+        rows, cols, counts = [], [], []
+        for row, query_tokens in enumerate(queries_tokens):
+            for term_id, weight in self._query_terms(query_tokens):
+                rows.append(row)
+                cols.append(term_id)
+                counts.append(weight)
+        num_terms = len(self.postings_offsets) - 1
+        return csr_matrix((np.asarray(counts, dtype=np.float32), (rows, cols)), shape=(len(queries_tokens), num_terms))
+
+    def batch_get_scores(self, queries_tokens):
+        """(Q, N) BM25 scores for many queries as one sparse matrix product"""
+        return (self.query_matrix(queries_tokens) @ self.term_doc_matrix()).toarray()
+
+    def search(self, query_tokens, top_k=10):
+        """
+        MaxScore top-k: only postings that can still reach the top-k are scanned
+        Returns (scores, doc ids), best first; only documents matching a query term
+        """
+        terms = [(term_id, weight, weight * float(self.upper_bounds[term_id]))
+                 for term_id, weight in self._query_terms(query_tokens)]
+        terms.sort(key=lambda term: -term[2])
+
+        # remaining_bound[i] = most that terms i.. can add to any document
+        remaining_bound = np.cumsum([bound for _, _, bound in terms][::-1])[::-1].tolist() + [0.0]
+
+        candidate_docs = np.empty(0, dtype=np.int64)
+        candidate_scores = np.empty(0, dtype=np.float64)
+        threshold = 0.0  # k-th best partial score (partial scores only grow, so this is a safe lower bound)
+
+        for i, (term_id, weight, _) in enumerate(terms):
+            docs, impacts = self.postings(term_id)
+
+            if len(candidate_docs) >= top_k and threshold >= remaining_bound[i]:
+                # Non-essential term: a document outside the candidates could gain at most
+                # remaining_bound[i] <= threshold, so only probe the existing candidates
+                positions = np.searchsorted(docs, candidate_docs)
+                positions_clipped = np.minimum(positions, len(docs) - 1)
+                matched = (positions < len(docs)) & (docs[positions_clipped] == candidate_docs)
+                candidate_scores[matched] += weight * impacts[positions_clipped[matched]]
+
+                # Drop candidates that cannot reach the threshold even with every remaining term
+                keep = candidate_scores + remaining_bound[i + 1] >= threshold
+                candidate_docs, candidate_scores = candidate_docs[keep], candidate_scores[keep]
+            else:
+                # Essential term: merge its postings into the candidate set
+                merged_docs = np.union1d(candidate_docs, docs)
+                merged_scores = np.zeros(len(merged_docs))
+                merged_scores[np.searchsorted(merged_docs, candidate_docs)] += candidate_scores
+                merged_scores[np.searchsorted(merged_docs, docs)] += weight * impacts
+                candidate_docs, candidate_scores = merged_docs, merged_scores
+
+            if len(candidate_scores) >= top_k:
+                threshold = max(threshold, float(np.partition(candidate_scores, -top_k)[-top_k]))
+
+        k = min(top_k, len(candidate_docs))
+        if k == 0:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        best = np.argpartition(-candidate_scores, k - 1)[:k]
+        best = best[np.argsort(-candidate_scores[best], kind="stable")]
+        return candidate_scores[best], candidate_docs[best]